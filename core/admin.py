@@ -1,9 +1,13 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from django.utils.html import format_html
-from django.db.models import Sum
+from django.utils.html import conditional_escape, format_html
+from django.utils.safestring import mark_safe
+from django.db.models import Q, Sum
 from .models import User, Room, Client, Reservation, Invoice, Payment
 from .admin_forms import CustomUserChangeForm
+from .search import search_clients
+from .pagination import EstimatedCountPaginator
+from . import booking, images
 
 @admin.register(User)
 class CustomUserAdmin(UserAdmin):
@@ -32,7 +36,7 @@ class CustomUserAdmin(UserAdmin):
         if not obj.pk:
             return "Le profil sera généré après l'enregistrement."
 
-        avatar_url = obj.profile_photo.url if obj.profile_photo else "https://ui-avatars.com/api/?name=" + (obj.username or "") + "&background=1a2a6c&color=fff"
+        avatar_url = images.avatar_url(obj)
         
         status_color = "#2ecc71" if obj.is_active else "#95a5a6"
         status_text = "Actif" if obj.is_active else "Inactif"
@@ -42,13 +46,13 @@ class CustomUserAdmin(UserAdmin):
         date_joined = obj.date_joined.strftime("%Y")
         pwd_url = f"/admin/core/user/{obj.pk}/password/"
         
-        return format_html(
+        return mark_safe(
             """
             <style>
                 @keyframes pulse-ring {
-                    0% { box-shadow: 0 0 0 0 rgba(46, 204, 113, 0.7); }
-                    70% { box-shadow: 0 0 0 10px rgba(46, 204, 113, 0); }
-                    100% { box-shadow: 0 0 0 0 rgba(46, 204, 113, 0); }
+                    0%% { box-shadow: 0 0 0 0 rgba(46, 204, 113, 0.7); }
+                    70%% { box-shadow: 0 0 0 10px rgba(46, 204, 113, 0); }
+                    100%% { box-shadow: 0 0 0 0 rgba(46, 204, 113, 0); }
                 }
                 .pro-card-container {
                     display: grid;
@@ -62,7 +66,7 @@ class CustomUserAdmin(UserAdmin):
                     border: 1px solid rgba(0,0,0,0.05);
                 }
                 .pro-card-sidebar {
-                    background: linear-gradient(135deg, #1a2a6c 0%, #b21f1f 100%);
+                    background: linear-gradient(135deg, #1a2a6c 0%%, #b21f1f 100%%);
                     padding: 40px 20px;
                     display: flex;
                     flex-direction: column;
@@ -74,7 +78,7 @@ class CustomUserAdmin(UserAdmin):
                 .pro-avatar {
                     width: 120px;
                     height: 120px;
-                    border-radius: 50%;
+                    border-radius: 50%%;
                     border: 4px solid rgba(255,255,255,0.25);
                     box-shadow: 0 8px 20px rgba(0,0,0,0.2);
                     margin-bottom: 20px;
@@ -96,7 +100,7 @@ class CustomUserAdmin(UserAdmin):
                     width: 8px;
                     height: 8px;
                     background: %s;
-                    border-radius: 50%;
+                    border-radius: 50%%;
                     %s
                 }
                 .pro-card-content {
@@ -213,7 +217,7 @@ class CustomUserAdmin(UserAdmin):
                     </div>
                 </div>
             </div>
-            """ % (
+            """ % tuple(conditional_escape(value) for value in (
                 status_color,
                 "animation: pulse-ring 2s infinite;" if obj.is_active else "",
                 avatar_url,
@@ -227,7 +231,7 @@ class CustomUserAdmin(UserAdmin):
                 perm_count,
                 "Superutilisateur" if obj.is_superuser else ("Staff" if obj.is_staff else "Utilisateur"),
                 pwd_url
-            )
+            ))
         )
     profile_header.short_description = "Fiche Signalétique"
     profile_header.allow_tags = True
@@ -246,6 +250,12 @@ class ClientAdmin(admin.ModelAdmin):
         }),
     )
 
+    def get_search_results(self, request, queryset, search_term):
+        # Index de recherche normalisé (voir core/search.py) au lieu de LIKE '%terme%'
+        if not search_term:
+            return queryset, False
+        return search_clients(search_term, queryset), False
+
 @admin.register(Room)
 class RoomAdmin(admin.ModelAdmin):
     list_display = ('number', 'category', 'price_per_night', 'capacity', 'status')
@@ -280,8 +290,37 @@ class RoomAdmin(admin.ModelAdmin):
 class ReservationAdmin(admin.ModelAdmin):
     list_display = ('id', 'client', 'room', 'check_in', 'check_out', 'status', 'created_at')
     list_filter = ('status', 'check_in', 'room__category')
+    # Client et chambre chargés par jointure : nombre de requêtes fixe par page
+    list_select_related = ('client', 'room')
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
     search_fields = ('client__last_name', 'client__first_name', 'room__number')
     date_hierarchy = 'check_in'
+
+    def get_search_results(self, request, queryset, search_term):
+        # Client via l'index de recherche, chambre par numéro exact : pas de jointure LIKE
+        if not search_term:
+            return queryset, False
+        term = search_term.strip()
+        return queryset.filter(
+            Q(client__in=search_clients(term).values('pk')) | Q(room__number=term)
+        ), False
+
+    def changeform_view(self, request, object_id=None, form_url='', extra_context=None):
+        # Validation du formulaire (Reservation.clean) et enregistrement sous le même verrou
+        # de chambre que la réception : un chevauchement apparu entre les deux est impossible
+        # et le conflit s'affiche comme erreur du formulaire.
+        try:
+            room_id = int(request.POST['room']) if request.method == 'POST' else None
+        except (KeyError, ValueError):
+            room_id = None
+        if room_id is None:
+            return super().changeform_view(request, object_id, form_url, extra_context)
+        with booking.room_lock(room_id):
+            return super().changeform_view(request, object_id, form_url, extra_context)
+
+    def save_model(self, request, obj, form, change):
+        booking.save_reservation(obj)
     
     fieldsets = (
         ('Séjour', {
@@ -299,17 +338,22 @@ class PaymentInline(admin.TabularInline):
     
 @admin.register(Invoice)
 class InvoiceAdmin(admin.ModelAdmin):
-    list_display = ('id', 'reservation', 'issued_at', 'total_amount', 'status')
+    list_display = ('id', 'reservation', 'issued_at', 'total_amount', 'amount_paid', 'balance', 'status')
     list_filter = ('status', 'issued_at')
+    # Invoice/Reservation.__str__ affichent le client et le numéro de chambre
+    list_select_related = ('reservation__client', 'reservation__room')
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
     inlines = [PaymentInline]
-    readonly_fields = ('total_amount', 'issued_at')
+    # Montant payé, solde et statut découlent des paiements
+    readonly_fields = ('total_amount', 'amount_paid', 'balance', 'status', 'issued_at')
     
     fieldsets = (
         ('Détails', {
             'fields': ('reservation', 'issued_at', 'status')
         }),
         ('Finances', {
-            'fields': ('total_amount',)
+            'fields': ('total_amount', 'amount_paid', 'balance')
         }),
     )
 
@@ -317,3 +361,7 @@ class InvoiceAdmin(admin.ModelAdmin):
 class PaymentAdmin(admin.ModelAdmin):
     list_display = ('invoice', 'amount', 'payment_method', 'date')
     list_filter = ('payment_method', 'date')
+    # Invoice.__str__ remonte jusqu'au client de la réservation
+    list_select_related = ('invoice__reservation__client',)
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
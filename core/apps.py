@@ -1,4 +1,5 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class CoreConfig(AppConfig):
@@ -7,3 +8,7 @@ class CoreConfig(AppConfig):
 
     def ready(self):
         import core.signals
+
+        if getattr(settings, 'REQUEST_METRICS', False):
+            from core import instrumentation
+            instrumentation.install()
@@ -0,0 +1,39 @@
+"""
+Authentification à faible coût par requête.
+
+Chaque vue protégée par @login_required recharge l'utilisateur de la session.
+CachedModelBackend sert cette lecture depuis le cache (espace 'users' de
+core/caching.py, incrémenté par core/signals.py à chaque enregistrement ou
+suppression d'un User : changement de mot de passe, désactivation, rôle...).
+Avec les sessions en cache (SESSION_ENGINE cached_db ou signed_cookies, voir
+settings.py), une requête authentifiée ne lit plus la base sur cache chaud.
+Réservé à un cache partagé (Redis, fichiers) : avec locmem://, settings.py
+revient à ModelBackend.
+
+Les permissions (groupes, permissions individuelles) restent lues en base,
+à la demande, comme avec ModelBackend.
+"""
+from asgiref.sync import sync_to_async
+from django.contrib.auth.backends import ModelBackend
+
+from . import caching
+from .models import User
+
+USER_CACHE_TIMEOUT = 600  # secondes
+
+
+def _load_user(user_id):
+    # None est mis en cache aussi : un identifiant de session orphelin ne coûte qu'une requête
+    return User._default_manager.filter(pk=user_id).first()
+
+
+class CachedModelBackend(ModelBackend):
+    def get_user(self, user_id):
+        user = caching.get_or_compute(
+            'users', f'user:{user_id}', lambda: _load_user(user_id), USER_CACHE_TIMEOUT
+        )
+        return user if user is not None and self.user_can_authenticate(user) else None
+
+    async def aget_user(self, user_id):
+        # Vues asynchrones (request.auser()) : même cache, lu hors de la boucle d'événements
+        return await sync_to_async(self.get_user)(user_id)
@@ -0,0 +1,122 @@
+"""
+Moteur de disponibilité des chambres.
+
+Les réservations non annulées d'une même chambre ne se chevauchent jamais
+(invariant garanti par Reservation.clean). Pour une chambre donnée, les séjours
+triés par date d'arrivée le sont donc aussi par date de départ : une simple
+recherche dichotomique suffit pour savoir si un intervalle [a, b[ est libre.
+"""
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+
+from .models import Reservation, Room
+
+
+def blocking_reservations():
+    """Réservations qui occupent réellement une chambre (tout sauf ANNULEE)."""
+    return Reservation.objects.exclude(status=Reservation.Status.ANNULEE)
+
+
+def overlapping_reservations(room, check_in, check_out, exclude_pk=None):
+    """
+    Réservations bloquantes qui chevauchent [check_in, check_out[ pour une chambre.
+    Logique de chevauchement : (DebutA < FinB) et (FinA > DebutB).
+    La requête parcourt l'index (room, check_out, check_in) à partir de
+    check_out > check_in demandé : les séjours passés de la chambre ne sont pas
+    lus. Sans tri (le tri par défaut -created_at imposerait un tri temporaire).
+    """
+    qs = blocking_reservations().filter(
+        room=room,
+        check_in__lt=check_out,
+        check_out__gt=check_in,
+    ).order_by()
+    if exclude_pk:
+        qs = qs.exclude(pk=exclude_pk)
+    return qs
+
+
+def is_room_available(room, check_in, check_out, exclude_pk=None):
+    """La chambre est-elle libre pour [check_in, check_out[ ? (une requête indexée)"""
+    return not overlapping_reservations(room, check_in, check_out, exclude_pk).exists()
+
+
+def available_rooms(check_in, check_out, rooms=None):
+    """Chambres libres pour [check_in, check_out[, en une seule requête."""
+    if rooms is None:
+        rooms = Room.objects.all()
+    busy = blocking_reservations().filter(
+        check_in__lt=check_out,
+        check_out__gt=check_in,
+    ).values('room_id')
+    return rooms.exclude(pk__in=busy)
+
+
+class AvailabilityIndex:
+    """
+    Index d'intervalles en mémoire, par chambre.
+
+    Chaque chambre conserve deux listes triées (arrivées et départs) de ses séjours
+    bloquants. Comme les séjours ne se chevauchent pas, la recherche du premier
+    séjour finissant après `a` donne le seul candidat au conflit : O(log n).
+    """
+
+    def __init__(self, stays=()):
+        self._starts = defaultdict(list)
+        self._ends = defaultdict(list)
+        for room_id, check_in, check_out in stays:
+            self.add(room_id, check_in, check_out)
+
+    @classmethod
+    def for_window(cls, start, end, room_ids=None):
+        """
+        Construit l'index à partir des séjours qui intersectent [start, end[,
+        en une seule requête. Par chambre, l'index (room, check_out, check_in)
+        part de check_out > start : les séjours passés ne sont pas parcourus.
+        Le O(log n) ne vaut que pour l'index en mémoire.
+        """
+        qs = blocking_reservations().filter(check_in__lt=end, check_out__gt=start).order_by()
+        if room_ids is not None:
+            qs = qs.filter(room_id__in=room_ids)
+        return cls(qs.values_list('room_id', 'check_in', 'check_out'))
+
+    def add(self, room_id, check_in, check_out):
+        """Enregistre un séjour (par exemple juste après l'avoir accepté)."""
+        insort(self._starts[room_id], check_in)
+        insort(self._ends[room_id], check_out)
+
+    def is_free(self, room_id, check_in, check_out):
+        ends = self._ends.get(room_id)
+        if not ends:
+            return True
+        # Premier séjour dont le départ est strictement après notre arrivée
+        i = bisect_right(ends, check_in)
+        if i == len(ends):
+            return True
+        return self._starts[room_id][i] >= check_out
+
+    def conflicts(self, room_id, check_in, check_out):
+        """Nombre de séjours indexés qui chevauchent [check_in, check_out[."""
+        starts = self._starts.get(room_id, [])
+        ends = self._ends.get(room_id, [])
+        return bisect_left(starts, check_out) - bisect_right(ends, check_in)
+
+    def free_rooms(self, room_ids, check_in, check_out):
+        return [room_id for room_id in room_ids if self.is_free(room_id, check_in, check_out)]
+
+
+def check_stays(stays):
+    """
+    Vérifie N séjours candidats [(room_id, check_in, check_out), ...] en une
+    seule requête. Retourne une liste de booléens (True = chambre libre),
+    dans l'ordre des candidats. Les candidats ne sont comparés qu'à la base,
+    pas entre eux.
+    """
+    stays = list(stays)
+    if not stays:
+        return []
+    index = AvailabilityIndex.for_window(
+        min(s[1] for s in stays),
+        max(s[2] for s in stays),
+        room_ids={s[0] for s in stays},
+    )
+    return [index.is_free(room_id, a, b) for room_id, a, b in stays]
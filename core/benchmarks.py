@@ -0,0 +1,243 @@
+"""
+Banc de performance des chemins critiques (commande `benchmark`).
+
+Chaque scénario est une fonction appelée `iterations` fois ; on mesure la
+latence de chaque appel puis le débit et les percentiles p50/p95/p99.
+Les résultats sont comparés à une référence enregistrée (JSON) : un p95 plus
+lent que la référence au-delà de la tolérance est signalé comme régression.
+
+Scénarios :
+
+- booking : création de réservations avec vérification des chevauchements
+  (book_room, sous verrou de chambre) ;
+- dashboard_cold / dashboard_warm : vue du tableau de bord, cache invalidé ou non ;
+- dashboard_stats : balise {% get_dashboard_stats %} de l'administration (cache invalidé) ;
+- reception_rooms / reception_reservations : listes de la réception ;
+- auth_overhead : coût fixe d'une requête authentifiée (session, utilisateur),
+  mesuré sur une revalidation 304 du planning ; `queries` donne le nombre de
+  requêtes SQL du dernier appel (0 attendu sur cache chaud, à comparer entre
+  HOTEL_SESSION_ENGINE=db et cached_db) ;
+- admin_reservations / admin_invoices / admin_payments / admin_clients :
+  listes de l'administration.
+
+Seuls les scénarios demandés sont préparés ; un scénario impossible sur la base
+(booking sans chambre ni client) est ignoré et reporté dans `skipped`.
+Sur la base réelle (`rollback=True`, option --current-db), tout s'exécute dans
+une transaction annulée à la fin : réservations, factures, sessions et
+utilisateur du banc ne sont jamais enregistrés.
+"""
+import platform
+import random
+import time
+from datetime import timedelta
+
+import django
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.template import Context, Template
+from django.test import Client as HttpClient, RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from . import caching
+from .booking import book_room
+from .instrumentation import percentile
+from .models import Client, Invoice, Payment, Reservation, Room, User
+from .stats import DashboardStats
+
+# Jeux de données : paramètres de populate_db (≈ 54 séjours par chambre et par an)
+DATASETS = {
+    'small': {'rooms': 20, 'clients': 500, 'years': 1},         # ≈ 1 000 réservations
+    'medium': {'rooms': 500, 'clients': 20000, 'years': 3.7},   # ≈ 100 000 réservations
+    'large': {'rooms': 2000, 'clients': 100000, 'years': 9.2},  # ≈ 1 000 000 réservations
+}
+
+BENCHMARK_USER = 'benchmark'
+
+
+class ScenarioUnavailable(Exception):
+    pass
+
+
+def summarize(latencies, elapsed):
+    latencies_ms = [value * 1000 for value in latencies]
+    return {
+        'iterations': len(latencies),
+        'throughput_per_s': round(len(latencies) / elapsed, 2) if elapsed else None,
+        'p50_ms': round(percentile(latencies_ms, 0.50), 2),
+        'p95_ms': round(percentile(latencies_ms, 0.95), 2),
+        'p99_ms': round(percentile(latencies_ms, 0.99), 2),
+        'max_ms': round(max(latencies_ms), 2),
+    }
+
+
+def measure(func, iterations, setup=None):
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - start)
+    return summarize(latencies, time.perf_counter() - started)
+
+
+# --- Scénarios ---
+
+def _http_get(http, url):
+    def get():
+        response = http.get(url)
+        if response.status_code != 200:
+            raise RuntimeError(f"{url} : HTTP {response.status_code}")
+    return get
+
+
+def _auth_overhead(http):
+    url = '/reception/api/planning/'
+    state = {'etag': None}
+    outcomes = {'queries': 0}
+
+    def get():
+        headers = {'If-None-Match': state['etag']} if state['etag'] else {}
+        with CaptureQueriesContext(connection) as queries:
+            response = http.get(url, headers=headers)
+        if response.status_code == 200:
+            state['etag'] = response['ETag']
+        elif response.status_code != 304:
+            raise RuntimeError(f"{url} : HTTP {response.status_code}")
+        outcomes['queries'] = len(queries)
+    get.outcomes = outcomes
+    return get
+
+
+def _booking(rng):
+    rooms = list(Room.objects.exclude(status=Room.Status.MAINTENANCE).only('id', 'number', 'category', 'price_per_night'))
+    client_ids = list(Client.objects.values_list('id', flat=True)[:1000])
+    if not rooms or not client_ids:
+        raise ScenarioUnavailable("aucune chambre disponible ou aucun client")
+    start = timezone.localdate() + timedelta(days=400)
+    outcomes = {'created': 0, 'conflicts': 0}
+
+    def book():
+        # Quelques collisions volontaires : ~1 demande sur 5 tombe sur un séjour déjà pris
+        check_in = start + timedelta(days=rng.randrange(200))
+        try:
+            book_room(
+                Client(pk=rng.choice(client_ids)), rng.choice(rooms[:max(len(rooms) // 5, 1)]),
+                check_in, check_in + timedelta(days=rng.randint(1, 5)), Reservation.Status.CONFIRMEE,
+            )
+            outcomes['created'] += 1
+        except ValidationError:
+            outcomes['conflicts'] += 1
+    book.outcomes = outcomes
+    return book
+
+
+def _dashboard_stats():
+    template = Template("{% load dashboard_extras %}{% get_dashboard_stats as stats %}{{ stats.revenue }}")
+    factory = RequestFactory()
+
+    def render():
+        template.render(Context({'request': factory.get('/admin/')}))
+    return render
+
+
+def scenarios(http, rng):
+    """{nom: préparation du scénario -> (fonction, préparation avant chaque appel ou None)}"""
+    return {
+        'booking': lambda: (_booking(rng), None),
+        'dashboard_cold': lambda: (_http_get(http, '/dashboard/'), DashboardStats.invalidate),
+        'dashboard_warm': lambda: (_http_get(http, '/dashboard/'), None),
+        'dashboard_stats': lambda: (_dashboard_stats(), DashboardStats.invalidate),
+        'reception_rooms': lambda: (_http_get(http, '/reception/rooms/'), None),
+        'reception_reservations': lambda: (_http_get(http, '/reception/reservations/'), None),
+        'auth_overhead': lambda: (_auth_overhead(http), None),
+        'admin_reservations': lambda: (_http_get(http, '/admin/core/reservation/'), None),
+        'admin_invoices': lambda: (_http_get(http, '/admin/core/invoice/'), None),
+        'admin_payments': lambda: (_http_get(http, '/admin/core/payment/'), None),
+        'admin_clients': lambda: (_http_get(http, '/admin/core/client/'), None),
+    }
+
+
+def run(iterations=50, only=None, seed=0, rollback=False):
+    """Exécute les scénarios (tous, ou ceux de `only`) et retourne les résultats."""
+    if not rollback:
+        return _run(iterations, only, seed)
+    try:
+        with transaction.atomic():
+            try:
+                return _run(iterations, only, seed)
+            finally:
+                transaction.set_rollback(True)
+    finally:
+        # Valeurs mises en cache pendant le banc (statistiques, utilisateur du banc dont
+        # l'identifiant sera réattribué...) : elles décrivent des lignes annulées
+        from .signals import CACHE_NAMESPACES
+        caching.bump(*CACHE_NAMESPACES.values(), 'room_status')
+        DashboardStats.invalidate()
+
+
+def _run(iterations, only, seed):
+    user = User.objects.filter(username=BENCHMARK_USER).first() or User.objects.create_superuser(
+        BENCHMARK_USER, 'benchmark@hotel.com', None, role=User.Role.ADMIN
+    )
+    http = HttpClient()
+    http.force_login(user)
+    rng = random.Random(seed)
+    dataset = dataset_counts()
+
+    results, skipped = {}, {}
+    for name, prepare in scenarios(http, rng).items():
+        if only and name not in only:
+            continue
+        try:
+            func, setup = prepare()
+        except ScenarioUnavailable as exc:
+            skipped[name] = str(exc)
+            continue
+        func()  # échauffement (imports, compilation des templates)
+        results[name] = measure(func, iterations, setup)
+        results[name].update(getattr(func, 'outcomes', {}))
+    return {
+        'environment': environment(),
+        'dataset': dataset,
+        'iterations': iterations,
+        'scenarios': results,
+        'skipped': skipped,
+    }
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.display_name,
+        'machine': platform.machine(),
+    }
+
+
+def dataset_counts():
+    return {
+        'rooms': Room.objects.count(),
+        'clients': Client.objects.count(),
+        'reservations': Reservation.objects.count(),
+        'invoices': Invoice.objects.count(),
+        'payments': Payment.objects.count(),
+    }
+
+
+# --- Comparaison à la référence ---
+
+def compare(results, baseline, tolerance=0.2, metric='p95_ms'):
+    """
+    Retourne [(scénario, référence, mesure, écart relatif, régression ?)] pour les
+    scénarios présents des deux côtés.
+    """
+    rows = []
+    current, reference = results['scenarios'], baseline.get('scenarios', {})
+    for name in (n for n in current if n in reference):
+        before, after = reference[name][metric], current[name][metric]
+        change = (after - before) / before if before else 0.0
+        rows.append((name, before, after, change, change > tolerance))
+    return rows
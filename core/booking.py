@@ -0,0 +1,84 @@
+"""
+Chemin de réservation transactionnel.
+
+La vérification des chevauchements (Reservation.clean) et l'insertion
+(Reservation.save) doivent être atomiques, sinon deux réceptionnistes qui
+valident en même temps peuvent réserver la même chambre. On sérialise donc
+toutes les écritures par chambre :
+
+- dans un même processus, un verrou par chambre évite que deux threads
+  se disputent la base (réentrant : l'admin le tient déjà pendant la
+  validation du formulaire quand elle enregistre) ;
+- entre processus, la transaction verrouille la ligne Room avant la
+  vérification : SELECT ... FOR UPDATE sur PostgreSQL, et sur SQLite une
+  écriture neutre sur la chambre qui prend immédiatement le verrou
+  d'écriture de la base (équivalent de BEGIN IMMEDIATE).
+"""
+import threading
+from contextlib import contextmanager
+
+from django.db import connections, router, transaction
+from django.db.models import F
+
+from .models import Reservation, Room
+
+_registry_lock = threading.Lock()
+_room_locks = {}
+
+
+def _local_lock(room_id):
+    with _registry_lock:
+        lock = _room_locks.get(room_id)
+        if lock is None:
+            lock = _room_locks[room_id] = threading.RLock()
+        return lock
+
+
+def lock_room_rows(room_ids, using=None):
+    """
+    Verrouille les lignes Room jusqu'à la fin de la transaction en cours (à
+    appeler dans un bloc atomic). Les clés sont prises dans l'ordre croissant :
+    deux transactions qui verrouillent plusieurs chambres ne s'interbloquent pas.
+    """
+    using = using or router.db_for_write(Reservation)
+    rooms = Room.objects.using(using).filter(pk__in=room_ids)
+    if connections[using].features.has_select_for_update:
+        list(rooms.select_for_update().order_by('pk').values_list('pk'))
+    else:
+        # SQLite : une mise à jour sans effet promeut la transaction en écriture
+        rooms.update(status=F('status'))
+
+
+def _lock_room_row(room_id, using):
+    lock_room_rows([room_id], using)
+
+
+@contextmanager
+def room_lock(room_id):
+    """Ouvre une transaction pendant laquelle la chambre est réservée à l'appelant."""
+    using = router.db_for_write(Reservation)
+    with _local_lock(room_id):
+        with transaction.atomic(using=using):
+            _lock_room_row(room_id, using)
+            yield
+
+
+def save_reservation(reservation):
+    """
+    Enregistre (création ou modification) une réservation sous verrou de chambre.
+    Lève ValidationError si la chambre n'est plus disponible.
+    """
+    with room_lock(reservation.room_id):
+        reservation.save()
+    return reservation
+
+
+def book_room(client, room, check_in, check_out, status=Reservation.Status.EN_ATTENTE):
+    """Crée une réservation de façon sûre face aux accès concurrents."""
+    return save_reservation(Reservation(
+        client=client,
+        room=room,
+        check_in=check_in,
+        check_out=check_out,
+        status=status,
+    ))
@@ -0,0 +1,73 @@
+"""
+Cache-aside à clés versionnées.
+
+Chaque espace de noms ('stats', 'rooms', 'clients', 'users'...) a un numéro de
+version stocké dans le cache. Les clés des valeurs incluent ce numéro :
+`bump('rooms')` rend d'un coup toutes les entrées de l'espace inaccessibles,
+sans devoir les énumérer ni les supprimer (elles expirent d'elles-mêmes).
+Les signaux de core/signals.py incrémentent les versions à chaque écriture.
+
+La fraîcheur entre processus suppose un cache partagé (fichiers ou Redis,
+voir CACHES dans settings.py) : avec locmem, chaque worker a ses propres
+versions.
+"""
+import time
+from functools import wraps
+
+from django.core.cache import cache
+
+PREFIX = 'core'
+DEFAULT_TIMEOUT = 3600  # secondes
+
+_MISSING = object()
+
+
+def version_key(namespace):
+    return f"{PREFIX}:{namespace}:version"
+
+
+def version(namespace):
+    return cache.get_or_set(version_key(namespace), time.time_ns, None)
+
+
+def versions(*namespaces):
+    """Versions de plusieurs espaces en une lecture, jointes (clé de fragment de template)."""
+    found = cache.get_many([version_key(namespace) for namespace in namespaces])
+    return '.'.join(
+        str(found.get(version_key(namespace)) or version(namespace)) for namespace in namespaces
+    )
+
+
+def bump(*namespaces):
+    """Invalide toutes les valeurs cachées des espaces de noms donnés."""
+    for namespace in namespaces:
+        try:
+            cache.incr(version_key(namespace))
+        except ValueError:
+            # Version absente du cache : on repart d'une valeur jamais utilisée
+            cache.set(version_key(namespace), time.time_ns(), None)
+
+
+def key(namespace, name):
+    return f"{PREFIX}:{namespace}:v{version(namespace)}:{name}"
+
+
+def get_or_compute(namespace, name, compute, timeout=DEFAULT_TIMEOUT):
+    """Valeur cachée sous (namespace, name), calculée et stockée si absente (None compris)."""
+    cache_key = key(namespace, name)
+    value = cache.get(cache_key, _MISSING)
+    if value is _MISSING:
+        value = compute()
+        cache.set(cache_key, value, timeout)
+    return value
+
+
+def cache_aside(namespace, timeout=DEFAULT_TIMEOUT):
+    """Décorateur : résultat de la fonction caché par arguments (repr) dans `namespace`."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args):
+            name = func.__qualname__ + (repr(args) if args else '')
+            return get_or_compute(namespace, name, lambda: func(*args), timeout)
+        return wrapper
+    return decorator
@@ -0,0 +1,107 @@
+"""
+Vérification du profil de base de données actif (commande `check_database`).
+
+- réglages de connexion : PRAGMA SQLite (WAL, synchronous, busy_timeout,
+  mmap) ou, sous PostgreSQL, connexions persistantes / pool psycopg ;
+  en ASGI (SERVER_INTERFACE), CONN_MAX_AGE doit valoir 0 ;
+- index : chaque index et contrainte nommés des modèles de `core` existe bien
+  dans la base, ainsi que l'index de recherche propre au moteur (table FTS5
+  sous SQLite, index trigrammes sous PostgreSQL, voir core/search.py).
+"""
+from django.apps import apps
+from django.conf import settings
+from django.db import connection as default_connection
+
+from .search import FTS_TABLE
+
+TRGM_INDEX = 'core_client_search_trgm'
+
+# Réglages attendus du profil SQLite (voir DATABASES dans settings.py)
+SQLITE_EXPECTED = {
+    'synchronous': 1,  # NORMAL
+    'foreign_keys': 1,
+}
+
+
+def sqlite_settings(connection):
+    values = {}
+    with connection.cursor() as cursor:
+        for pragma in ('journal_mode', 'synchronous', 'busy_timeout', 'mmap_size', 'foreign_keys'):
+            cursor.execute(f'PRAGMA {pragma}')
+            row = cursor.fetchone()  # mmap_size ne répond rien pour une base en mémoire
+            values[pragma] = row[0] if row else None
+    values['transaction_mode'] = connection.transaction_mode
+    return values
+
+
+def postgresql_settings(connection):
+    connection.ensure_connection()
+    return {
+        'server_version': connection.pg_version,
+        'conn_max_age': connection.settings_dict['CONN_MAX_AGE'],
+        'health_checks': connection.settings_dict['CONN_HEALTH_CHECKS'],
+        'pool': bool(connection.settings_dict['OPTIONS'].get('pool')),
+    }
+
+
+def connection_settings(connection=default_connection):
+    if connection.vendor == 'sqlite':
+        return sqlite_settings(connection)
+    if connection.vendor == 'postgresql':
+        return postgresql_settings(connection)
+    return {}
+
+
+def settings_problems(connection=default_connection):
+    """Écarts entre les réglages effectifs et le profil attendu."""
+    problems = []
+    if connection.vendor == 'sqlite':
+        values = sqlite_settings(connection)
+        # Base en mémoire (tests) : pas de WAL possible
+        in_memory = connection.is_in_memory_db()
+        if not in_memory and values['journal_mode'] != 'wal':
+            problems.append(f"journal_mode={values['journal_mode']} (attendu : wal)")
+        for pragma, expected in SQLITE_EXPECTED.items():
+            if values[pragma] != expected:
+                problems.append(f"{pragma}={values[pragma]} (attendu : {expected})")
+        if not values['busy_timeout']:
+            problems.append("busy_timeout=0 : les écritures concurrentes échoueront (\"database is locked\")")
+    elif connection.vendor == 'postgresql':
+        values = postgresql_settings(connection)
+        if not values['pool'] and not values['conn_max_age']:
+            problems.append("ni pool ni CONN_MAX_AGE : une connexion est ouverte à chaque requête")
+    if getattr(settings, 'SERVER_INTERFACE', 'wsgi') == 'asgi' and connection.settings_dict['CONN_MAX_AGE']:
+        problems.append(
+            f"CONN_MAX_AGE={connection.settings_dict['CONN_MAX_AGE']} en ASGI : connexions persistantes "
+            "non sûres (attendu : 0, avec HOTEL_DB_POOL_SIZE sous PostgreSQL)"
+        )
+    return problems
+
+
+def expected_indexes():
+    """{table: {noms d'index et de contraintes déclarés}} pour les modèles de core."""
+    expected = {}
+    for model in apps.get_app_config('core').get_models():
+        names = {index.name for index in model._meta.indexes}
+        names |= {constraint.name for constraint in model._meta.constraints}
+        if names:
+            expected[model._meta.db_table] = names
+    return expected
+
+
+def missing_indexes(connection=default_connection):
+    """Index attendus absents de la base, sous la forme 'table.nom'."""
+    missing = []
+    with connection.cursor() as cursor:
+        tables = set(connection.introspection.table_names(cursor))
+        for table, names in sorted(expected_indexes().items()):
+            present = set(connection.introspection.get_constraints(cursor, table)) if table in tables else set()
+            missing += [f"{table}.{name}" for name in sorted(names - present)]
+
+        if connection.vendor == 'sqlite' and FTS_TABLE not in tables:
+            missing.append(f"{FTS_TABLE} (FTS5)")
+        elif connection.vendor == 'postgresql':
+            cursor.execute("SELECT 1 FROM pg_indexes WHERE indexname = %s", [TRGM_INDEX])
+            if cursor.fetchone() is None:
+                missing.append(f"core_client.{TRGM_INDEX} (pg_trgm)")
+    return missing
@@ -1,21 +1,64 @@
 from django import forms
 from django.core.exceptions import ValidationError
+from django.urls import reverse
 from django.utils import timezone
 from django.contrib.auth.forms import UserCreationForm
 from .models import Reservation, Room, Client, User
 
+
+class AutocompleteSelect(forms.Select):
+    """
+    Select alimenté par un endpoint d'autocomplétion (voir static/js/autocomplete.js).
+    Seule l'option sélectionnée est rendue : le HTML ne grossit plus avec la table.
+    """
+
+    def __init__(self, url_name, attrs=None):
+        super().__init__(attrs)
+        self.url_name = url_name
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        context['widget']['attrs']['data-autocomplete-url'] = reverse(self.url_name)
+        return context
+
+    def selected_keys(self, value):
+        # Valeurs brutes du POST : une clé invalide (client=abc) est ignorée, le champ
+        # signale déjà l'erreur ; la requête ne reçoit que des clés converties.
+        pk_field = self.choices.queryset.model._meta.pk
+        keys = []
+        for v in value:
+            if v in (None, ''):
+                continue
+            try:
+                keys.append(pk_field.to_python(v))
+            except (ValidationError, TypeError, ValueError):
+                continue
+        return keys
+
+    def optgroups(self, name, value, attrs=None):
+        selected = self.selected_keys(value)
+        options = [self.create_option(name, '', '---------', not selected, 0)]
+        if selected:
+            field = self.choices.field
+            for index, obj in enumerate(self.choices.queryset.filter(pk__in=selected), start=1):
+                options.append(self.create_option(
+                    name, obj.pk, field.label_from_instance(obj), True, index
+                ))
+        return [(None, options, 0)]
+
+
 class ReservationForm(forms.ModelForm):
-    # Champ client avec widget select2-like (standard select pour MVP)
+    # Champs client et chambre en autocomplétion : seule la clé choisie est validée
+    # (une requête), le formulaire ne sérialise plus toute la table.
     client = forms.ModelChoiceField(
         queryset=Client.objects.all(),
-        widget=forms.Select(attrs={'class': 'form-select'}),
+        widget=AutocompleteSelect('client_autocomplete', attrs={'class': 'form-select'}),
         label="Client"
     )
     
-    # Champ chambre avec filtrage possible
     room = forms.ModelChoiceField(
         queryset=Room.objects.all(),
-        widget=forms.Select(attrs={'class': 'form-select'}),
+        widget=AutocompleteSelect('room_autocomplete', attrs={'class': 'form-select'}),
         label="Chambre"
     )
 
@@ -38,9 +81,6 @@ class ReservationForm(forms.ModelForm):
         # Si une chambre est passée en initial, on la pré-sélectionne
         if 'initial' in kwargs and 'room' in kwargs['initial']:
             self.fields['room'].initial = kwargs['initial']['room']
-        
-        # Ordonner les chambres par numéro
-        self.fields['room'].queryset = Room.objects.all().order_by('number')
 
     def clean(self):
         cleaned_data = super().clean()
@@ -0,0 +1,118 @@
+"""
+Variantes d'images (vignettes) et avatars à initiales, produits localement.
+
+Les photos des chambres (Room.image) et des utilisateurs (User.profile_photo)
+sont conservées telles qu'envoyées ; les pages affichent des variantes
+redimensionnées au format WebP (quelques kilo-octets) :
+
+- nom déterministe sous MEDIA_ROOT/variants/, dérivé du nom du fichier source
+  et du format demandé (VARIANTS) ;
+- génération paresseuse : la balise {% image_variant %} pointe toujours vers
+  la vue image_variant, qui crée la variante au premier affichage puis sert le
+  fichier existant (MEDIA_URL n'est servi qu'en DEBUG, voir hotel_resilience/urls.py) ;
+- invalidation : quand la photo est remplacée, effacée ou que l'objet est
+  supprimé, les variantes de l'ancien fichier sont supprimées (core/signals.py).
+
+Sans photo, l'avatar est un SVG à initiales généré sur place (aucun appel à un
+service externe).
+"""
+import hashlib
+import os
+import tempfile
+from urllib.parse import quote
+
+from django.core.files.storage import default_storage
+from django.urls import reverse
+from django.utils.html import escape
+from PIL import Image, ImageOps
+
+# Format -> (largeur, hauteur) en pixels, recadrage centré
+VARIANTS = {
+    'card': (480, 320),    # cartes des chambres (réception)
+    'thumb': (160, 160),   # listes
+    'avatar': (240, 240),  # avatar 120 px, écrans haute densité
+}
+VARIANT_DIR = 'variants'
+# Seuls les dossiers d'envoi des modèles sont acceptés par la vue
+SOURCE_DIRS = ('rooms/', 'users/')
+WEBP_QUALITY = 80
+
+AVATAR_BACKGROUND = '#1a2a6c'
+
+
+def _digest(source_name):
+    return hashlib.sha1(source_name.encode()).hexdigest()[:16]
+
+
+def variant_name(source_name, spec):
+    digest = _digest(source_name)
+    return f'{VARIANT_DIR}/{digest[:2]}/{digest}-{spec}.webp'
+
+
+def is_source(source_name):
+    return source_name.startswith(SOURCE_DIRS) and '..' not in source_name.split('/')
+
+
+def generate(source_name, spec):
+    """Crée la variante (écriture atomique) si elle manque ; retourne son nom."""
+    name = variant_name(source_name, spec)
+    path = default_storage.path(name)
+    if os.path.exists(path):
+        return name
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with default_storage.open(source_name, 'rb') as source:
+        # UnidentifiedImageError si la source n'est pas une image lisible
+        image = ImageOps.exif_transpose(Image.open(source))
+        image = ImageOps.fit(image, VARIANTS[spec], Image.Resampling.LANCZOS)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+    # Fichier temporaire unique (processus et thread) : deux premiers affichages simultanés,
+    # même dans un seul worker (gthread, pool de threads ASGI), ne se gênent pas
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), suffix='.tmp', delete=False) as temporary:
+        try:
+            image.save(temporary, 'WEBP', quality=WEBP_QUALITY, method=6)
+        except BaseException:
+            temporary.close()
+            os.unlink(temporary.name)
+            raise
+    os.replace(temporary.name, path)
+    return name
+
+
+def variant_url(field_file, spec):
+    """URL de la vue qui génère puis sert la variante ; None sans image."""
+    if not field_file:
+        return None
+    return reverse('image_variant', args=[spec, field_file.name])
+
+
+def delete_variants(source_name):
+    for spec in VARIANTS:
+        name = variant_name(source_name, spec)
+        if default_storage.exists(name):
+            default_storage.delete(name)
+
+
+# --- Avatars ---
+
+def initials(*names):
+    letters = [name.strip()[0] for name in names if name and name.strip()]
+    return ''.join(letters[:2]).upper() or '?'
+
+
+def initials_avatar(text, size=VARIANTS['avatar'][0]):
+    """Avatar SVG à initiales, en URI data: (utilisable directement dans src)."""
+    svg = (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" viewBox="0 0 100 100">'
+        f'<rect width="100" height="100" fill="{AVATAR_BACKGROUND}"/>'
+        f'<text x="50" y="50" dy=".35em" text-anchor="middle" fill="#fff" '
+        f'font-family="Segoe UI, system-ui, sans-serif" font-size="40">{escape(text)}</text>'
+        f'</svg>'
+    )
+    return 'data:image/svg+xml,' + quote(svg)
+
+
+def avatar_url(user):
+    if user.profile_photo:
+        return variant_url(user.profile_photo, 'avatar')
+    return initials_avatar(initials(user.first_name, user.last_name) if user.first_name else initials(user.username))
@@ -0,0 +1,256 @@
+"""
+Import en masse de réservations (exports channel manager / OTA).
+
+Le fichier (CSV, JSON Lines ou tableau JSON) est lu en flux et traité par lots.
+Pour chaque lot :
+
+1. les lignes sont validées (dates, statut, chambre connue, client) ;
+2. les clients inconnus sont créés en une fois (bulk_create) ;
+3. les chambres du lot sont verrouillées (booking.lock_room_rows, comme une
+   réservation au comptoir), puis les conflits sont vérifiés en mémoire avec un
+   AvailabilityIndex construit en une requête, y compris entre lignes du même lot ;
+4. réservations et factures (montant calculé en lot) sont insérées avec
+   bulk_create, sans passer par Reservation.save ni les signaux ;
+5. les agrégats journaliers et l'index de recherche sont mis à jour en lot.
+
+Le statut des chambres est réconcilié une seule fois, à la fin de l'import.
+Chaque ligne rejetée est reportée avec son numéro et la raison du rejet.
+
+Colonnes attendues : room, email, check_in, check_out, et en option status,
+first_name, last_name, phone, id_document (obligatoires pour créer un client).
+"""
+import csv
+import json
+from dataclasses import dataclass, field
+from datetime import date
+from itertools import islice
+
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Lower
+
+from . import caching, rollups, search
+from .availability import AvailabilityIndex
+from .booking import lock_room_rows
+from .invoicing import invoice_total
+from .models import Client, Invoice, Reservation
+from .reference import rooms_by_number
+from .room_status import reconcile_room_statuses
+from .stats import DashboardStats
+
+CHUNK_SIZE = 2000
+
+
+@dataclass
+class ImportReport:
+    imported: int = 0
+    clients_created: int = 0
+    errors: list = field(default_factory=list)  # [(numéro de ligne, message)]
+
+    @property
+    def rejected(self):
+        return len(self.errors)
+
+    def reject(self, line, message):
+        self.errors.append((line, message))
+
+
+class RowError(ValueError):
+    pass
+
+
+# --- Lecture ---
+
+def read_rows(stream, fmt='csv'):
+    """Itère sur (numéro de ligne, dict) sans charger tout le fichier (sauf tableau JSON)."""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    elif fmt == 'jsonl':
+        for line_num, line in enumerate(stream, start=1):
+            if line.strip():
+                try:
+                    yield line_num, json.loads(line)
+                except ValueError:
+                    yield line_num, None
+    elif fmt == 'json':
+        for index, row in enumerate(json.load(stream), start=1):
+            yield index, row
+    else:
+        raise ValueError(f"Format inconnu : {fmt}")
+
+
+def chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+# --- Validation ---
+
+def _parse_date(value, label):
+    try:
+        return date.fromisoformat(str(value).strip())
+    except (TypeError, ValueError):
+        raise RowError(f"{label} invalide : {value!r}")
+
+
+def parse_row(row, rooms):
+    if not isinstance(row, dict):
+        raise RowError("Ligne illisible.")
+    number = str(row.get('room') or '').strip()
+    if number not in rooms:
+        raise RowError(f"Chambre inconnue : {number!r}")
+    email = str(row.get('email') or '').strip().lower()
+    if not email:
+        raise RowError("Email du client manquant.")
+    check_in = _parse_date(row.get('check_in'), "Date d'arrivée")
+    check_out = _parse_date(row.get('check_out'), "Date de départ")
+    if check_in >= check_out:
+        raise RowError("La date de départ doit être postérieure à la date d'arrivée.")
+    status = str(row.get('status') or Reservation.Status.CONFIRMEE).strip().upper()
+    if status not in Reservation.Status.values:
+        raise RowError(f"Statut inconnu : {status!r}")
+    return {
+        'room': rooms[number],
+        'email': email,
+        'check_in': check_in,
+        'check_out': check_out,
+        'status': status,
+        'client': {
+            'first_name': str(row.get('first_name') or '').strip(),
+            'last_name': str(row.get('last_name') or '').strip(),
+            'phone': str(row.get('phone') or '').strip(),
+            'id_document': str(row.get('id_document') or '').strip(),
+        },
+    }
+
+
+# --- Import ---
+
+def _known_clients(emails):
+    """{email en minuscules: id} des clients existants ; en base, la casse d'origine est conservée."""
+    return dict(
+        Client.objects.annotate(email_key=Lower('email'))
+        .filter(email_key__in=emails)
+        .values_list('email_key', 'id')
+    )
+
+
+def _create_clients(rows, known, report):
+    """
+    Crée en une fois les clients inconnus des lignes acceptées ; complète `known`.
+    Retourne les lignes dont le client existe ; les autres sont rejetées.
+    """
+    new_clients = {}
+    for _, row in rows:
+        if row['email'] not in known and row['email'] not in new_clients:
+            client = Client(email=row['email'], **row['client'])
+            client.search_key = search.client_search_key(client)
+            new_clients[row['email']] = client
+    if not new_clients:
+        return rows
+
+    try:
+        with transaction.atomic():
+            created = Client.objects.bulk_create(new_clients.values())
+    except IntegrityError:
+        # Email enregistré entre-temps (comptoir, autre import) : les clients existants
+        # sont relus, les autres créés un par un ; un échec ne rejette que ses lignes.
+        known.update(_known_clients(new_clients))
+        created = []
+        for email, client in new_clients.items():
+            if email in known:
+                continue
+            try:
+                with transaction.atomic():
+                    created += Client.objects.bulk_create([client])
+            except IntegrityError:
+                pass
+    search.index_clients(created)
+    report.clients_created += len(created)
+    known.update({client.email: client.pk for client in created})
+
+    kept = []
+    for line, row in rows:
+        if row['email'] in known:
+            kept.append((line, row))
+        else:
+            report.reject(line, f"Client {row['email']} : création impossible (email déjà utilisé).")
+    return kept
+
+
+def import_chunk(raw_rows, rooms, report):
+    rows = []
+    for line, raw in raw_rows:
+        try:
+            rows.append((line, parse_row(raw, rooms)))
+        except RowError as exc:
+            report.reject(line, str(exc))
+    if not rows:
+        return
+
+    room_ids = {row['room'].pk for _, row in rows}
+    with transaction.atomic():
+        # Sans verrou, une réservation du comptoir validée entre la lecture de l'index
+        # et bulk_create produirait un double séjour (READ COMMITTED sur PostgreSQL)
+        lock_room_rows(room_ids)
+        known = _known_clients({row['email'] for _, row in rows})
+        index = AvailabilityIndex.for_window(
+            min(row['check_in'] for _, row in rows),
+            max(row['check_out'] for _, row in rows),
+            room_ids=room_ids,
+        )
+
+        accepted = []
+        for line, row in rows:
+            details = row['client']
+            if row['email'] not in known and not (details['first_name'] and details['last_name']):
+                report.reject(line, f"Client inconnu ({row['email']}) : prénom et nom requis pour le créer.")
+                continue
+            room = row['room']
+            if row['status'] != Reservation.Status.ANNULEE:
+                if not index.is_free(room.pk, row['check_in'], row['check_out']):
+                    report.reject(line, f"Chambre {room.number} déjà réservée sur tout ou partie de la période.")
+                    continue
+                index.add(room.pk, row['check_in'], row['check_out'])
+            accepted.append((line, row))
+
+        accepted = _create_clients(accepted, known, report)
+        reservations = [
+            Reservation(
+                client_id=known[row['email']],
+                room=row['room'],
+                check_in=row['check_in'],
+                check_out=row['check_out'],
+                status=row['status'],
+            )
+            for _, row in accepted
+        ]
+        Reservation.objects.bulk_create(reservations)
+        invoices = []
+        for res in reservations:
+            total = invoice_total(res.check_in, res.check_out, res.room.price_per_night)
+            invoices.append(Invoice(reservation=res, total_amount=total, balance=total))
+        Invoice.objects.bulk_create(invoices)
+        rollups.apply_reservations(rollups.reservation_snapshot(res, res.room.category) for res in reservations)
+    report.imported += len(reservations)
+
+
+def import_reservations(stream, fmt='csv', chunk_size=CHUNK_SIZE):
+    """Importe un flux de réservations et retourne un ImportReport."""
+    report = ImportReport()
+    rooms = rooms_by_number()
+    for raw_rows in chunks(read_rows(stream, fmt), chunk_size):
+        import_chunk(raw_rows, rooms, report)
+    report.errors.sort()
+
+    if report.imported:
+        reconcile_room_statuses()
+        DashboardStats.invalidate()
+        # bulk_create n'émet pas de signaux
+        caching.bump('reservations', 'clients')
+    return report
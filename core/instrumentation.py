@@ -0,0 +1,231 @@
+"""
+Mesure des requêtes HTTP : nombre de requêtes SQL, temps base de données,
+temps de rendu des templates et temps total.
+
+Activée par REQUEST_METRICS (variable d'environnement HOTEL_REQUEST_METRICS=1),
+la middleware :
+
+- ajoute un en-tête `Server-Timing` (visible dans l'onglet Réseau du navigateur) ;
+- écrit une ligne de log structurée par requête (logger `core.metrics`) ;
+- alimente un histogramme glissant en mémoire, par vue, consultable par les
+  administrateurs sur /ops/metrics/ ;
+- compare le nombre de requêtes SQL au budget de la vue
+  (REQUEST_METRICS_BUDGETS, ex. {'dashboard': 8}) : dépassement journalisé, ou
+  exception QueryBudgetExceeded si REQUEST_METRICS_STRICT (tests).
+
+Les sondes sont posées une fois, au démarrage (install(), appelée par
+CoreConfig.ready) : chaque connexion ouverte reçoit un execute_wrapper
+permanent et le rendu des templates est chronométré. Elles ne mesurent que
+lorsqu'une requête est en cours (variable de contexte `_current`, propagée par
+sync_to_async aux threads qui exécutent l'ORM, y compris ceux de
+core/parallel.py). La middleware fonctionne en WSGI comme en ASGI, sans
+changement de thread.
+"""
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.backends.django import Template as DjangoTemplate
+
+logger = logging.getLogger('core.metrics')
+
+SAMPLES_PER_VIEW = 500
+
+_current = ContextVar('request_metrics', default=None)
+# Requêtes parallèles (core/parallel.py) : plusieurs threads pour une même requête HTTP
+_counter_lock = threading.Lock()
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+@dataclass
+class RequestMetrics:
+    view: str = ''
+    queries: int = 0
+    db_ms: float = 0.0
+    template_ms: float = 0.0
+    total_ms: float = 0.0
+
+    def server_timing(self):
+        return (
+            f'db;dur={self.db_ms:.1f};desc="{self.queries} requêtes SQL", '
+            f'tpl;dur={self.template_ms:.1f}, '
+            f'total;dur={self.total_ms:.1f}'
+        )
+
+
+# --- Collecte ---
+
+def _record_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = (time.perf_counter() - start) * 1000
+        with _counter_lock:
+            metrics.queries += 1
+            metrics.db_ms += elapsed
+
+
+_template_render = DjangoTemplate.render
+
+
+def _timed_render(self, context=None, request=None):
+    metrics = _current.get()
+    if metrics is None:
+        return _template_render(self, context, request)
+    start = time.perf_counter()
+    try:
+        return _template_render(self, context, request)
+    finally:
+        elapsed = (time.perf_counter() - start) * 1000
+        with _counter_lock:
+            metrics.template_ms += elapsed
+
+
+def _wrap_connection(connection, **kwargs):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+_installed = False
+
+
+def install():
+    """Pose les sondes (idempotent) : connexions déjà ouvertes de ce thread et futures connexions."""
+    global _installed
+    DjangoTemplate.render = _timed_render
+    connection_created.connect(_wrap_connection, dispatch_uid='core.instrumentation')
+    _installed = True
+    wrap_connections()
+
+
+def uninstall():
+    """Retire les sondes posées par install() (tests) ; les connexions des autres threads gardent un wrapper inerte."""
+    global _installed
+    DjangoTemplate.render = _template_render
+    connection_created.disconnect(dispatch_uid='core.instrumentation')
+    _installed = False
+    for connection in connections.all(initialized_only=True):
+        if _record_query in connection.execute_wrappers:
+            connection.execute_wrappers.remove(_record_query)
+
+
+def wrap_connections():
+    """Connexions de ce thread ouvertes avant install() (threads de longue durée, voir core/parallel.py)."""
+    if _installed:
+        for connection in connections.all(initialized_only=True):
+            _wrap_connection(connection)
+
+
+# --- Histogramme glissant ---
+
+def percentile(values, fraction):
+    """Percentile par rang le plus proche (fraction entre 0 et 1)."""
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+class MetricsRegistry:
+    """Derniers échantillons par vue (thread-safe), résumés en percentiles."""
+
+    def __init__(self, size=SAMPLES_PER_VIEW):
+        self._lock = threading.Lock()
+        self._samples = defaultdict(lambda: deque(maxlen=size))
+
+    def add(self, metrics):
+        with self._lock:
+            self._samples[metrics.view].append(metrics)
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+
+    def summary(self):
+        with self._lock:
+            samples = {view: list(items) for view, items in self._samples.items()}
+        report = {}
+        for view, items in sorted(samples.items()):
+            totals = [m.total_ms for m in items]
+            queries = [m.queries for m in items]
+            report[view] = {
+                'count': len(items),
+                'queries_max': max(queries),
+                'queries_avg': round(sum(queries) / len(queries), 1),
+                'db_ms_avg': round(sum(m.db_ms for m in items) / len(items), 1),
+                'template_ms_avg': round(sum(m.template_ms for m in items) / len(items), 1),
+                'total_ms_p50': round(percentile(totals, 0.5), 1),
+                'total_ms_p95': round(percentile(totals, 0.95), 1),
+                'total_ms_max': round(max(totals), 1),
+            }
+        return report
+
+
+registry = MetricsRegistry()
+
+
+# --- Middleware ---
+
+class RequestMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics, start)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics, start)
+
+    def finish(self, request, response, metrics, start):
+        metrics.total_ms = (time.perf_counter() - start) * 1000
+
+        match = request.resolver_match
+        metrics.view = match.view_name if match else request.path
+        response['Server-Timing'] = metrics.server_timing()
+        registry.add(metrics)
+        logger.info('request', extra={'metrics': asdict(metrics), 'path': request.path, 'status': response.status_code})
+        self.check_budget(metrics)
+        return response
+
+    @staticmethod
+    def check_budget(metrics):
+        budget = getattr(settings, 'REQUEST_METRICS_BUDGETS', {}).get(metrics.view)
+        if budget is None or metrics.queries <= budget:
+            return
+        message = f"{metrics.view} : {metrics.queries} requêtes SQL (budget {budget})"
+        if getattr(settings, 'REQUEST_METRICS_STRICT', False):
+            raise QueryBudgetExceeded(message)
+        logger.warning(message, extra={'metrics': asdict(metrics)})
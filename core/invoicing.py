@@ -0,0 +1,172 @@
+"""
+Calcul des montants de facture.
+
+Le montant d'une facture vaut nuits × prix par nuit de la chambre (au moins
+une nuit). Il est calculé à la création ; lorsque la chambre ou les dates d'une
+réservation changent, la facture est seulement marquée `needs_recalculation`
+par le signal, et `recalculate_invoices` (commande du même nom) recalcule les
+montants en lot : une requête de lecture en flux, puis un UPDATE par groupe de
+factures partageant le même nouveau montant.
+
+Les factures PAYEE sont figées par défaut : leur montant a été encaissé.
+
+Chaque facture porte aussi `amount_paid` et `balance` (reste à payer),
+dénormalisés : les signaux des paiements les ajustent par incréments F()
+atomiques, et le statut (IMPAYEE / PARTIELLE / PAYEE) en découle dans le même
+UPDATE. Invoice.save ne les écrit jamais depuis l'instance (refresh_balances).
+`sync_balances` (commande `sync_invoice_balances`) les vérifie ou les
+recalcule depuis la table des paiements, dans l'UPDATE lui-même.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.db.models.lookups import LessThanOrEqual
+
+from .models import Invoice, Payment
+from .stats import DashboardStats
+
+CHUNK_SIZE = 2000
+UPDATE_BATCH = 500
+MONEY = DecimalField(max_digits=10, decimal_places=2)
+
+
+def nights(check_in, check_out):
+    """Nombre de nuits facturées (au moins 1 nuit si même jour)."""
+    return max((check_out - check_in).days, 1)
+
+
+def invoice_total(check_in, check_out, price_per_night):
+    return nights(check_in, check_out) * price_per_night
+
+
+# --- Solde et statut ---
+
+def invoice_status(amount_paid, balance):
+    if amount_paid <= 0:
+        return Invoice.Status.IMPAYEE
+    if balance <= 0:
+        return Invoice.Status.PAYEE
+    return Invoice.Status.PARTIELLE
+
+
+def status_expression(amount_paid, balance):
+    """Équivalent SQL d'invoice_status, pour les UPDATE ensemblistes."""
+    return Case(
+        When(LessThanOrEqual(amount_paid, 0), then=Value(Invoice.Status.IMPAYEE)),
+        When(LessThanOrEqual(balance, 0), then=Value(Invoice.Status.PAYEE)),
+        default=Value(Invoice.Status.PARTIELLE),
+    )
+
+
+def apply_payment(snapshot, sign):
+    """Ajoute (sign=1) ou retire (sign=-1) un paiement (facture, montant) du solde de sa facture."""
+    if snapshot is None:
+        return
+    invoice_id, amount = snapshot
+    delta = sign * amount
+    Invoice.objects.filter(pk=invoice_id).update(
+        amount_paid=F('amount_paid') + delta,
+        balance=F('balance') - delta,
+        status=status_expression(F('amount_paid') + delta, F('balance') - delta),
+    )
+
+
+def payment_snapshot(payment):
+    return (payment.invoice_id, payment.amount)
+
+
+def refresh_balances(invoices):
+    """Recalcule solde et statut des factures à partir de leur amount_paid en base."""
+    balance = Coalesce(F('total_amount'), Value(0), output_field=MONEY) - F('amount_paid')
+    return invoices.update(balance=balance, status=status_expression(F('amount_paid'), balance))
+
+
+def _paid_total():
+    payments = Payment.objects.filter(invoice=OuterRef('pk')).order_by().values('invoice')
+    return Coalesce(Subquery(payments.annotate(total=Sum('amount')).values('total')), Value(0), output_field=MONEY)
+
+
+def sync_balances(dry_run=False, chunk_size=CHUNK_SIZE):
+    """
+    Compare montant payé, solde et statut de chaque facture à la somme de ses
+    paiements ; corrige les écarts sauf avec `dry_run`. Retourne les ids en écart.
+    """
+    paid = dict(
+        Payment.objects.order_by().values('invoice_id').annotate(total=Sum('amount')).values_list('invoice_id', 'total')
+    )
+    rows = Invoice.objects.order_by().values_list('id', 'total_amount', 'amount_paid', 'balance', 'status')
+    drifted = []
+    for pk, total, amount_paid, balance, status in rows.iterator(chunk_size=chunk_size):
+        expected_paid = paid.get(pk, 0)
+        expected_balance = (total or 0) - expected_paid
+        expected = (expected_paid, expected_balance, invoice_status(expected_paid, expected_balance))
+        if (amount_paid, balance, status) != expected:
+            drifted.append(pk)
+    if drifted and not dry_run:
+        # Montant payé relu dans l'UPDATE : un paiement enregistré depuis la lecture est compté
+        paid_total = _paid_total()
+        balance = Coalesce(F('total_amount'), Value(0), output_field=MONEY) - paid_total
+        for start in range(0, len(drifted), UPDATE_BATCH):
+            Invoice.objects.filter(pk__in=drifted[start:start + UPDATE_BATCH]).update(
+                amount_paid=paid_total,
+                balance=balance,
+                status=status_expression(paid_total, balance),
+            )
+        DashboardStats.invalidate()
+    return drifted
+
+
+# --- Montant des factures ---
+
+def mark_for_recalculation(reservation_ids):
+    return Invoice.objects.filter(reservation_id__in=reservation_ids).update(needs_recalculation=True)
+
+
+def stale_invoices(dirty_only=False, include_paid=False, chunk_size=CHUNK_SIZE):
+    """
+    Itère sur (id, montant attendu, montant faux ?) des factures à traiter :
+    montant enregistré faux, ou facture marquée à recalculer.
+    """
+    invoices = Invoice.objects.all()
+    if dirty_only:
+        invoices = invoices.filter(needs_recalculation=True)
+    if not include_paid:
+        invoices = invoices.exclude(status=Invoice.Status.PAYEE)
+    rows = invoices.order_by().values_list(
+        'id', 'total_amount', 'needs_recalculation',
+        'reservation__check_in', 'reservation__check_out', 'reservation__room__price_per_night',
+    )
+    for pk, total, dirty, check_in, check_out, price in rows.iterator(chunk_size=chunk_size):
+        expected = invoice_total(check_in, check_out, price)
+        if expected != total or dirty:
+            yield pk, expected, expected != total
+
+
+def recalculate_invoices(dirty_only=False, include_paid=False, dry_run=False, chunk_size=CHUNK_SIZE):
+    """
+    Recalcule en lot le montant des factures. Retourne le nombre de factures
+    dont le montant a changé (ou changerait, avec `dry_run`).
+    """
+    by_total = defaultdict(list)
+    changed = 0
+    for pk, expected, differs in stale_invoices(dirty_only, include_paid, chunk_size):
+        by_total[expected].append(pk)
+        changed += differs
+    if dry_run:
+        return changed
+
+    with transaction.atomic():
+        for total, ids in by_total.items():
+            for start in range(0, len(ids), UPDATE_BATCH):
+                Invoice.objects.filter(pk__in=ids[start:start + UPDATE_BATCH]).update(
+                    total_amount=total,
+                    balance=total - F('amount_paid'),
+                    status=status_expression(F('amount_paid'), total - F('amount_paid')),
+                    needs_recalculation=False,
+                )
+    if changed:
+        # update() n'émet pas post_save : on invalide nous-mêmes les statistiques
+        DashboardStats.invalidate()
+    return changed
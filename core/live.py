@@ -0,0 +1,297 @@
+"""
+Tableau de la réception en direct (Server-Sent Events).
+
+Au lieu de recharger la liste des chambres ou des réservations, chaque écran
+ouvre un flux SSE (/reception/live/) et reçoit de petits messages (« deltas »)
+quand une chambre change de statut ou qu'une réservation est créée, modifiée
+ou supprimée ; static/js/live_board.js les applique aux cartes et aux lignes
+affichées. La charge dépend du nombre de changements, pas du nombre d'écrans.
+
+- Les deltas sont publiés au commit de la transaction (core/signals.py et
+  core/room_status.py, dont le bulk_update n'émet pas de signal).
+- Broadcaster : diffusion dans le processus, une file asyncio par flux ouvert,
+  plus un historique court pour reprendre après une reconnexion (Last-Event-ID) ;
+  un écran trop en retard reçoit `reload` et recharge la page.
+- Plusieurs processus (LIVE_BROKER = 'cache', défaut avec Redis) : chaque
+  delta est aussi écrit dans le cache partagé sous un numéro de séquence
+  commun (cache.incr, qui doit être atomique entre processus : Redis, pas le
+  cache fichiers) ; une seule tâche par worker relit les nouveaux numéros
+  (POLL_INTERVAL) et les diffuse à ses propres écrans. Les deltas des autres
+  workers, de l'administration et des commandes (reconcile_room_statuses
+  --loop, import_reservations) arrivent ainsi sur tous les écrans, et une
+  reconnexion à un autre worker reprend depuis le cache, pas depuis
+  l'historique du processus.
+- LIVE_BROKER = 'local' ne convient qu'à un seul processus (développement,
+  un seul worker ASGI) : gunicorn.conf.py refuse plusieurs workers ASGI sans lui.
+
+Les flux sont servis en ASGI (HOTEL_SERVER=asgi, voir gunicorn.conf.py). En
+WSGI, un flux bloquerait un worker par écran : la vue répond 204 et le
+navigateur n'ouvre pas de flux (rechargement manuel, comme avant).
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Reservation, Room
+
+HISTORY_SIZE = 200
+QUEUE_SIZE = 100
+HEARTBEAT = 15      # secondes : commentaire SSE pour garder la connexion ouverte
+POLL_INTERVAL = 1   # secondes : relecture du cache partagé (LIVE_BROKER = 'cache')
+EVENT_TIMEOUT = 300  # secondes de vie d'un delta dans le cache partagé
+RETRY_MS = 5000
+
+RELOAD = (None, 'reload', {})
+
+# Statut -> (bandeau, badge) des cartes de chambre ; RESERVEE et inconnus : bg-warning
+ROOM_STATUS_CLASSES = {
+    Room.Status.LIBRE: ('status-free', 'bg-success'),
+    Room.Status.OCCUPEE: ('status-busy', 'bg-danger'),
+    Room.Status.MAINTENANCE: ('status-maint', 'bg-secondary'),
+}
+DEFAULT_STATUS_CLASSES = ('bg-warning', 'bg-warning')
+
+RESERVATION_STATUS_BADGES = {
+    Reservation.Status.CONFIRMEE: 'bg-success',
+    Reservation.Status.EN_ATTENTE: 'bg-warning text-dark',
+    Reservation.Status.ANNULEE: 'bg-danger',
+    Reservation.Status.TERMINEE: 'bg-secondary',
+}
+
+
+def room_status_classes(status):
+    return ROOM_STATUS_CLASSES.get(status, DEFAULT_STATUS_CLASSES)
+
+
+# --- Deltas ---
+
+def room_delta(room):
+    strip, badge = room_status_classes(room.status)
+    return {
+        'id': room.pk,
+        'number': room.number,
+        'status': room.status,
+        'label': Room.Status(room.status).label,
+        'strip': strip,
+        'badge': badge,
+    }
+
+
+def reservation_delta(reservation, created=False, deleted=False):
+    return {
+        'id': reservation.pk,
+        'room_id': reservation.room_id,
+        'check_in': reservation.check_in.isoformat(),
+        'check_out': reservation.check_out.isoformat(),
+        'status': reservation.status,
+        'label': Reservation.Status(reservation.status).label,
+        'badge': RESERVATION_STATUS_BADGES.get(reservation.status, 'bg-secondary'),
+        'created': created,
+        'deleted': deleted,
+    }
+
+
+def format_event(seq, kind, data):
+    """Message SSE : id (reprise), type et données JSON compactes."""
+    lines = [f'id: {seq}'] if seq is not None else []
+    lines += [f'event: {kind}', 'data: ' + json.dumps(data, separators=(',', ':'))]
+    return '\n'.join(lines) + '\n\n'
+
+
+# --- Diffusion dans le processus ---
+
+def _offer(queue, item):
+    try:
+        queue.put_nowait(item)
+    except asyncio.QueueFull:
+        # Écran trop lent : on abandonne les deltas en attente, il rechargera la page
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(RELOAD)
+
+
+class Broadcaster:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}  # file -> boucle d'événements du flux
+        self._history = deque(maxlen=HISTORY_SIZE)
+        self._seq = 0
+        self._poller = None
+
+    def next_seq(self):
+        with self._lock:
+            self._seq += 1
+            return self._seq
+
+    def dispatch(self, seq, kind, data):
+        """Appelable depuis n'importe quel thread (signaux, tâche de relecture)."""
+        item = (seq, kind, data)
+        with self._lock:
+            self._history.append(item)
+            subscribers = list(self._subscribers.items())
+        for queue, loop in subscribers:
+            try:
+                loop.call_soon_threadsafe(_offer, queue, item)
+            except RuntimeError:  # boucle fermée : flux abandonné
+                self.unsubscribe(queue)
+
+    def subscribe(self, last_id=None):
+        """(file, deltas manqués depuis last_id) ; RELOAD si last_id est trop ancien."""
+        queue = asyncio.Queue(QUEUE_SIZE)
+        with self._lock:
+            self._subscribers[queue] = asyncio.get_running_loop()
+            backlog = self._backlog(last_id)
+        return queue, backlog
+
+    def unsubscribe(self, queue):
+        with self._lock:
+            self._subscribers.pop(queue, None)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def _backlog(self, last_id):
+        if last_id is None:
+            return []
+        if not self._history:
+            return [RELOAD]
+        seqs = [seq for seq, _, _ in self._history]
+        # Trop ancien (historique dépassé) ou inconnu (processus redémarré) : rechargement
+        if last_id < min(seqs) - 1 or last_id > max(seqs):
+            return [RELOAD]
+        return [item for item in self._history if item[0] > last_id]
+
+
+broadcaster = Broadcaster()
+
+
+# --- Diffusion entre workers (cache partagé) ---
+
+SEQ_KEY = 'core:live:seq'
+
+
+def _event_key(seq):
+    return f'core:live:event:{seq}'
+
+
+def shared_broker():
+    return getattr(settings, 'LIVE_BROKER', 'local') == 'cache'
+
+
+def _shared_seq():
+    cache.add(SEQ_KEY, 0, None)
+    return cache.incr(SEQ_KEY)
+
+
+def _read_events(after):
+    """(dernier numéro attribué, {numéro: (pid, type, données)} des deltas présents après `after`)."""
+    last = cache.get(SEQ_KEY) or 0
+    if last <= after:
+        return last, {}
+    found = cache.get_many([_event_key(seq) for seq in range(after + 1, last + 1)])
+    return last, {seq: found[_event_key(seq)] for seq in range(after + 1, last + 1) if _event_key(seq) in found}
+
+
+def fetch_remote(after, gaps=None):
+    """
+    (dernier numéro lu, deltas publiés par d'autres processus depuis `after`).
+    `gaps` ({numéro manquant: instant où il a été vu manquant}) est conservé par
+    l'appelant d'un passage à l'autre.
+    """
+    last, entries = _read_events(after)
+    gaps = {} if gaps is None else gaps
+    now = time.monotonic()
+    # Numéro attribué mais pas encore écrit (entre incr et set), même si des numéros
+    # suivants le sont déjà : la lecture s'arrête au trou et le reprend au passage
+    # suivant. Il n'est sauté (delta expiré, publieur interrompu) qu'après EVENT_TIMEOUT.
+    read = after
+    for seq in range(after + 1, last + 1):
+        if seq not in entries and now - gaps.setdefault(seq, now) < EVENT_TIMEOUT:
+            break
+        gaps.pop(seq, None)
+        read = seq
+    pid = os.getpid()
+    return read, [(seq, *entry[1:]) for seq, entry in sorted(entries.items()) if seq <= read and entry[0] != pid]
+
+
+def shared_backlog(last_id):
+    """Deltas manqués depuis last_id, tous processus confondus ; [RELOAD] si l'un manque."""
+    last, entries = _read_events(last_id)
+    if last_id > last or last - last_id > HISTORY_SIZE or len(entries) != last - last_id:
+        return [RELOAD]
+    return [(seq, *entry[1:]) for seq, entry in sorted(entries.items())]
+
+
+async def _poll():
+    # Une tâche par worker tant qu'au moins un écran est connecté
+    last = await asyncio.to_thread(lambda: cache.get(SEQ_KEY) or 0)
+    gaps = {}
+    while broadcaster.subscriber_count():
+        await asyncio.sleep(POLL_INTERVAL)
+        last, events = await asyncio.to_thread(fetch_remote, last, gaps)
+        for event in events:
+            broadcaster.dispatch(*event)
+
+
+def ensure_poller():
+    if not shared_broker():
+        return
+    loop = asyncio.get_running_loop()
+    poller = broadcaster._poller
+    if poller is None or poller.done() or poller.get_loop() is not loop:
+        broadcaster._poller = loop.create_task(_poll())
+
+
+# --- Publication ---
+
+def publish(kind, data):
+    if shared_broker():
+        seq = _shared_seq()
+        cache.set(_event_key(seq), (os.getpid(), kind, data), EVENT_TIMEOUT)
+    else:
+        seq = broadcaster.next_seq()
+    broadcaster.dispatch(seq, kind, data)
+
+
+def publish_on_commit(kind, data):
+    transaction.on_commit(lambda: publish(kind, data))
+
+
+def publish_rooms(rooms):
+    for room in rooms:
+        publish_on_commit('room', room_delta(room))
+
+
+# --- Flux d'un écran ---
+
+async def stream(last_id=None):
+    shared = shared_broker()
+    # Abonnement avant la lecture de l'historique partagé : rien n'est perdu entre les deux
+    queue, backlog = broadcaster.subscribe(None if shared else last_id)
+    ensure_poller()
+    try:
+        if shared and last_id is not None:
+            backlog = await asyncio.to_thread(shared_backlog, last_id)
+        replayed = {item[0] for item in backlog}
+        yield f'retry: {RETRY_MS}\n\n'
+        for item in backlog:
+            yield format_event(*item)
+        while True:
+            try:
+                item = await asyncio.wait_for(queue.get(), HEARTBEAT)
+            except asyncio.TimeoutError:
+                yield ': ping\n\n'
+                continue
+            if item[0] is not None and item[0] in replayed:
+                continue
+            yield format_event(*item)
+    finally:
+        broadcaster.unsubscribe(queue)
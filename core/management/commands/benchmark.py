@@ -0,0 +1,94 @@
+import json
+from pathlib import Path
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from core import benchmarks
+
+class Command(BaseCommand):
+    help = (
+        'Mesure débit et latences (p50/p95/p99) des chemins critiques : réservation, '
+        'tableau de bord, réception et administration. Par défaut sur une base de test '
+        'jetable peuplée avec populate_db, puis comparaison à une référence JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', choices=benchmarks.DATASETS, default='small',
+                            help="Jeu de données : small (~1k), medium (~100k), large (~1M réservations)")
+        parser.add_argument('--iterations', type=int, default=50, help="Appels mesurés par scénario")
+        parser.add_argument('--scenario', action='append', dest='only', help="Limiter à ce scénario (répétable)")
+        parser.add_argument('--output', help="Fichier JSON des résultats")
+        parser.add_argument('--baseline', help="Référence JSON à laquelle comparer les résultats")
+        parser.add_argument('--save-baseline', action='store_true', help="Écrit les résultats dans --baseline")
+        parser.add_argument('--tolerance', type=float, default=0.2, help="Ralentissement toléré du p95 (0.2 = +20 %%)")
+        parser.add_argument('--current-db', action='store_true',
+                            help="Mesure sur la base configurée, sans créer ni peupler de base de test ; "
+                                 "tout est exécuté dans une transaction annulée à la fin (requêtes "
+                                 "parallèles du tableau de bord alors exécutées l'une après l'autre)")
+        parser.add_argument('--seed', type=int, default=0, help="Graine du jeu de données et des scénarios")
+
+    def handle(self, *args, **options):
+        if options['save_baseline'] and not options['baseline']:
+            raise CommandError("--save-baseline nécessite --baseline.")
+
+        if options['current_db']:
+            results = benchmarks.run(options['iterations'], options['only'], options['seed'], rollback=True)
+        else:
+            results = self.run_isolated(options)
+        results['size'] = None if options['current_db'] else options['size']
+
+        self.report(results)
+        payload = json.dumps(results, indent=2, ensure_ascii=False)
+        if options['output']:
+            Path(options['output']).write_text(payload, encoding='utf-8')
+            self.stdout.write(f"Résultats écrits dans {options['output']}")
+
+        baseline = options['baseline']
+        if baseline and options['save_baseline']:
+            Path(baseline).write_text(payload, encoding='utf-8')
+            self.stdout.write(self.style.SUCCESS(f"Référence enregistrée : {baseline}"))
+        elif baseline:
+            self.compare(results, json.loads(Path(baseline).read_text(encoding='utf-8')), options['tolerance'])
+
+    def run_isolated(self, options):
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            dataset = benchmarks.DATASETS[options['size']]
+            self.stdout.write(self.style.WARNING(f"Peuplement du jeu '{options['size']}'..."))
+            call_command('populate_db', seed=options['seed'], stdout=self.stdout, **dataset)
+            self.stdout.write(self.style.WARNING("Mesures..."))
+            return benchmarks.run(options['iterations'], options['only'], options['seed'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    def report(self, results):
+        counts = results['dataset']
+        self.stdout.write(
+            f"{counts['reservations']} réservations, {counts['clients']} clients, {counts['rooms']} chambres"
+        )
+        self.stdout.write(f"{'Scénario':<24}{'débit/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for name, row in results['scenarios'].items():
+            self.stdout.write(
+                f"{name:<24}{row['throughput_per_s']:>10}{row['p50_ms']:>10}{row['p95_ms']:>10}{row['p99_ms']:>10}"
+            )
+        for name, reason in results.get('skipped', {}).items():
+            self.stdout.write(self.style.WARNING(f"{name:<24}ignoré : {reason}"))
+
+    def compare(self, results, baseline, tolerance):
+        if baseline.get('dataset') != results['dataset']:
+            self.stdout.write(self.style.WARNING("Attention : jeu de données différent de la référence."))
+        regressions = []
+        for name, before, after, change, regressed in benchmarks.compare(results, baseline, tolerance):
+            line = f"{name:<24}p95 {before} → {after} ms ({change:+.0%})"
+            self.stdout.write(self.style.ERROR(line) if regressed else line)
+            if regressed:
+                regressions.append(name)
+        if regressions:
+            raise CommandError(f"Régression au-delà de {tolerance:.0%} : {', '.join(regressions)}")
+        self.stdout.write(self.style.SUCCESS("Aucune régression par rapport à la référence."))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from core.database import connection_settings, missing_indexes, settings_problems
+
+class Command(BaseCommand):
+    help = 'Vérifie les réglages de connexion et la présence des index pour le profil de base de données actif.'
+
+    def handle(self, *args, **kwargs):
+        self.stdout.write(f"Base : {connection.display_name} ({connection.settings_dict['NAME']})")
+        for name, value in connection_settings(connection).items():
+            self.stdout.write(f"  {name} = {value}")
+
+        problems = settings_problems(connection)
+        problems += [f"index manquant : {name}" for name in missing_indexes(connection)]
+        if problems:
+            for problem in problems:
+                self.stdout.write(self.style.ERROR(f"  ✗ {problem}"))
+            raise CommandError("Profil de base de données incomplet (migrations appliquées ?).")
+        self.stdout.write(self.style.SUCCESS("Réglages et index conformes."))
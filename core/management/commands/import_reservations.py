@@ -0,0 +1,46 @@
+import csv
+import sys
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from core.imports import CHUNK_SIZE, import_reservations
+
+class Command(BaseCommand):
+    help = (
+        'Importe des réservations depuis un export CSV ou JSON (channel manager, OTA), '
+        'par lots et sans passer par les signaux. Les lignes rejetées sont listées.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Fichier à importer ('-' pour l'entrée standard)")
+        parser.add_argument('--format', choices=['csv', 'json', 'jsonl'], help="Format (déduit de l'extension par défaut)")
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="Nombre de lignes par lot")
+        parser.add_argument('--report', help="Écrit les lignes rejetées dans ce fichier CSV")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or {'.json': 'json', '.jsonl': 'jsonl', '.ndjson': 'jsonl'}.get(Path(path).suffix.lower(), 'csv')
+
+        self.stdout.write(self.style.WARNING(f"Import des réservations ({fmt})..."))
+        if path == '-':
+            report = import_reservations(sys.stdin, fmt, options['chunk_size'])
+        else:
+            try:
+                stream = open(path, newline='', encoding='utf-8-sig')
+            except OSError as exc:
+                raise CommandError(f"Impossible d'ouvrir {path} : {exc}")
+            with stream:
+                report = import_reservations(stream, fmt, options['chunk_size'])
+
+        if options['report']:
+            with open(options['report'], 'w', newline='', encoding='utf-8') as out:
+                writer = csv.writer(out)
+                writer.writerow(['ligne', 'erreur'])
+                writer.writerows(report.errors)
+        else:
+            for line, message in report.errors:
+                self.stdout.write(self.style.ERROR(f"Ligne {line} : {message}"))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{report.imported} réservation(s) importée(s), {report.rejected} rejetée(s), "
+            f"{report.clients_created} client(s) créé(s)."
+        ))
@@ -1,25 +1,65 @@
 import random
-from datetime import timedelta
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+from decimal import Decimal
 from django.core.management.base import BaseCommand
+from django.db import transaction
 from django.utils import timezone
-from faker import Faker
 from django.core.exceptions import ValidationError
+from core import caching, rollups, search
 from core.models import User, Room, Client, Reservation, Invoice, Payment
+from core.invoicing import invoice_status, invoice_total
+from core.stats import DashboardStats
+from core.room_status import reconcile_room_statuses
+
+# Liste de noms/prénoms à consonance tchadienne/africaine
+FIRST_NAMES = ['Mahamat', 'Fatime', 'Zara', 'Moussa', 'Abdoulaye', 'Amina', 'Kaltouma', 'Ousmane', 'Yaya', 'Achta', 'Brahim', 'Halime', 'Idriss', 'Mariam', 'Souleymane']
+LAST_NAMES = ['Daoud', 'Hassan', 'Abakar', 'Mahamat', 'Saleh', 'Ibrahim', 'Adam', 'Moussa', 'Abdellah', 'Youssouf', 'Djarma', 'Koulamallah', 'Ngarlejy']
+
+# Catégorie, prix par nuit (FCFA), capacité, proportion du parc
+ROOM_CATEGORIES = [
+    (Room.Category.SIMPLE, 25000, 1, 0.5),
+    (Room.Category.DOUBLE, 45000, 2, 0.35),
+    (Room.Category.SUITE, 85000, 4, 0.15),
+]
+
+@contextmanager
+def explicit_dates(model, field_name):
+    """Désactive temporairement auto_now_add pour insérer des dates historiques."""
+    field = model._meta.get_field(field_name)
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
 
 class Command(BaseCommand):
-    help = 'Peuple la base de données avec des données de test réalistes.'
+    help = (
+        'Peuple la base de données avec des données de test réalistes. '
+        'Avec --rooms, --clients ou --years, génère en masse un jeu de données '
+        'de la taille de la production (bulk_create, sans signaux).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rooms', type=int, help="Nombre de chambres à créer (mode volumineux)")
+        parser.add_argument('--clients', type=int, help="Nombre de clients à créer (mode volumineux)")
+        parser.add_argument('--years', type=float, help="Années d'historique de réservations (mode volumineux)")
+        parser.add_argument('--seed', type=int, default=None, help="Graine aléatoire, pour des jeux reproductibles")
+        parser.add_argument('--batch-size', type=int, default=5000, help="Taille des lots d'insertion")
+
+    def handle(self, *args, **options):
+        if options['seed'] is not None:
+            random.seed(options['seed'])
+        if any(options[name] is not None for name in ('rooms', 'clients', 'years')):
+            return self.handle_bulk(**options)
 
-    def handle(self, *args, **kwargs):
         self.stdout.write(self.style.WARNING('Début du peuplement de la base de données...'))
+        from faker import Faker
         fake = Faker('fr_FR')  # Utilisation d'une locale française pour commencer
 
         # --- 1. Création des Utilisateurs ---
-        self.stdout.write("Création des utilisateurs...")
-        if not User.objects.filter(username='admin').exists():
-            User.objects.create_superuser('admin', 'admin@hotel.com', 'adminpass', role=User.Role.ADMIN)
-        
-        if not User.objects.filter(username='reception').exists():
-            User.objects.create_user('reception', 'reception@hotel.com', 'userpass', role=User.Role.RECEPTIONIST)
+        self.create_users()
 
         # --- 2. Création des Chambres ---
         self.stdout.write("Création des chambres...")
@@ -48,14 +88,10 @@ class Command(BaseCommand):
 
         # --- 3. Création des Clients ---
         self.stdout.write("Création des clients...")
-        # Liste de noms/prénoms à consonance tchadienne/africaine
-        first_names = ['Mahamat', 'Fatime', 'Zara', 'Moussa', 'Abdoulaye', 'Amina', 'Kaltouma', 'Ousmane', 'Yaya', 'Achta', 'Brahim', 'Halime', 'Idriss', 'Mariam', 'Souleymane']
-        last_names = ['Daoud', 'Hassan', 'Abakar', 'Mahamat', 'Saleh', 'Ibrahim', 'Adam', 'Moussa', 'Abdellah', 'Youssouf', 'Djarma', 'Koulamallah', 'Ngarlejy']
-
         clients = []
         for _ in range(50):
-            first = random.choice(first_names)
-            last = random.choice(last_names)
+            first = random.choice(FIRST_NAMES)
+            last = random.choice(LAST_NAMES)
             # Ajout d'un suffixe aléatoire à l'email pour garantir l'unicité
             email = f"{first.lower()}.{last.lower()}.{random.randint(1000, 9999)}@example.com"
             
@@ -134,8 +170,185 @@ class Command(BaseCommand):
                     invoice=invoice,
                     amount=invoice.total_amount,
                     payment_method=random.choice(Payment.Method.choices)[0]
-                )
-                invoice.status = Invoice.Status.PAYEE
-                invoice.save()
+                )  # Solde et statut de la facture suivent (signaux)
 
         self.stdout.write(self.style.SUCCESS("Peuplement terminé avec succès !"))
+
+    def create_users(self):
+        self.stdout.write("Création des utilisateurs...")
+        if not User.objects.filter(username='admin').exists():
+            User.objects.create_superuser('admin', 'admin@hotel.com', 'adminpass', role=User.Role.ADMIN)
+        
+        if not User.objects.filter(username='reception').exists():
+            User.objects.create_user('reception', 'reception@hotel.com', 'userpass', role=User.Role.RECEPTIONIST)
+
+    # --- MODE VOLUMINEUX ---
+
+    def handle_bulk(self, **options):
+        """
+        Génère un jeu de données volumineux : les séjours sont planifiés en mémoire,
+        chambre par chambre, sans jamais se chevaucher ; tout est écrit par lots
+        (bulk_create) dans une seule transaction, puis les agrégats, l'index de
+        recherche et les statuts des chambres sont recalculés une fois à la fin.
+        """
+        n_rooms = options['rooms'] if options['rooms'] is not None else 50
+        n_clients = options['clients'] if options['clients'] is not None else 1000
+        years = options['years'] if options['years'] is not None else 1
+        self.batch_size = options['batch_size']
+        self.rng = random.Random(options['seed'])
+        self.today = timezone.localdate()
+
+        self.stdout.write(self.style.WARNING(
+            f"Génération en masse : {n_rooms} chambres, {n_clients} clients, {years} an(s) d'historique..."
+        ))
+        self.create_users()
+
+        with transaction.atomic():
+            rooms = self.bulk_rooms(n_rooms)
+            client_ids = self.bulk_clients(n_clients)
+            totals = self.bulk_reservations(rooms, client_ids, years)
+
+        self.stdout.write("Reconstruction des agrégats et de l'index de recherche...")
+        rollups.rebuild()
+        search.rebuild_index()
+        DashboardStats.invalidate()
+        caching.bump('rooms', 'clients', 'reservations')
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Peuplement terminé : {len(rooms)} chambres, {len(client_ids)} clients, "
+            f"{totals['reservations']} réservations, {totals['payments']} paiements."
+        ))
+
+    def bulk_rooms(self, count):
+        self.stdout.write("Création des chambres...")
+        existing = set(Room.objects.values_list('number', flat=True))
+        rooms, number = [], 1000
+        for category, price, capacity, share in ROOM_CATEGORIES:
+            for _ in range(max(1, round(count * share)) if count else 0):
+                while str(number) in existing:
+                    number += 1
+                rooms.append(Room(
+                    number=str(number),
+                    category=category,
+                    price_per_night=Decimal(price),
+                    capacity=capacity,
+                    status=Room.Status.LIBRE,
+                ))
+                number += 1
+        return Room.objects.bulk_create(rooms[:count], batch_size=self.batch_size)
+
+    def bulk_clients(self, count):
+        self.stdout.write("Création des clients...")
+        # Jeton propre à l'exécution (hors graine) : un comptage des clients redonnerait
+        # des suffixes déjà pris après des suppressions, et l'email est unique.
+        run = uuid.uuid4().hex[:8]
+        ids = []
+        batch = []
+        for i in range(count):
+            first = self.rng.choice(FIRST_NAMES)
+            last = self.rng.choice(LAST_NAMES)
+            client = Client(
+                first_name=first,
+                last_name=last,
+                email=f"{first.lower()}.{last.lower()}.{run}.{i}@example.com",
+                phone=f"+235 {self.rng.randint(60000000, 99999999)}",
+                id_document=f"CNI-{self.rng.randint(10000000, 99999999)}",
+            )
+            client.search_key = search.client_search_key(client)
+            batch.append(client)
+            if len(batch) >= self.batch_size:
+                ids += [c.pk for c in Client.objects.bulk_create(batch)]
+                batch = []
+        if batch:
+            ids += [c.pk for c in Client.objects.bulk_create(batch)]
+        return ids
+
+    def plan_stays(self, room, years):
+        """Séjours successifs d'une chambre, sans chevauchement, de -years à +60 jours."""
+        day = self.today - timedelta(days=int(years * 365))
+        horizon = self.today + timedelta(days=60)
+        while True:
+            day += timedelta(days=self.rng.choice((0, 0, 1, 2, 3, 5, 8)))
+            nights = self.rng.randint(1, 7)
+            if day >= horizon:
+                return
+            yield day, day + timedelta(days=nights)
+            day += timedelta(days=nights)
+
+    def stay_status(self, check_in, check_out):
+        if self.rng.random() < 0.05:
+            return Reservation.Status.ANNULEE
+        if check_out <= self.today:
+            return Reservation.Status.TERMINEE
+        if check_in <= self.today:
+            return Reservation.Status.CONFIRMEE
+        return self.rng.choice((Reservation.Status.CONFIRMEE, Reservation.Status.EN_ATTENTE))
+
+    def bulk_reservations(self, rooms, client_ids, years):
+        self.stdout.write("Génération des réservations, factures et paiements...")
+        totals = {'reservations': 0, 'payments': 0}
+        batch = []
+        for room in rooms:
+            for check_in, check_out in self.plan_stays(room, years):
+                status = self.stay_status(check_in, check_out)
+                reservation = Reservation(
+                    client_id=self.rng.choice(client_ids),
+                    room=room,
+                    check_in=check_in,
+                    check_out=check_out,
+                    status=status,
+                    created_at=self.at_noon(min(check_in - timedelta(days=self.rng.randint(0, 30)), self.today)),
+                )
+                batch.append(reservation)
+                if len(batch) >= self.batch_size:
+                    self.flush_reservations(batch, totals)
+                    batch = []
+        if batch:
+            self.flush_reservations(batch, totals)
+
+        # Statut des chambres recalculé en une passe, comme la réconciliation quotidienne
+        reconcile_room_statuses(self.today)
+        return totals
+
+    def flush_reservations(self, reservations, totals):
+        """Écrit un lot de réservations puis en dérive factures et paiements."""
+        invoices, payments = [], []
+        for res in reservations:
+            total = invoice_total(res.check_in, res.check_out, res.room.price_per_night)
+            invoice = Invoice(
+                reservation=res,
+                total_amount=total,
+                balance=total,
+                status=Invoice.Status.IMPAYEE,
+                issued_at=self.at_noon(min(res.check_in, self.today)),
+            )
+            invoices.append(invoice)
+
+            if res.status == Reservation.Status.TERMINEE:
+                amount, paid_on = total, res.check_out
+            elif res.status == Reservation.Status.CONFIRMEE and res.check_in <= self.today and self.rng.random() < 0.5:
+                amount, paid_on = (total / 2).quantize(Decimal('0.01')), res.check_in
+            else:
+                continue
+            # bulk_create n'émet pas de signaux : solde et statut posés ici
+            invoice.amount_paid = amount
+            invoice.balance = total - amount
+            invoice.status = invoice_status(invoice.amount_paid, invoice.balance)
+            payments.append(Payment(
+                invoice=invoice,
+                amount=amount,
+                payment_method=self.rng.choice(Payment.Method.values),
+                date=self.at_noon(paid_on),
+            ))
+
+        # Dates historiques : auto_now_add est suspendu le temps des insertions
+        with explicit_dates(Reservation, 'created_at'), explicit_dates(Invoice, 'issued_at'), explicit_dates(Payment, 'date'):
+            Reservation.objects.bulk_create(reservations)
+            Invoice.objects.bulk_create(invoices)
+            Payment.objects.bulk_create(payments)
+        totals['reservations'] += len(reservations)
+        totals['payments'] += len(payments)
+
+    @staticmethod
+    def at_noon(day):
+        return timezone.make_aware(datetime.combine(day, time(12)))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from core import rollups
+from core.stats import DashboardStats
+
+class Command(BaseCommand):
+    help = 'Reconstruit les tables d\'agrégats journaliers (revenus, occupation, réservations).'
+
+    def handle(self, *args, **kwargs):
+        self.stdout.write(self.style.WARNING('Reconstruction des agrégats...'))
+        counts = rollups.rebuild()
+        DashboardStats.invalidate()
+        self.stdout.write(
+            f"{counts['revenue']} lignes de revenus, {counts['occupancy']} lignes d'occupation, "
+            f"{counts['reservations']} lignes de réservations."
+        )
+        self.stdout.write(self.style.SUCCESS("Agrégats reconstruits avec succès !"))
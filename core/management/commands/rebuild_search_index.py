@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from core import search
+
+class Command(BaseCommand):
+    help = 'Recalcule les clés de recherche des clients et l\'index plein texte.'
+
+    def handle(self, *args, **kwargs):
+        updated = search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"Index de recherche reconstruit ({updated} clés mises à jour)."))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from core.invoicing import recalculate_invoices
+
+class Command(BaseCommand):
+    help = 'Recalcule en lot le montant des factures (nuits × prix de la chambre).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dirty', action='store_true', help="Seulement les factures marquées à recalculer")
+        parser.add_argument('--include-paid', action='store_true', help="Recalcule aussi les factures payées")
+        parser.add_argument('--dry-run', action='store_true', help="Compte les factures à corriger sans les modifier")
+
+    def handle(self, *args, **options):
+        changed = recalculate_invoices(
+            dirty_only=options['dirty'],
+            include_paid=options['include_paid'],
+            dry_run=options['dry_run'],
+        )
+        if options['dry_run']:
+            self.stdout.write(f"{changed} facture(s) à corriger.")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"{changed} facture(s) recalculée(s)."))
@@ -0,0 +1,35 @@
+import time
+from datetime import datetime, timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from core.room_status import reconcile_room_statuses
+
+class Command(BaseCommand):
+    help = (
+        'Aligne le statut de toutes les chambres sur les réservations du jour '
+        '(OCCUPEE à l\'arrivée, LIBRE au départ). Avec --loop, tourne en continu '
+        'et relance la réconciliation juste après chaque minuit.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help="Rester actif et réconcilier chaque nuit à minuit")
+
+    def handle(self, *args, **options):
+        self.reconcile()
+        while options['loop']:
+            time.sleep(self.seconds_until_midnight())
+            self.reconcile()
+
+    def reconcile(self):
+        changed = reconcile_room_statuses()
+        stamp = timezone.localtime().strftime('%d/%m/%Y %H:%M')
+        for room in changed:
+            self.stdout.write(f"Chambre {room.number} -> {room.get_status_display()}")
+        self.stdout.write(self.style.SUCCESS(f"[{stamp}] {len(changed)} chambre(s) mise(s) à jour."))
+
+    @staticmethod
+    def seconds_until_midnight():
+        now = timezone.localtime()
+        tomorrow = timezone.make_aware(datetime.combine(now.date() + timedelta(days=1), datetime.min.time()))
+        # Quelques secondes de marge pour être sûr d'être passé au jour suivant
+        return (tomorrow - now).total_seconds() + 5
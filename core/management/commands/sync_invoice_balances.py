@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from core.invoicing import sync_balances
+
+class Command(BaseCommand):
+    help = 'Vérifie ou recalcule le montant payé, le solde et le statut des factures depuis les paiements.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verify', action='store_true', help="Signale les écarts sans les corriger")
+
+    def handle(self, *args, **options):
+        drifted = sync_balances(dry_run=options['verify'])
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS("Soldes des factures cohérents."))
+        elif options['verify']:
+            self.stdout.write(self.style.WARNING(f"{len(drifted)} facture(s) en écart : {', '.join(map(str, drifted[:20]))}"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"{len(drifted)} facture(s) corrigée(s)."))
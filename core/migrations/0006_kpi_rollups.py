@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_reservation_availability_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='Nuit du')),
+                ('category', models.CharField(choices=[('SIMPLE', 'Simple'), ('DOUBLE', 'Double'), ('SUITE', 'Suite')], max_length=10, verbose_name='Catégorie')),
+                ('occupied', models.IntegerField(default=0, verbose_name='Chambres occupées')),
+            ],
+            options={
+                'verbose_name': 'Occupation journalière',
+                'verbose_name_plural': 'Occupations journalières',
+                'constraints': [models.UniqueConstraint(fields=('day', 'category'), name='unique_daily_occupancy')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyReservationCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name="Date d'arrivée")),
+                ('category', models.CharField(choices=[('SIMPLE', 'Simple'), ('DOUBLE', 'Double'), ('SUITE', 'Suite')], max_length=10, verbose_name='Catégorie')),
+                ('status', models.CharField(choices=[('EN_ATTENTE', 'En attente'), ('CONFIRMEE', 'Confirmée'), ('ANNULEE', 'Annulée'), ('TERMINEE', 'Terminée')], max_length=20, verbose_name='Statut')),
+                ('count', models.IntegerField(default=0, verbose_name='Nombre de réservations')),
+            ],
+            options={
+                'verbose_name': 'Réservations par jour',
+                'verbose_name_plural': 'Réservations par jour',
+                'constraints': [models.UniqueConstraint(fields=('day', 'category', 'status'), name='unique_daily_reservation_count')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyRevenue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='Jour')),
+                ('payment_method', models.CharField(choices=[('ESPECES', 'Espèces'), ('CARTE', 'Carte bancaire'), ('MOBILE_MONEY', 'Mobile Money')], max_length=20, verbose_name='Mode de paiement')),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Montant encaissé')),
+                ('count', models.IntegerField(default=0, verbose_name='Nombre de paiements')),
+            ],
+            options={
+                'verbose_name': 'Revenu journalier',
+                'verbose_name_plural': 'Revenus journaliers',
+                'constraints': [models.UniqueConstraint(fields=('day', 'payment_method'), name='unique_daily_revenue')],
+            },
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:22
+
+import unicodedata
+
+from django.db import migrations, models
+
+
+def _normalize(text):
+    folded = unicodedata.normalize('NFKD', text or '')
+    folded = ''.join(c for c in folded if not unicodedata.combining(c))
+    return ' '.join(folded.lower().split())
+
+
+def fill_search_keys(apps, schema_editor):
+    Client = apps.get_model('core', 'Client')
+    clients = list(Client.objects.all())
+    for client in clients:
+        client.search_key = _normalize(' '.join([
+            client.last_name or '', client.first_name or '', client.email or '', client.phone or '',
+        ]))
+    Client.objects.bulk_update(clients, ['search_key'], batch_size=1000)
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            try:
+                cursor.execute("CREATE VIRTUAL TABLE core_client_fts USING fts5(search_key)")
+            except Exception:
+                # SQLite compilé sans FTS5 : la recherche se rabat sur search_key
+                return
+            cursor.execute("INSERT INTO core_client_fts (rowid, search_key) SELECT id, search_key FROM core_client")
+    elif connection.vendor == 'postgresql':
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS core_client_search_trgm "
+            "ON core_client USING gin (search_key gin_trgm_ops)"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS core_client_fts")
+    elif connection.vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS core_client_search_trgm")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_client_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='client',
+            name='search_key',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=400, verbose_name='Clé de recherche'),
+        ),
+        migrations.RunPython(fill_search_keys, migrations.RunPython.noop),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
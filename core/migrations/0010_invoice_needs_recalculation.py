@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_client_search_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='invoice',
+            name='needs_recalculation',
+            field=models.BooleanField(db_index=True, default=False, editable=False, verbose_name='À recalculer'),
+        ),
+    ]
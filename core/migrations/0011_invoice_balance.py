@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:34
+
+from django.db import migrations, models
+from django.db.models import Case, F, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+
+def fill_balances(apps, schema_editor):
+    Invoice = apps.get_model('core', 'Invoice')
+    Payment = apps.get_model('core', 'Payment')
+    paid = Payment.objects.filter(invoice=OuterRef('pk')).order_by().values('invoice').annotate(
+        total=Sum('amount')
+    ).values('total')
+    Invoice.objects.update(amount_paid=Coalesce(Subquery(paid), Value(0), output_field=models.DecimalField()))
+    Invoice.objects.update(balance=Coalesce(F('total_amount'), Value(0), output_field=models.DecimalField()) - F('amount_paid'))
+    Invoice.objects.update(status=Case(
+        When(amount_paid__lte=0, then=Value('IMPAYEE')),
+        When(balance__lte=0, then=Value('PAYEE')),
+        default=Value('PARTIELLE'),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_invoice_needs_recalculation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='invoice',
+            name='amount_paid',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10, verbose_name='Montant payé'),
+        ),
+        migrations.AddField(
+            model_name='invoice',
+            name='balance',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10, verbose_name='Reste à payer'),
+        ),
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['status', 'balance'], name='invoice_status_balance_idx'),
+        ),
+        migrations.RunPython(fill_balances, migrations.RunPython.noop),
+    ]
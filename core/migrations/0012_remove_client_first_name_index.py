@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:10
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_invoice_balance'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='client',
+            name='client_first_name_idx',
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import models, router, transaction
+from django.db.models.functions import Lower
 from django.core.exceptions import ValidationError
 
 class User(AbstractUser):
@@ -67,10 +68,18 @@ class Client(models.Model):
     phone = models.CharField(max_length=20, db_index=True, verbose_name="Téléphone")
     id_document = models.CharField(max_length=50, verbose_name="Pièce d'identité")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Date de création")
+    # Nom, prénom, email et téléphone normalisés (voir core/search.py)
+    search_key = models.CharField(max_length=400, blank=True, default='', editable=False, db_index=True, verbose_name="Clé de recherche")
 
     class Meta:
         verbose_name = "Client"
         verbose_name_plural = "Clients"
+        indexes = [
+            # Tri par nom (autocomplétion de la réception) ; la recherche passe par search_key
+            models.Index(fields=['last_name', 'first_name'], name='client_name_idx'),
+            # Rapprochement des emails sans tenir compte de la casse (imports)
+            models.Index(Lower('email'), name='client_email_lower_idx'),
+        ]
 
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
@@ -99,6 +108,13 @@ class Reservation(models.Model):
         verbose_name = "Réservation"
         verbose_name_plural = "Réservations"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['room', 'status', 'check_in', 'check_out'], name='reservation_availability_idx'),
+            # Chevauchements d'une chambre : parcours à partir de check_out > arrivée demandée,
+            # les séjours passés ne sont pas lus (voir core/availability.py)
+            models.Index(fields=['room', 'check_out', 'check_in'], name='reservation_room_checkout_idx'),
+            models.Index(fields=['check_in', 'id'], name='reservation_checkin_seek_idx'),
+        ]
 
     def clean(self):
         # 1. Validation des dates
@@ -108,22 +124,15 @@ class Reservation(models.Model):
             })
 
         # 2. Vérification des chevauchements (Overbooking)
-        # On cherche s'il existe une réservation pour la même chambre
-        # qui chevauche la période demandée.
-        # Logique de chevauchement : (DebutA < FinB) et (FinA > DebutB)
-        overlapping_reservations = Reservation.objects.filter(
-            room=self.room,
-            check_in__lt=self.check_out,  # La résa existante commence avant que la nouvelle finisse
-            check_out__gt=self.check_in   # La résa existante finit après que la nouvelle commence
-        ).exclude(
-            status=self.Status.ANNULEE # On ignore les réservations annulées
-        )
-
-        # Si on modifie une réservation existante, on doit l'exclure de la vérification (elle ne se chevauche pas elle-même)
-        if self.pk:
-            overlapping_reservations = overlapping_reservations.exclude(pk=self.pk)
-
-        if overlapping_reservations.exists():
+        # Requête unique servie par l'index (room, check_out, check_in) : seuls les séjours
+        # qui finissent après l'arrivée demandée sont parcourus (voir core/availability.py).
+        # Les réservations annulées sont ignorées et, en modification, la réservation
+        # courante est exclue.
+        from .availability import is_room_available
+
+        if self.room_id and self.check_in and self.check_out and not is_room_available(
+            self.room_id, self.check_in, self.check_out, exclude_pk=self.pk
+        ):
             raise ValidationError(
                 "Cette chambre est déjà réservée pour tout ou partie de cette période."
             )
@@ -146,21 +155,49 @@ class Invoice(models.Model):
     issued_at = models.DateTimeField(auto_now_add=True, verbose_name="Émise le")
     total_amount = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Montant total", blank=True, null=True)
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.IMPAYEE, verbose_name="Statut")
+    # Posé quand la chambre ou les dates de la réservation changent (voir core/invoicing.py)
+    needs_recalculation = models.BooleanField(default=False, db_index=True, editable=False, verbose_name="À recalculer")
+    # Tenus à jour par les signaux des paiements (incréments F() atomiques)
+    amount_paid = models.DecimalField(max_digits=10, decimal_places=2, default=0, editable=False, verbose_name="Montant payé")
+    balance = models.DecimalField(max_digits=10, decimal_places=2, default=0, editable=False, verbose_name="Reste à payer")
 
     class Meta:
         verbose_name = "Facture"
         verbose_name_plural = "Factures"
+        indexes = [
+            # Créances (balance > 0) et revenu encaissé (status = PAYEE)
+            models.Index(fields=['status', 'balance'], name='invoice_status_balance_idx'),
+        ]
+
+    # Écrits uniquement par des UPDATE F() (paiements, refresh_balances) : jamais depuis l'instance
+    BALANCE_FIELDS = ('amount_paid', 'balance', 'status')
 
     def save(self, *args, **kwargs):
+        from .invoicing import invoice_status, invoice_total, refresh_balances
+
         if not self.total_amount and self.reservation:
-            # Calcul automatique du montant
-            days = (self.reservation.check_out - self.reservation.check_in).days
-            # Assurer au moins 1 nuit si même jour
-            if days <= 0: 
-                days = 1
-            self.total_amount = days * self.reservation.room.price_per_night
-            
-        super().save(*args, **kwargs)
+            # Calcul automatique du montant (au moins 1 nuit si même jour)
+            reservation = self.reservation
+            self.total_amount = invoice_total(
+                reservation.check_in, reservation.check_out, reservation.room.price_per_night
+            )
+        if self._state.adding and not kwargs.get('update_fields'):
+            # Solde et statut découlent des paiements
+            self.balance = (self.total_amount or 0) - self.amount_paid
+            self.status = invoice_status(self.amount_paid, self.balance)
+            super().save(*args, **kwargs)
+            return
+
+        # Instance peut-être périmée (formulaire d'admin, script) : son amount_paid ne doit pas
+        # écraser les paiements enregistrés depuis ; solde et statut sont recalculés en base.
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            update_fields = [f.name for f in self._meta.concrete_fields if not f.primary_key]
+        kwargs['update_fields'] = [name for name in update_fields if name not in self.BALANCE_FIELDS]
+        with transaction.atomic(using=kwargs.get('using') or router.db_for_write(Invoice, instance=self)):
+            super().save(*args, **kwargs)
+            refresh_balances(Invoice.objects.filter(pk=self.pk))
+        self.refresh_from_db(fields=self.BALANCE_FIELDS)
 
     def __str__(self):
         return f"Facture #{self.id} - {self.reservation.client}"
@@ -183,3 +220,58 @@ class Payment(models.Model):
 
     def __str__(self):
         return f"Paiement {self.id} - {self.amount}€ ({self.get_payment_method_display()})"
+
+
+# --- TABLES D'AGRÉGATS (ROLLUPS) ---
+# Maintenues de façon incrémentale par core/signals.py et reconstruites par
+# la commande `rebuild_rollups`. Les rapports lisent O(jours) lignes au lieu
+# de parcourir toutes les transactions.
+
+class DailyRevenue(models.Model):
+    day = models.DateField(verbose_name="Jour")
+    payment_method = models.CharField(max_length=20, choices=Payment.Method.choices, verbose_name="Mode de paiement")
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Montant encaissé")
+    count = models.IntegerField(default=0, verbose_name="Nombre de paiements")
+
+    class Meta:
+        verbose_name = "Revenu journalier"
+        verbose_name_plural = "Revenus journaliers"
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'payment_method'], name='unique_daily_revenue'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} - {self.get_payment_method_display()} : {self.total}"
+
+
+class DailyOccupancy(models.Model):
+    day = models.DateField(verbose_name="Nuit du")
+    category = models.CharField(max_length=10, choices=Room.Category.choices, verbose_name="Catégorie")
+    occupied = models.IntegerField(default=0, verbose_name="Chambres occupées")
+
+    class Meta:
+        verbose_name = "Occupation journalière"
+        verbose_name_plural = "Occupations journalières"
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'category'], name='unique_daily_occupancy'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} - {self.get_category_display()} : {self.occupied}"
+
+
+class DailyReservationCount(models.Model):
+    day = models.DateField(verbose_name="Date d'arrivée")
+    category = models.CharField(max_length=10, choices=Room.Category.choices, verbose_name="Catégorie")
+    status = models.CharField(max_length=20, choices=Reservation.Status.choices, verbose_name="Statut")
+    count = models.IntegerField(default=0, verbose_name="Nombre de réservations")
+
+    class Meta:
+        verbose_name = "Réservations par jour"
+        verbose_name_plural = "Réservations par jour"
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'category', 'status'], name='unique_daily_reservation_count'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} - {self.get_category_display()} - {self.get_status_display()} : {self.count}"
@@ -0,0 +1,157 @@
+"""
+Pagination par clé (keyset / seek) pour les listes de la réception.
+
+Au lieu d'un OFFSET qui relit toutes les lignes précédentes, chaque page
+reprend juste après (ou juste avant) la dernière clé affichée :
+    WHERE (check_in, id) > (:check_in, :id) ORDER BY check_in, id LIMIT n
+Le coût d'une page ne dépend donc pas de sa position dans la liste.
+
+Les curseurs sont opaques pour le client : valeurs de la clé encodées en
+base64 url-safe.
+
+Voir aussi EstimatedCountPaginator, utilisé par les listes de l'administration.
+"""
+import base64
+import json
+
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def page_size_from(request, default=DEFAULT_PAGE_SIZE):
+    """Taille de page demandée (?size=), bornée à [1, MAX_PAGE_SIZE]."""
+    try:
+        size = int(request.GET.get('size', default))
+    except (TypeError, ValueError):
+        size = default
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+class KeysetPage:
+    def __init__(self, items, next_cursor=None, previous_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+class KeysetPaginator:
+    """
+    `keys` : champs formant une clé unique et totalement ordonnée,
+    par exemple ('check_in', 'id') ou ('number',).
+    """
+
+    def __init__(self, queryset, keys, page_size=DEFAULT_PAGE_SIZE):
+        self.queryset = queryset
+        self.keys = tuple(keys)
+        self.page_size = page_size
+        self._fields = [queryset.model._meta.get_field(key) for key in self.keys]
+
+    # --- Curseurs ---
+
+    def encode(self, obj):
+        values = [field.value_to_string(obj) for field in self._fields]
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+    def decode(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            if len(values) != len(self._fields):
+                raise ValueError
+            return [field.to_python(value) for field, value in zip(self._fields, values)]
+        except Exception as exc:
+            raise InvalidCursor(cursor) from exc
+
+    def _seek(self, values, op):
+        """(k1, k2, ...) op (v1, v2, ...) décomposé en OR de comparaisons."""
+        condition = Q()
+        for i, key in enumerate(self.keys):
+            clause = Q(**{f"{key}__{op}": values[i]})
+            for previous_key, value in zip(self.keys[:i], values[:i]):
+                clause &= Q(**{previous_key: value})
+            condition |= clause
+        return condition
+
+    # --- Pages ---
+
+    def page(self, after=None, before=None):
+        """Page qui suit le curseur `after`, ou qui précède `before`, ou la première."""
+        size = self.page_size
+        if before:
+            qs = self.queryset.filter(self._seek(self.decode(before), 'lt'))
+            qs = qs.order_by(*[f"-{key}" for key in self.keys])
+            rows = list(qs[:size + 1])
+            has_more = len(rows) > size
+            items = rows[:size][::-1]
+            return KeysetPage(
+                items,
+                next_cursor=self.encode(items[-1]) if items else None,
+                previous_cursor=self.encode(items[0]) if has_more else None,
+            )
+
+        qs = self.queryset
+        if after:
+            qs = qs.filter(self._seek(self.decode(after), 'gt'))
+        rows = list(qs.order_by(*self.keys)[:size + 1])
+        has_more = len(rows) > size
+        items = rows[:size]
+        return KeysetPage(
+            items,
+            next_cursor=self.encode(items[-1]) if has_more else None,
+            previous_cursor=self.encode(items[0]) if after and items else None,
+        )
+
+    def page_from_request(self, request):
+        """Lit ?after= / ?before= ; un curseur invalide renvoie la première page."""
+        try:
+            return self.page(after=request.GET.get('after'), before=request.GET.get('before'))
+        except InvalidCursor:
+            return self.page()
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator de l'administration : sur une grande table non filtrée,
+    le COUNT(*) exact est remplacé par l'estimation du planificateur
+    PostgreSQL (pg_class.reltuples). Ailleurs, comptage exact.
+    """
+    ESTIMATE_THRESHOLD = 100000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if hasattr(queryset, 'query') and not queryset.query.where:
+            connection = connections[queryset.db]
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT reltuples::bigint FROM pg_class WHERE relname = %s",
+                        [queryset.model._meta.db_table],
+                    )
+                    row = cursor.fetchone()
+                if row and row[0] >= self.ESTIMATE_THRESHOLD:
+                    return row[0]
+        return super().count
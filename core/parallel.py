@@ -0,0 +1,58 @@
+"""
+Requêtes indépendantes exécutées en parallèle depuis une vue asynchrone.
+
+L'ORM de Django est synchrone : une vue async qui enchaîne `await ...aget()`
+exécute ses requêtes l'une après l'autre dans un même thread. `gather` lance
+chaque fonction (requête ou agrégat) dans un thread du pool, avec sa propre
+connexion à la base : le temps total tend vers celui de la requête la plus
+lente plutôt que vers la somme.
+
+Le pool est créé une fois par processus (MAX_WORKERS threads) : ses threads,
+et donc leurs connexions, survivent d'une requête à l'autre et profitent de
+CONN_MAX_AGE. Sans lui, en WSGI, async_to_sync jette ses threads à la fin de
+chaque requête et chaque appel rouvrirait des connexions neuves. Chaque thread
+du pool peut garder une connexion ouverte : prévoir MAX_WORKERS connexions de
+plus par worker.
+
+Les requêtes des threads du pool sont mesurées par core/instrumentation.py
+(la variable de contexte de la requête suit sync_to_async).
+
+Dans une transaction ouverte (tests, ATOMIC_REQUESTS), les autres connexions
+ne verraient pas les écritures en cours : les fonctions s'exécutent alors
+l'une après l'autre, dans le thread de la requête.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections, connection
+
+from . import instrumentation
+
+MAX_WORKERS = 8
+
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='core-parallel')
+
+
+def _in_own_connection(func):
+    # Comme pour une requête HTTP : connexion de ce thread rouverte si périmée (CONN_MAX_AGE)
+    close_old_connections()
+    instrumentation.wrap_connections()
+    try:
+        return func()
+    finally:
+        close_old_connections()
+
+
+@sync_to_async
+def _in_transaction():
+    return connection.in_atomic_block
+
+
+async def gather(*funcs):
+    """Résultats de funcs (fonctions synchrones sans argument), dans l'ordre."""
+    if await _in_transaction():
+        return [await sync_to_async(func)() for func in funcs]
+    return await asyncio.gather(
+        *(sync_to_async(_in_own_connection, thread_sensitive=False, executor=_executor)(func) for func in funcs)
+    )
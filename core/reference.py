@@ -0,0 +1,47 @@
+"""
+Données de référence, rarement modifiées et lues sur les chemins chauds :
+catalogue des chambres, grille des catégories et prix. Servies depuis le
+cache (voir core/caching.py) et invalidées par les signaux dès qu'une
+chambre est enregistrée ou supprimée.
+
+Le statut des chambres, qui change plusieurs fois par jour (et en lot, via
+la réconciliation), n'en fait volontairement pas partie.
+"""
+from django.db.models import Count, Max, Min
+
+from .caching import cache_aside
+from .models import Room
+
+ROOM_FIELDS = ('id', 'number', 'category', 'price_per_night', 'capacity')
+
+
+@cache_aside('rooms')
+def room_catalog():
+    """{id: {number, category, price_per_night, capacity}} de toutes les chambres."""
+    return {
+        row['id']: row
+        for row in Room.objects.order_by('number').values(*ROOM_FIELDS)
+    }
+
+
+def room_category(room_id):
+    room = room_catalog().get(room_id)
+    if room is None:
+        # Chambre encore absente du catalogue caché : lecture directe
+        return Room.objects.values_list('category', flat=True).get(pk=room_id)
+    return room['category']
+
+
+def rooms_by_number():
+    """{numéro: Room} sans le statut, pour rattacher des réservations à leur chambre."""
+    return {room['number']: Room(**room) for room in room_catalog().values()}
+
+
+@cache_aside('rooms')
+def category_prices():
+    """[{category, label, rooms, min_price, max_price}] par catégorie de chambre."""
+    labels = dict(Room.Category.choices)
+    rows = Room.objects.values('category').annotate(
+        rooms=Count('id'), min_price=Min('price_per_night'), max_price=Max('price_per_night')
+    ).order_by('min_price')
+    return [dict(row, label=labels.get(row['category'], row['category'])) for row in rows]
@@ -0,0 +1,124 @@
+"""
+Rapports comptables.
+
+- Balance âgée des créances : reste à payer (Invoice.balance) par client,
+  réparti par ancienneté de la facture (0–30, 31–60, 61–90, 90+ jours),
+  calculé en une requête par agrégation conditionnelle.
+- Exports CSV des factures et paiements, écrits en flux : les lignes sont lues
+  par lots (iterator) et envoyées au fur et à mesure, la mémoire reste constante
+  quel que soit le volume et le téléchargement démarre immédiatement.
+"""
+import csv
+from datetime import datetime, time, timedelta
+
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+from .models import Invoice, Payment
+
+CHUNK_SIZE = 2000
+
+# (clé, libellé, âge minimal en jours, âge maximal en jours ou None)
+AGING_BUCKETS = (
+    ('current', '0–30 j', 0, 30),
+    ('days_60', '31–60 j', 31, 60),
+    ('days_90', '61–90 j', 61, 90),
+    ('older', '90+ j', 91, None),
+)
+
+
+def _start_of_day(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _bucket_filter(today, min_age, max_age):
+    """Factures émises il y a entre min_age et max_age jours (inclus)."""
+    condition = Q(issued_at__lt=_start_of_day(today - timedelta(days=min_age - 1)))
+    if max_age is not None:
+        condition &= Q(issued_at__gte=_start_of_day(today - timedelta(days=max_age)))
+    return condition
+
+
+def aging_report(today=None):
+    """
+    Retourne (lignes, totaux) : une ligne par client ayant un reste à payer,
+    avec un montant par tranche d'ancienneté et le total, du plus gros au plus petit.
+    """
+    today = today or timezone.localdate()
+    buckets = {
+        key: Sum('balance', filter=_bucket_filter(today, min_age, max_age), default=0)
+        for key, _, min_age, max_age in AGING_BUCKETS
+    }
+    rows = list(
+        Invoice.objects.filter(balance__gt=0)
+        .values('reservation__client', 'reservation__client__first_name', 'reservation__client__last_name')
+        .annotate(total=Sum('balance'), **buckets)
+        .order_by('-total', 'reservation__client')
+    )
+    totals = {key: sum(row[key] for row in rows) for key in [*buckets, 'total']}
+    return rows, totals
+
+
+# --- Exports CSV en flux ---
+
+class Echo:
+    """Pseudo-fichier : csv.writer écrit une ligne, on la renvoie telle quelle."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(header, rows):
+    writer = csv.writer(Echo())
+    # BOM : Excel reconnaît l'UTF-8 (accents des noms)
+    yield '\ufeff' + writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def _local(value):
+    return timezone.localtime(value).strftime('%Y-%m-%d %H:%M') if value else ''
+
+
+INVOICE_HEADER = (
+    'Facture', 'Émise le', 'Client', 'Email', 'Chambre', 'Arrivée', 'Départ',
+    'Montant total', 'Montant payé', 'Reste à payer', 'Statut',
+)
+
+
+def invoice_rows(start=None, end=None):
+    invoices = Invoice.objects.order_by('id')
+    if start:
+        invoices = invoices.filter(issued_at__gte=_start_of_day(start))
+    if end:
+        invoices = invoices.filter(issued_at__lt=_start_of_day(end + timedelta(days=1)))
+    rows = invoices.values_list(
+        'id', 'issued_at', 'reservation__client__first_name', 'reservation__client__last_name',
+        'reservation__client__email', 'reservation__room__number', 'reservation__check_in',
+        'reservation__check_out', 'total_amount', 'amount_paid', 'balance', 'status',
+    )
+    for pk, issued_at, first_name, last_name, *rest in rows.iterator(chunk_size=CHUNK_SIZE):
+        yield (pk, _local(issued_at), f"{first_name} {last_name}", *rest)
+
+
+PAYMENT_HEADER = ('Paiement', 'Date', 'Facture', 'Client', 'Mode de paiement', 'Montant')
+
+
+def payment_rows(start=None, end=None):
+    payments = Payment.objects.order_by('id')
+    if start:
+        payments = payments.filter(date__gte=_start_of_day(start))
+    if end:
+        payments = payments.filter(date__lt=_start_of_day(end + timedelta(days=1)))
+    rows = payments.values_list(
+        'id', 'date', 'invoice_id', 'invoice__reservation__client__first_name',
+        'invoice__reservation__client__last_name', 'payment_method', 'amount',
+    )
+    for pk, paid_at, invoice_id, first_name, last_name, method, amount in rows.iterator(chunk_size=CHUNK_SIZE):
+        yield (pk, _local(paid_at), invoice_id, f"{first_name} {last_name}", method, amount)
+
+
+EXPORTS = {
+    'invoices': (INVOICE_HEADER, invoice_rows),
+    'payments': (PAYMENT_HEADER, payment_rows),
+}
@@ -0,0 +1,181 @@
+"""
+Maintenance des tables d'agrégats journaliers (DailyRevenue, DailyOccupancy,
+DailyReservationCount).
+
+Chaque paiement ou réservation est réduit à un "instantané" de sa contribution.
+Les signaux retirent l'ancienne contribution et ajoutent la nouvelle avec des
+incréments F() atomiques ; `rebuild` recalcule tout depuis les tables sources.
+"""
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import DailyOccupancy, DailyReservationCount, DailyRevenue, Payment, Reservation
+from .reference import room_category
+
+BATCH_SIZE = 1000
+
+
+# --- Instantanés ---
+
+def payment_snapshot(payment):
+    """(jour, mode, montant) d'un paiement, ou None s'il n'est pas encore daté."""
+    return payment_row_snapshot(payment.date, payment.payment_method, payment.amount)
+
+
+def payment_row_snapshot(paid_at, method, amount):
+    if not paid_at:
+        return None
+    return (timezone.localdate(paid_at), method, amount)
+
+
+def reservation_snapshot(reservation, category=None):
+    """(catégorie, arrivée, départ, statut) d'une réservation."""
+    if category is None:
+        if Reservation.room.is_cached(reservation):
+            category = reservation.room.category
+        else:
+            # Chambre non chargée : catégorie lue dans le catalogue caché
+            category = room_category(reservation.room_id)
+    return (category, reservation.check_in, reservation.check_out, reservation.status)
+
+
+# --- Application incrémentale ---
+
+def apply_payment(snapshot, sign):
+    if snapshot is None:
+        return
+    day, method, amount = snapshot
+    DailyRevenue.objects.bulk_create(
+        [DailyRevenue(day=day, payment_method=method)], ignore_conflicts=True
+    )
+    DailyRevenue.objects.filter(day=day, payment_method=method).update(
+        total=F('total') + sign * amount,
+        count=F('count') + sign,
+    )
+
+
+def apply_reservation(snapshot, sign):
+    if snapshot is None:
+        return
+    category, check_in, check_out, status = snapshot
+
+    DailyReservationCount.objects.bulk_create(
+        [DailyReservationCount(day=check_in, category=category, status=status)], ignore_conflicts=True
+    )
+    DailyReservationCount.objects.filter(day=check_in, category=category, status=status).update(
+        count=F('count') + sign
+    )
+
+    # Les réservations annulées n'occupent aucune nuit
+    if status == Reservation.Status.ANNULEE or check_out <= check_in:
+        return
+    nights = (check_out - check_in).days
+    DailyOccupancy.objects.bulk_create(
+        [DailyOccupancy(day=check_in + timedelta(days=i), category=category) for i in range(nights)],
+        ignore_conflicts=True,
+    )
+    DailyOccupancy.objects.filter(category=category, day__gte=check_in, day__lt=check_out).update(
+        occupied=F('occupied') + sign
+    )
+
+
+def _bulk_increment(model, field, key_fields, deltas):
+    """
+    Applique des incréments {clé: delta} en regroupant les jours qui partagent
+    le reste de la clé et le même delta : quelques UPDATE par lot, pas un par ligne.
+    """
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    model.objects.bulk_create(
+        [model(**dict(zip(key_fields, key))) for key in deltas], ignore_conflicts=True, batch_size=BATCH_SIZE
+    )
+    groups = defaultdict(list)
+    for key, delta in deltas.items():
+        groups[(key[1:], delta)].append(key[0])
+    for (rest, delta), days in groups.items():
+        model.objects.filter(day__in=days, **dict(zip(key_fields[1:], rest))).update(
+            **{field: F(field) + delta}
+        )
+
+
+def apply_reservations(snapshots, sign=1):
+    """Version groupée d'apply_reservation, pour les imports en masse."""
+    counts, occupancy = Counter(), Counter()
+    for category, check_in, check_out, status in snapshots:
+        counts[(check_in, category, status)] += sign
+        if status == Reservation.Status.ANNULEE:
+            continue
+        for i in range((check_out - check_in).days):
+            occupancy[(check_in + timedelta(days=i), category)] += sign
+    _bulk_increment(DailyReservationCount, 'count', ('day', 'category', 'status'), counts)
+    _bulk_increment(DailyOccupancy, 'occupied', ('day', 'category'), occupancy)
+
+
+def move_room_category(room_id, previous, current):
+    """
+    Reporte les réservations d'une chambre dont la catégorie a changé : leurs
+    contributions quittent l'ancienne catégorie pour la nouvelle.
+    """
+    stays = list(Reservation.objects.filter(room_id=room_id).values_list('check_in', 'check_out', 'status'))
+    apply_reservations([(previous, *stay) for stay in stays], -1)
+    apply_reservations([(current, *stay) for stay in stays], +1)
+
+
+def replace_contribution(apply, previous, current):
+    if previous == current:
+        return
+    apply(previous, -1)
+    apply(current, +1)
+
+
+# --- Reconstruction complète ---
+
+@transaction.atomic
+def rebuild():
+    """Recalcule les trois tables d'agrégats depuis Payment et Reservation."""
+    DailyRevenue.objects.all().delete()
+    DailyOccupancy.objects.all().delete()
+    DailyReservationCount.objects.all().delete()
+
+    revenue = Payment.objects.annotate(day=TruncDate('date')).values('day', 'payment_method').annotate(
+        total=Sum('amount'), count=Count('id')
+    ).order_by()
+    DailyRevenue.objects.bulk_create(
+        (DailyRevenue(**row) for row in revenue.iterator()), batch_size=BATCH_SIZE
+    )
+
+    counts = Reservation.objects.values('check_in', 'room__category', 'status').annotate(
+        count=Count('id')
+    ).order_by()
+    DailyReservationCount.objects.bulk_create(
+        (
+            DailyReservationCount(day=row['check_in'], category=row['room__category'],
+                                  status=row['status'], count=row['count'])
+            for row in counts.iterator()
+        ),
+        batch_size=BATCH_SIZE,
+    )
+
+    occupancy = Counter()
+    stays = Reservation.objects.exclude(status=Reservation.Status.ANNULEE).values_list(
+        'room__category', 'check_in', 'check_out'
+    )
+    for category, check_in, check_out in stays.iterator(chunk_size=BATCH_SIZE):
+        for i in range((check_out - check_in).days):
+            occupancy[(check_in + timedelta(days=i), category)] += 1
+    DailyOccupancy.objects.bulk_create(
+        (DailyOccupancy(day=day, category=category, occupied=n) for (day, category), n in occupancy.items()),
+        batch_size=BATCH_SIZE,
+    )
+
+    return {
+        'revenue': DailyRevenue.objects.count(),
+        'occupancy': DailyOccupancy.objects.count(),
+        'reservations': DailyReservationCount.objects.count(),
+    }
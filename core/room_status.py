@@ -0,0 +1,65 @@
+"""
+Réconciliation du statut des chambres avec les réservations.
+
+Une chambre est OCCUPEE lorsqu'une réservation CONFIRMEE couvre la date du jour
+([check_in, check_out[), et redevient LIBRE sinon. Les chambres en MAINTENANCE
+ne sont jamais modifiées et le statut RESERVEE, posé à la main, est conservé.
+
+Le calcul est ensembliste : une requête annotée (EXISTS) pour toutes les
+chambres concernées, puis un seul bulk_update des chambres qui changent.
+Le même code sert au signal (une seule chambre) et à la commande planifiée
+`reconcile_room_statuses` (tout le parc, à minuit).
+"""
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from . import caching, live
+from .models import Reservation, Room
+from .stats import DashboardStats
+
+
+def rooms_with_occupancy(today=None):
+    today = today or timezone.localdate()
+    active = Reservation.objects.filter(
+        room=OuterRef('pk'),
+        status=Reservation.Status.CONFIRMEE,
+        check_in__lte=today,
+        check_out__gt=today,
+    )
+    return Room.objects.exclude(status=Room.Status.MAINTENANCE).annotate(is_occupied=Exists(active))
+
+
+def expected_status(room):
+    if room.is_occupied:
+        return Room.Status.OCCUPEE
+    if room.status == Room.Status.OCCUPEE:
+        return Room.Status.LIBRE
+    return room.status
+
+
+def reconcile_room_statuses(today=None, room_ids=None):
+    """
+    Aligne le statut des chambres (toutes, ou celles de `room_ids`) sur les
+    réservations du jour. Retourne la liste des chambres modifiées.
+    """
+    rooms = rooms_with_occupancy(today).only('id', 'number', 'status')
+    if room_ids is not None:
+        rooms = rooms.filter(pk__in=room_ids)
+
+    changed = []
+    for room in rooms:
+        status = expected_status(room)
+        if status != room.status:
+            room.status = status
+            changed.append(room)
+
+    if changed:
+        Room.objects.bulk_update(changed, ['status'], batch_size=1000)
+        # bulk_update n'émet pas post_save : on invalide nous-mêmes les statistiques
+        # et la grille des chambres de la réception (fragment en cache)
+        DashboardStats.invalidate()
+        caching.bump('room_status')
+        transaction.on_commit(lambda: caching.bump('room_status'))
+        live.publish_rooms(changed)
+    return changed
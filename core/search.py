@@ -0,0 +1,131 @@
+"""
+Recherche de clients (administration et réception).
+
+Chaque client porte une clé de recherche normalisée (minuscules, sans
+accents) : "Fatimé ABAKAR" se retrouve en tapant "fatime abak". Selon le
+moteur de base de données :
+
+- SQLite : table virtuelle FTS5 `core_client_fts` (rowid = id du client),
+  interrogée par préfixes de mots ;
+- PostgreSQL : index GIN pg_trgm sur `search_key`, qui accélère les
+  recherches LIKE '%terme%' ;
+- sinon : simple filtre sur `search_key`.
+
+La clé et l'index FTS sont tenus à jour par les signaux de core/signals.py ;
+`rebuild_index` les recalcule après un import en masse.
+"""
+import re
+import unicodedata
+
+from django.db import connections, router
+from django.db.models.expressions import RawSQL
+
+from .models import Client
+
+FTS_TABLE = 'core_client_fts'
+BATCH_SIZE = 1000
+
+_fts_tables = {}
+
+
+def normalize(text):
+    """Minuscules, sans accents, espaces réduits."""
+    folded = unicodedata.normalize('NFKD', text or '')
+    folded = ''.join(c for c in folded if not unicodedata.combining(c))
+    return ' '.join(folded.lower().split())
+
+
+def client_search_key(client):
+    return normalize(' '.join([
+        client.last_name or '', client.first_name or '', client.email or '', client.phone or '',
+    ]))
+
+
+def tokens(term):
+    return re.findall(r'\w+', normalize(term))
+
+
+# --- Index FTS5 (SQLite) ---
+
+def _connection():
+    return connections[router.db_for_write(Client)]
+
+
+def fts_enabled(connection=None):
+    connection = connection or _connection()
+    if connection.vendor != 'sqlite':
+        return False
+    key = (connection.alias, str(connection.settings_dict['NAME']))
+    if key not in _fts_tables:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+            _fts_tables[key] = cursor.fetchone() is not None
+    return _fts_tables[key]
+
+
+def index_client(client):
+    connection = _connection()
+    if not fts_enabled(connection):
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [client.pk])
+        cursor.execute(f"INSERT INTO {FTS_TABLE} (rowid, search_key) VALUES (%s, %s)", [client.pk, client.search_key])
+
+
+def index_clients(clients):
+    """Indexe un lot de clients déjà enregistrés (imports en masse)."""
+    connection = _connection()
+    if not fts_enabled(connection):
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {FTS_TABLE} (rowid, search_key) VALUES (%s, %s)",
+            [(client.pk, client.search_key) for client in clients],
+        )
+
+
+def unindex_client(pk):
+    connection = _connection()
+    if not fts_enabled(connection):
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [pk])
+
+
+def rebuild_index():
+    """Recalcule les clés de recherche et l'index FTS de tous les clients."""
+    stale = []
+    for client in Client.objects.only('id', 'first_name', 'last_name', 'email', 'phone', 'search_key').iterator(chunk_size=BATCH_SIZE):
+        key = client_search_key(client)
+        if key != client.search_key:
+            client.search_key = key
+            stale.append(client)
+    Client.objects.bulk_update(stale, ['search_key'], batch_size=BATCH_SIZE)
+
+    connection = _connection()
+    if fts_enabled(connection):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+            cursor.execute(f"INSERT INTO {FTS_TABLE} (rowid, search_key) SELECT id, search_key FROM core_client")
+    return len(stale)
+
+
+# --- Recherche ---
+
+def search_clients(term, queryset=None):
+    """Clients dont chaque mot recherché préfixe (SQLite) ou figure dans (ailleurs) la clé."""
+    if queryset is None:
+        queryset = Client.objects.all()
+    words = tokens(term)
+    if not words:
+        return queryset
+
+    if fts_enabled():
+        match = ' '.join(f'"{word}"*' for word in words)
+        return queryset.filter(pk__in=RawSQL(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match]
+        ))
+
+    for word in words:
+        queryset = queryset.filter(search_key__contains=word)
+    return queryset
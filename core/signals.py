@@ -1,7 +1,10 @@
-from django.db.models.signals import post_save, post_delete
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
-from django.utils import timezone
-from .models import Reservation, Room, Invoice
+from .models import Reservation, Room, Invoice, Client, Payment, User
+from .stats import DashboardStats
+from . import caching, images, invoicing, live, rollups, search
+from .room_status import reconcile_room_statuses
 
 @receiver(post_save, sender=Reservation)
 def create_invoice(sender, instance, created, **kwargs):
@@ -15,32 +18,199 @@ def create_invoice(sender, instance, created, **kwargs):
 @receiver(post_delete, sender=Reservation)
 def update_room_status(sender, instance, **kwargs):
     """
-    Met à jour le statut de la chambre automatiquement selon les réservations.
-    """
-    room = instance.room
-    today = timezone.localdate()
-
-    # On cherche s'il existe une réservation active pour cette chambre aujourd'hui
-    # Active = Statut 'CONFIRMEE' et la date actuelle est incluse dans la période [check_in, check_out[
-    active_reservation_exists = Reservation.objects.filter(
-        room=room,
-        status=Reservation.Status.CONFIRMEE,
-        check_in__lte=today,
-        check_out__gt=today
-    ).exists()
-
-    # Si la chambre est actuellement en MAINTENANCE, on ne touche pas à son statut via les réservations
-    if room.status == Room.Status.MAINTENANCE:
-        return
-
-    # Mise à jour du statut
-    if active_reservation_exists:
-        if room.status != Room.Status.OCCUPEE:
-            room.status = Room.Status.OCCUPEE
-            room.save(update_fields=['status'])
-    else:
-        # Si aucune réservation active n'est trouvée et qu'elle était marquée occupée, on la libère.
-        # Note: On pourrait raffiner pour 'RESERVEE' si check_in > today, mais le prompt demande 'LIBRE'.
-        if room.status == Room.Status.OCCUPEE:
-            room.status = Room.Status.LIBRE
-            room.save(update_fields=['status'])
+    Met à jour le statut de la chambre concernée selon les réservations du jour.
+    Mise à jour incrémentale : seule la chambre de la réservation est recalculée
+    (voir core/room_status.py, également utilisé par la réconciliation quotidienne).
+    """
+    reconcile_room_statuses(room_ids=[instance.room_id])
+
+@receiver(post_save, sender=Room)
+@receiver(post_delete, sender=Room)
+@receiver(post_save, sender=Client)
+@receiver(post_delete, sender=Client)
+@receiver(post_save, sender=Reservation)
+@receiver(post_delete, sender=Reservation)
+@receiver(post_save, sender=Payment)
+@receiver(post_delete, sender=Payment)
+@receiver(post_save, sender=Invoice)
+@receiver(post_delete, sender=Invoice)
+def invalidate_dashboard_stats(sender, **kwargs):
+    """
+    Invalide les statistiques du tableau de bord dès qu'une donnée affichée change.
+    """
+    DashboardStats.invalidate()
+
+CACHE_NAMESPACES = {Room: 'rooms', Client: 'clients', User: 'users', Reservation: 'reservations'}
+
+@receiver(post_save, sender=Room)
+@receiver(post_delete, sender=Room)
+@receiver(post_save, sender=Client)
+@receiver(post_delete, sender=Client)
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+@receiver(post_save, sender=Reservation)
+@receiver(post_delete, sender=Reservation)
+def invalidate_cache_namespace(sender, **kwargs):
+    """
+    Invalide les valeurs cachées qui dépendent du modèle modifié (données de
+    référence de core/reference.py, ETag du planning...). La version est aussi
+    incrémentée au commit : un autre processus a pu recacher l'ancienne valeur
+    entre l'écriture et la fin de la transaction.
+    """
+    namespace = CACHE_NAMESPACES[sender]
+    caching.bump(namespace)
+    transaction.on_commit(lambda: caching.bump(namespace))
+
+
+@receiver(pre_save, sender=Reservation)
+def remember_stored_reservation(sender, instance, **kwargs):
+    """
+    Mémorise, en une requête, l'état enregistré de la réservation : sa contribution
+    aux agrégats journaliers et ses éléments de facturation (chambre, dates),
+    pour les comparer une fois la modification enregistrée.
+    """
+    stored = None
+    if instance.pk:
+        stored = Reservation.objects.filter(pk=instance.pk).values_list(
+            'room_id', 'room__category', 'check_in', 'check_out', 'status'
+        ).first()
+    instance._rollup_previous = tuple(stored[1:]) if stored else None
+    instance._billing_previous = (stored[0], stored[2], stored[3]) if stored else None
+
+@receiver(post_save, sender=Reservation)
+def update_reservation_rollups(sender, instance, **kwargs):
+    rollups.replace_contribution(
+        rollups.apply_reservation,
+        getattr(instance, '_rollup_previous', None),
+        rollups.reservation_snapshot(instance),
+    )
+
+@receiver(post_save, sender=Reservation)
+def flag_invoice_for_recalculation(sender, instance, **kwargs):
+    """
+    Marque la facture à recalculer si la chambre ou les dates du séjour ont changé.
+    """
+    previous = getattr(instance, '_billing_previous', None)
+    if previous and previous != (instance.room_id, instance.check_in, instance.check_out):
+        invoicing.mark_for_recalculation(reservation_ids=[instance.pk])
+
+@receiver(post_delete, sender=Reservation)
+def remove_reservation_rollups(sender, instance, **kwargs):
+    rollups.apply_reservation(rollups.reservation_snapshot(instance), -1)
+
+@receiver(pre_save, sender=Room)
+def remember_stored_category(sender, instance, update_fields=None, **kwargs):
+    """
+    Mémorise la catégorie enregistrée de la chambre : les agrégats journaliers
+    de ses réservations sont rangés par catégorie.
+    """
+    instance._category_previous = None
+    if instance.pk and (update_fields is None or 'category' in update_fields):
+        instance._category_previous = Room.objects.filter(pk=instance.pk).values_list('category', flat=True).first()
+
+@receiver(post_save, sender=Room)
+def move_room_rollups(sender, instance, **kwargs):
+    previous = getattr(instance, '_category_previous', None)
+    if previous and previous != instance.category:
+        rollups.move_room_category(instance.pk, previous, instance.category)
+
+@receiver(pre_save, sender=Payment)
+def remember_stored_payment(sender, instance, **kwargs):
+    """
+    Mémorise, en une requête, la contribution enregistrée du paiement au revenu
+    journalier et au solde de sa facture.
+    """
+    stored = None
+    if instance.pk:
+        stored = Payment.objects.filter(pk=instance.pk).values_list(
+            'invoice_id', 'date', 'payment_method', 'amount'
+        ).first()
+    instance._rollup_previous = rollups.payment_row_snapshot(*stored[1:]) if stored else None
+    instance._balance_previous = (stored[0], stored[3]) if stored else None
+
+@receiver(post_save, sender=Payment)
+def update_payment_rollups(sender, instance, **kwargs):
+    """
+    Reporte le paiement dans le revenu journalier (incréments F() atomiques).
+    """
+    rollups.replace_contribution(
+        rollups.apply_payment,
+        getattr(instance, '_rollup_previous', None),
+        rollups.payment_snapshot(instance),
+    )
+
+@receiver(post_save, sender=Payment)
+def update_invoice_balance(sender, instance, **kwargs):
+    """
+    Reporte le paiement sur le montant payé, le solde et le statut de la facture.
+    """
+    rollups.replace_contribution(
+        invoicing.apply_payment,
+        getattr(instance, '_balance_previous', None),
+        invoicing.payment_snapshot(instance),
+    )
+
+@receiver(post_delete, sender=Payment)
+def remove_payment_rollups(sender, instance, **kwargs):
+    rollups.apply_payment(rollups.payment_snapshot(instance), -1)
+    invoicing.apply_payment(invoicing.payment_snapshot(instance), -1)
+
+
+@receiver(pre_save, sender=Client)
+def update_client_search_key(sender, instance, **kwargs):
+    """
+    Recalcule la clé de recherche normalisée (sans accents, minuscules) du client.
+    """
+    instance.search_key = search.client_search_key(instance)
+
+@receiver(post_save, sender=Client)
+def index_client(sender, instance, **kwargs):
+    search.index_client(instance)
+
+@receiver(post_delete, sender=Client)
+def unindex_client(sender, instance, **kwargs):
+    search.unindex_client(instance.pk)
+
+
+IMAGE_FIELDS = {Room: 'image', User: 'profile_photo'}
+
+@receiver(pre_save, sender=Room)
+@receiver(pre_save, sender=User)
+def remember_stored_image(sender, instance, update_fields=None, **kwargs):
+    """
+    Mémorise le nom de la photo enregistrée, pour supprimer ses variantes si
+    elle est remplacée (rien à lire si la photo n'est pas parmi les champs sauvés,
+    ex. last_login à la connexion).
+    """
+    field = IMAGE_FIELDS[sender]
+    instance._image_previous = None
+    if instance.pk and (update_fields is None or field in update_fields):
+        instance._image_previous = sender._default_manager.filter(pk=instance.pk).values_list(field, flat=True).first()
+
+@receiver(post_save, sender=Room)
+@receiver(post_save, sender=User)
+def delete_replaced_image_variants(sender, instance, **kwargs):
+    previous = getattr(instance, '_image_previous', None)
+    if previous and previous != getattr(instance, IMAGE_FIELDS[sender]).name:
+        transaction.on_commit(lambda: images.delete_variants(previous))
+
+@receiver(post_delete, sender=Room)
+@receiver(post_delete, sender=User)
+def delete_image_variants(sender, instance, **kwargs):
+    name = getattr(instance, IMAGE_FIELDS[sender]).name
+    if name:
+        transaction.on_commit(lambda: images.delete_variants(name))
+
+
+@receiver(post_save, sender=Room)
+def publish_room_change(sender, instance, **kwargs):
+    """Tableau en direct : statut de la chambre (réception, voir core/live.py)."""
+    live.publish_on_commit('room', live.room_delta(instance))
+
+@receiver(post_save, sender=Reservation)
+def publish_reservation_change(sender, instance, created, **kwargs):
+    live.publish_on_commit('reservation', live.reservation_delta(instance, created=created))
+
+@receiver(post_delete, sender=Reservation)
+def publish_reservation_removal(sender, instance, **kwargs):
+    live.publish_on_commit('reservation', live.reservation_delta(instance, deleted=True))
@@ -0,0 +1,157 @@
+"""
+Fichiers statiques servis par l'application (sans serveur web devant).
+
+- CompressedManifestStaticFilesStorage : à `collectstatic`, chaque fichier est
+  copié sous un nom contenant l'empreinte de son contenu (style.3f2a9c1b7e4d.css,
+  voir ManifestStaticFilesStorage), puis les fichiers texte sont précompressés
+  en .gz et, si le paquet `brotli` est installé, en .br ;
+- StaticAssetsMiddleware : sert STATIC_ROOT avant les sessions et la base,
+  choisit la variante selon Accept-Encoding et marque les noms à empreinte
+  comme immuables (Cache-Control: immutable, un an) : le navigateur ne les
+  redemande plus, un fichier modifié change de nom.
+
+Actifs hors DEBUG (voir settings.py), après `python manage.py collectstatic`.
+"""
+import gzip
+import json
+import mimetypes
+import os
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe
+
+try:
+    import brotli
+except ImportError:  # Brotli facultatif : gzip seul
+    brotli = None
+
+COMPRESSIBLE = ('.css', '.js', '.map', '.svg', '.json', '.txt', '.html', '.xml', '.ico')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+# Fichiers sans empreinte (copies d'origine) : revalidation fréquente
+REVALIDATE = 'public, max-age=60'
+
+
+def compress_file(path):
+    """Écrit path.gz (et path.br) si la variante est plus petite ; retourne les chemins écrits."""
+    with open(path, 'rb') as source:
+        data = source.read()
+    variants = [('.gz', gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append(('.br', brotli.compress(data, quality=11)))
+    written = []
+    for suffix, compressed in variants:
+        if len(compressed) < len(data):
+            with open(path + suffix, 'wb') as target:
+                target.write(compressed)
+            written.append(path + suffix)
+    return written
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        names = set(paths) | set(self.hashed_files.values())
+        for name in sorted(names):
+            if name.endswith(COMPRESSIBLE) and self.exists(name):
+                compress_file(self.path(name))
+
+
+# --- Service ---
+
+class StaticAssetsMiddleware:
+    """
+    Répond aux URL sous STATIC_URL à partir de STATIC_ROOT (index construit une
+    fois au démarrage : pas d'accès disque pour une URL inconnue). Fonctionne en
+    WSGI comme en ASGI : en asynchrone, le fichier est ouvert hors de la boucle
+    d'événements.
+    """
+
+    ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        self.prefix = '/' + settings.STATIC_URL.lstrip('/')
+        self.files = self.scan(settings.STATIC_ROOT)
+        self.immutable = self.hashed_names(settings.STATIC_ROOT)
+
+    @staticmethod
+    def scan(root):
+        """{nom relatif: {'': chemin, 'gzip': chemin.gz, 'br': chemin.br}}"""
+        files = {}
+        if not root or not os.path.isdir(root):
+            return files
+        for directory, _, filenames in os.walk(root):
+            for filename in filenames:
+                path = os.path.join(directory, filename)
+                name = os.path.relpath(path, root).replace(os.sep, '/')
+                for encoding, suffix in StaticAssetsMiddleware.ENCODINGS:
+                    if name.endswith(suffix):
+                        files.setdefault(name[:-len(suffix)], {})[encoding] = path
+                        break
+                else:
+                    files.setdefault(name, {})[''] = path
+        return {name: variants for name, variants in files.items() if '' in variants}
+
+    @staticmethod
+    def hashed_names(root):
+        manifest = os.path.join(root or '', ManifestStaticFilesStorage.manifest_name)
+        if not os.path.isfile(manifest):
+            return set()
+        with open(manifest, encoding='utf-8') as handle:
+            return set(json.load(handle).get('paths', {}).values())
+
+    def match(self, request):
+        """(nom, variantes) du fichier demandé, ou None si l'URL n'est pas un fichier collecté."""
+        if request.method in ('GET', 'HEAD') and request.path_info.startswith(self.prefix):
+            name = request.path_info[len(self.prefix):]
+            variants = self.files.get(name)
+            if variants is not None:
+                return name, variants
+        return None
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        found = self.match(request)
+        if found is not None:
+            return self.serve(request, *found)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        found = self.match(request)
+        if found is not None:
+            return await sync_to_async(self.serve, thread_sensitive=False)(request, *found)
+        return await self.get_response(request)
+
+    def serve(self, request, name, variants):
+        accepted = request.headers.get('Accept-Encoding', '')
+        encoding, path = '', variants['']
+        for candidate, _ in self.ENCODINGS:
+            if candidate in variants and candidate in accepted:
+                encoding, path = candidate, variants[candidate]
+                break
+
+        modified = int(os.stat(variants['']).st_mtime)
+        since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+        if since is not None and modified <= since:
+            response = HttpResponseNotModified()
+        else:
+            content_type, _ = mimetypes.guess_type(name)
+            response = FileResponse(open(path, 'rb'), content_type=content_type or 'application/octet-stream')
+            if encoding:
+                response['Content-Encoding'] = encoding
+        response['Last-Modified'] = http_date(modified)
+        response['Cache-Control'] = IMMUTABLE if name in self.immutable else REVALIDATE
+        if len(variants) > 1:
+            patch_vary_headers(response, ('Accept-Encoding',))
+        return response
@@ -0,0 +1,219 @@
+"""
+Statistiques partagées du tableau de bord et de l'accueil de l'administration.
+
+Une seule source de vérité pour les indicateurs (occupation, clients,
+réservations, revenus), utilisée par dashboard_view et par le tag
+`get_dashboard_stats`. Les valeurs sont :
+
+- calculées par agrégation conditionnelle, en un minimum de requêtes, à partir
+  des tables d'agrégats journaliers (voir core/rollups.py) ;
+- mémorisées pour la durée d'une requête HTTP ;
+- sur cache froid, calculées en parallèle par dashboard_view (vue asynchrone,
+  un thread et une connexion par agrégat, voir core/parallel.py) ;
+- mises en cache entre les requêtes sous des clés versionnées (espace 'stats'
+  de core/caching.py). Les signaux de core/signals.py incrémentent la version
+  dès qu'une donnée affichée change, ce qui rend d'un coup toutes les
+  anciennes entrées inaccessibles.
+"""
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from . import caching, parallel
+from .models import Client, DailyReservationCount, DailyRevenue, Invoice, Reservation, Room
+
+
+class DashboardStats:
+    CACHE_NAMESPACE = 'stats'
+    CACHE_TTL = 60  # secondes
+
+    def __init__(self, today=None):
+        self.today = today or timezone.localdate()
+        self._memo = {}
+
+    # --- Accès ---
+
+    @classmethod
+    def for_request(cls, request=None):
+        """Instance partagée par tous les appelants d'une même requête HTTP."""
+        if request is None:
+            return cls()
+        stats = getattr(request, '_dashboard_stats', None)
+        if stats is None:
+            stats = request._dashboard_stats = cls()
+        return stats
+
+    @classmethod
+    def get(cls, request=None):
+        """Contexte complet de dashboard_view."""
+        return cls.for_request(request).dashboard()
+
+    @classmethod
+    async def aget(cls, request=None):
+        """Contexte complet de dashboard_view, requêtes du calcul en parallèle."""
+        return await cls.for_request(request).adashboard()
+
+    def summary(self):
+        """Indicateurs clés (accueil de l'administration)."""
+        return self._cached('summary', self._compute_summary)
+
+    def dashboard(self):
+        """Indicateurs clés, graphiques et dernières réservations."""
+        return self._cached('dashboard', self._compute_dashboard)
+
+    async def adashboard(self):
+        """Comme dashboard(), chaque agrégat du calcul dans sa propre connexion (core/parallel.py)."""
+        if 'dashboard' not in self._memo:
+            summary_key, dashboard_key = await sync_to_async(
+                lambda: (self.cache_key('summary'), self.cache_key('dashboard'))
+            )()
+            cached = await cache.aget_many([summary_key, dashboard_key])
+            data = cached.get(dashboard_key)
+            if data is None:
+                # Indicateurs clés déjà en cache (accueil de l'administration) : pas recalculés
+                names = self.DASHBOARD_PARTS if summary_key in cached else self.SUMMARY_PARTS + self.DASHBOARD_PARTS
+                parts = await parallel.gather(*(getattr(self, name) for name in names))
+                summary = cached.get(summary_key) or self._merge(parts[:len(self.SUMMARY_PARTS)])
+                data = self._merge([summary, *parts[-len(self.DASHBOARD_PARTS):]])
+                await cache.aset_many({summary_key: summary, dashboard_key: data}, self.CACHE_TTL)
+            self._memo['dashboard'] = data
+        return self._memo['dashboard']
+
+    # --- Cache ---
+
+    @classmethod
+    def version(cls):
+        return caching.version(cls.CACHE_NAMESPACE)
+
+    @classmethod
+    def invalidate(cls):
+        caching.bump(cls.CACHE_NAMESPACE)
+
+    def cache_key(self, name):
+        # La date fait partie de la clé : les compteurs "à venir" changent à minuit
+        return caching.key(self.CACHE_NAMESPACE, f"{name}:{self.today.isoformat()}")
+
+    def _cached(self, name, compute):
+        if name not in self._memo:
+            key = self.cache_key(name)
+            data = cache.get(key)
+            if data is None:
+                data = compute()
+                cache.set(key, data, self.CACHE_TTL)
+            self._memo[name] = data
+        return self._memo[name]
+
+    # --- Calculs ---
+
+    # Agrégats indépendants (une requête chacun), fusionnés dans l'ordre
+    SUMMARY_PARTS = ('_room_stats', '_reservation_stats', '_client_stats', '_paid_revenue')
+    DASHBOARD_PARTS = ('_revenue_stats', '_recent_reservations')
+
+    @staticmethod
+    def _merge(parts):
+        data = {}
+        for part in parts:
+            data.update(part)
+        return data
+
+    def _compute_summary(self):
+        return self._merge(getattr(self, name)() for name in self.SUMMARY_PARTS)
+
+    def _compute_dashboard(self):
+        data = dict(self.summary())
+        data.update(self._merge(getattr(self, name)() for name in self.DASHBOARD_PARTS))
+        return data
+
+    def _client_stats(self):
+        return {'total_clients': Client.objects.count()}
+
+    def _paid_revenue(self):
+        # Revenu encaissé : factures soldées
+        return {'revenue': Invoice.objects.filter(status=Invoice.Status.PAYEE).aggregate(
+            total=Sum('total_amount', default=0)
+        )['total']}
+
+    def _recent_reservations(self):
+        # 7. Dernières Réservations
+        return {'recent_reservations': list(
+            Reservation.objects.select_related('client', 'room').order_by('-created_at')[:5]
+        )}
+
+    def _room_stats(self):
+        # 1. Taux d'occupation et 8. distribution des statuts, en une requête.
+        # Une chambre est "occupée" lorsqu'elle a le statut OCCUPEE.
+        aggregates = {'total': Count('id')}
+        for status in Room.Status.values:
+            aggregates[status] = Count('id', filter=Q(status=status))
+        counts = Room.objects.aggregate(**aggregates)
+
+        total_rooms = counts.pop('total')
+        occupied_rooms = counts[Room.Status.OCCUPEE]
+        occupation_rate = 0
+        if total_rooms > 0:
+            occupation_rate = round((occupied_rooms / total_rooms) * 100, 1)
+        return {
+            'occupation_rate': occupation_rate,
+            'occupied_rooms': occupied_rooms,
+            'total_rooms': total_rooms,
+            'rooms_available': counts[Room.Status.LIBRE],
+            'room_status': {status: count for status, count in counts.items() if count},
+        }
+
+    def _revenue_stats(self):
+        # 2. Revenu du mois et 6. tendance sur 6 mois : le mois courant est
+        # la dernière ligne de la tendance, une seule requête suffit.
+        start_of_month = self.today.replace(day=1)
+        last_6_months = self.today - timedelta(days=180)
+        revenue_trend = DailyRevenue.objects.filter(day__gte=last_6_months).annotate(
+            month=TruncMonth('day')
+        ).values('month').annotate(
+            total=Sum('total')
+        ).order_by('month')
+
+        monthly_revenue = 0
+        rev_labels, rev_data = [], []
+        for item in revenue_trend:
+            if item['month'] == start_of_month:
+                monthly_revenue = item['total']
+            rev_labels.append(item['month'].strftime('%B'))
+            rev_data.append(float(item['total']))  # Decimal as float for JSON
+        return {
+            'monthly_revenue': monthly_revenue,
+            'rev_labels': rev_labels,
+            'rev_data': rev_data,
+        }
+
+    def _reservation_stats(self):
+        # 3. Réservations à venir, 5. répartition par catégorie et compteurs
+        # par statut, en une requête sur l'agrégat journalier
+        upcoming = Q(
+            day__gte=self.today,
+            status__in=[Reservation.Status.CONFIRMEE, Reservation.Status.EN_ATTENTE],
+        )
+        cat_stats = DailyReservationCount.objects.filter(count__gt=0).values('category').annotate(
+            total=Sum('count'),
+            upcoming=Sum('count', filter=upcoming, default=0),
+            pending=Sum('count', filter=Q(status=Reservation.Status.EN_ATTENTE), default=0),
+            confirmed=Sum('count', filter=Q(status=Reservation.Status.CONFIRMEE), default=0),
+        ).order_by('-total')
+
+        labels = dict(Room.Category.choices)
+        data = {
+            'cat_labels': [],
+            'cat_data': [],
+            'upcoming_reservations': 0,
+            'reservations_pending': 0,
+            'reservations_confirmed': 0,
+        }
+        for item in cat_stats:
+            data['cat_labels'].append(labels.get(item['category']))
+            data['cat_data'].append(item['total'])
+            data['upcoming_reservations'] += item['upcoming']
+            data['reservations_pending'] += item['pending']
+            data['reservations_confirmed'] += item['confirmed']
+        return data
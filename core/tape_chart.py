@@ -0,0 +1,127 @@
+"""
+Planning des chambres ("tape chart") sur une fenêtre de N jours.
+
+Une requête lit toutes les réservations non annulées qui intersectent la
+fenêtre, triées par chambre puis par arrivée ; un balayage unique les range
+ensuite par chambre, en couloirs (lanes) si des séjours se chevauchent, et
+découpe chaque couloir en cellules (séjour ou plage libre) prêtes à afficher.
+Les chambres viennent du catalogue caché (core/reference.py).
+
+L'ETag du planning dérive des versions de cache 'reservations', 'rooms' et
+'clients' (incrémentées à chaque écriture) et des paramètres de la fenêtre :
+un planning inchangé se revalide en 304 sans rien recalculer.
+"""
+from dataclasses import dataclass, field
+from datetime import timedelta
+from itertools import groupby
+
+from . import caching
+from .availability import blocking_reservations
+from .reference import room_catalog
+
+DEFAULT_DAYS = 30
+MAX_DAYS = 180
+
+
+@dataclass
+class Booking:
+    id: int
+    check_in: object
+    check_out: object
+    status: str
+    client: str
+    start: int  # décalage (jours) dans la fenêtre
+    end: int    # exclusif
+
+    def as_dict(self):
+        return {
+            'id': self.id,
+            'check_in': self.check_in.isoformat(),
+            'check_out': self.check_out.isoformat(),
+            'status': self.status,
+            'client': self.client,
+            'start': self.start,
+            'end': self.end,
+        }
+
+
+@dataclass
+class RoomLine:
+    room: dict
+    lanes: list = field(default_factory=list)  # [[Booking]] sans chevauchement par couloir
+
+    def cells(self, days):
+        """Par couloir : [(colspan, Booking ou None)] couvrant toute la fenêtre."""
+        rows = []
+        for lane in self.lanes or [[]]:
+            cells, cursor = [], 0
+            for booking in lane:
+                if booking.start > cursor:
+                    cells.append((booking.start - cursor, None))
+                cells.append((booking.end - booking.start, booking))
+                cursor = booking.end
+            if cursor < days:
+                cells.append((days - cursor, None))
+            rows.append(cells)
+        return rows
+
+
+def etag(start, days, category=None):
+    return (
+        f'"tape-{caching.version("reservations")}-{caching.version("rooms")}-{caching.version("clients")}'
+        f'-{start.isoformat()}-{days}-{category or ""}"'
+    )
+
+
+def _place(lanes, booking):
+    """Premier couloir libre à partir de booking.start (balayage d'intervalles)."""
+    for lane in lanes:
+        if lane[-1].end <= booking.start:
+            lane.append(booking)
+            return
+    lanes.append([booking])
+
+
+def build(start, days=DEFAULT_DAYS, category=None):
+    """Lignes du planning (une par chambre, triées par numéro) pour [start, start + days[."""
+    end = start + timedelta(days=days)
+    rooms = [room for room in room_catalog().values() if not category or room['category'] == category]
+
+    stays = blocking_reservations().filter(check_in__lt=end, check_out__gt=start).order_by(
+        'room_id', 'check_in', 'id'
+    ).values_list('id', 'room_id', 'check_in', 'check_out', 'status', 'client__first_name', 'client__last_name')
+    if category:
+        stays = stays.filter(room__category=category)
+
+    lines = {room['id']: RoomLine(room) for room in rooms}
+    for room_id, rows in groupby(stays, key=lambda row: row[1]):
+        line = lines.get(room_id)
+        if line is None:
+            continue
+        for pk, _, check_in, check_out, status, first_name, last_name in rows:
+            _place(line.lanes, Booking(
+                id=pk,
+                check_in=check_in,
+                check_out=check_out,
+                status=status,
+                client=f"{first_name} {last_name}",
+                start=max((check_in - start).days, 0),
+                end=min((check_out - start).days, days),
+            ))
+    return [lines[room['id']] for room in rooms]
+
+
+def as_json(lines, start, days):
+    return {
+        'start': start.isoformat(),
+        'days': days,
+        'rooms': [
+            {
+                'id': line.room['id'],
+                'number': line.room['number'],
+                'category': line.room['category'],
+                'bookings': [booking.as_dict() for lane in line.lanes for booking in lane],
+            }
+            for line in lines
+        ],
+    }
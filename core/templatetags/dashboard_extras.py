@@ -1,36 +1,19 @@
 from django import template
-from django.db.models import Sum
-from core.models import Client, Room, Reservation, Invoice
+from core.stats import DashboardStats
 
 register = template.Library()
 
-@register.simple_tag
-def get_dashboard_stats():
-    # Clients
-    total_clients = Client.objects.count()
-    
-    # Rooms
-    rooms_total = Room.objects.count()
-    # Assuming 'LIBRE' is the code for free rooms based on models.py
-    rooms_available = Room.objects.filter(status='LIBRE').count()
-    occupancy_rate = 0
-    if rooms_total > 0:
-        occupancy_rate = int(((rooms_total - rooms_available) / rooms_total) * 100)
-    
-    # Reservations
-    reservations_pending = Reservation.objects.filter(status='EN_ATTENTE').count()
-    reservations_confirmed = Reservation.objects.filter(status='CONFIRMEE').count()
-    
-    # Revenue (Paid invoices)
-    revenue_data = Invoice.objects.filter(status='PAYEE').aggregate(total=Sum('total_amount'))
-    revenue = revenue_data['total'] if revenue_data['total'] else 0
-    
+@register.simple_tag(takes_context=True)
+def get_dashboard_stats(context):
+    # Mêmes chiffres que le tableau de bord : calculés une fois par requête,
+    # puis servis depuis le cache tant qu'aucune donnée n'a changé.
+    stats = DashboardStats.for_request(context.get('request')).summary()
     return {
-        'total_clients': total_clients,
-        'rooms_total': rooms_total,
-        'rooms_available': rooms_available,
-        'occupancy_rate': occupancy_rate,
-        'reservations_pending': reservations_pending,
-        'reservations_confirmed': reservations_confirmed,
-        'revenue': revenue,
+        'total_clients': stats['total_clients'],
+        'rooms_total': stats['total_rooms'],
+        'rooms_available': stats['rooms_available'],
+        'occupancy_rate': int(stats['occupation_rate']),
+        'reservations_pending': stats['reservations_pending'],
+        'reservations_confirmed': stats['reservations_confirmed'],
+        'revenue': stats['revenue'],
     }
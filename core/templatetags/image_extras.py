@@ -0,0 +1,13 @@
+from django import template
+from core import images
+
+register = template.Library()
+
+@register.simple_tag
+def image_variant(field_file, spec):
+    # Vignette WebP de la photo (générée au premier affichage), ou '' sans photo
+    return images.variant_url(field_file, spec) or ''
+
+@register.simple_tag
+def avatar_url(user):
+    return images.avatar_url(user)
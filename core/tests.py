@@ -1,9 +1,21 @@
-from django.test import TestCase
+import random
+from io import BytesIO, StringIO
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management import call_command
+from django.db import connection, models
+from django.test import TestCase, TransactionTestCase, modify_settings, override_settings
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 from datetime import timedelta
 from .models import Room, Client, Reservation, Invoice
 
+# Profil à cache partagé (Redis, fichiers) : session et utilisateur lus depuis le cache.
+# Les tests tournent dans un seul processus, où le cache mémoire reste cohérent.
+cached_auth = override_settings(
+    SESSION_ENGINE='django.contrib.sessions.backends.cached_db',
+    AUTHENTICATION_BACKENDS=['core.authentication.CachedModelBackend'],
+)
+
 class HotelSystemTest(TestCase):
     def setUp(self):
         # Création des données de base pour les tests
@@ -89,3 +101,1327 @@ class HotelSystemTest(TestCase):
         # Ici self.client est bien le client de test Django
         response = self.client.get('/dashboard/')
         self.assertEqual(response.status_code, 200)
+
+
+class AvailabilityTest(TestCase):
+    def setUp(self):
+        self.room = Room.objects.create(number="201", category=Room.Category.DOUBLE, price_per_night=45000, capacity=2)
+        self.other_room = Room.objects.create(number="202", category=Room.Category.DOUBLE, price_per_night=45000, capacity=2)
+        self.hotel_client = Client.objects.create(
+            first_name="Dispo", last_name="Test", email="dispo@example.com", phone="11111111", id_document="CNI-DISPO"
+        )
+        self.today = timezone.localdate()
+        Reservation.objects.create(
+            client=self.hotel_client, room=self.room,
+            check_in=self.today + timedelta(days=2), check_out=self.today + timedelta(days=5),
+            status=Reservation.Status.CONFIRMEE
+        )
+
+    def test_index_matches_database(self):
+        """Test: L'index en mémoire et la requête SQL donnent le même verdict."""
+        from .availability import AvailabilityIndex, is_room_available
+        index = AvailabilityIndex.for_window(self.today, self.today + timedelta(days=30))
+        for start, end in [(0, 2), (0, 3), (3, 4), (4, 8), (5, 6), (1, 9)]:
+            a, b = self.today + timedelta(days=start), self.today + timedelta(days=end)
+            self.assertEqual(index.is_free(self.room.id, a, b), is_room_available(self.room, a, b))
+
+    def test_bulk_check_and_free_rooms(self):
+        """Test: Vérification groupée et liste des chambres libres."""
+        from .availability import available_rooms, check_stays
+        a, b = self.today + timedelta(days=3), self.today + timedelta(days=4)
+        with self.assertNumQueries(1):
+            result = check_stays([(self.room.id, a, b), (self.other_room.id, a, b)])
+        self.assertEqual(result, [False, True])
+        self.assertEqual(list(available_rooms(a, b)), [self.other_room])
+
+    def test_overlap_query_uses_checkout_index(self):
+        """Test: Le contrôle de chevauchement parcourt l'index (room, check_out), sans tri."""
+        from .availability import overlapping_reservations
+        if connection.vendor != 'sqlite':
+            self.skipTest('plan EXPLAIN QUERY PLAN propre à SQLite')
+        qs = overlapping_reservations(self.room, self.today, self.today + timedelta(days=3), exclude_pk=1)
+        sql, params = qs.values('pk').query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' '.join(row[-1] for row in cursor.fetchall())
+        self.assertIn('reservation_room_checkout_idx', plan)
+        self.assertIn('check_out>?', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+
+class ConcurrentBookingTest(TransactionTestCase):
+    def test_parallel_bookings_never_overlap(self):
+        """Test: Des centaines de réservations simultanées ne produisent aucun chevauchement."""
+        from .booking import book_room
+        room = Room.objects.create(number="301", category=Room.Category.SUITE, price_per_night=85000, capacity=4)
+        hotel_client = Client.objects.create(
+            first_name="Course", last_name="Test", email="race@example.com", phone="22222222", id_document="CNI-RACE"
+        )
+        today = timezone.localdate()
+        rng = random.Random(42)
+        stays = [(rng.randint(0, 60), rng.randint(1, 5)) for _ in range(300)]
+
+        def attempt(stay):
+            offset, nights = stay
+            try:
+                book_room(hotel_client, room, today + timedelta(days=offset),
+                          today + timedelta(days=offset + nights), Reservation.Status.CONFIRMEE)
+                return True
+            except ValidationError:
+                return False
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            accepted = sum(pool.map(attempt, stays))
+
+        booked = list(Reservation.objects.filter(room=room).order_by('check_in').values_list('check_in', 'check_out'))
+        self.assertEqual(len(booked), accepted)
+        for (_, previous_out), (next_in, _) in zip(booked, booked[1:]):
+            self.assertLessEqual(previous_out, next_in)
+
+    def test_database_lock_alone_prevents_overlap(self):
+        """Test: Sans le verrou du processus, le verrou transactionnel suffit (plusieurs workers)."""
+        from contextlib import nullcontext
+        from unittest import mock
+        from .booking import book_room
+        room = Room.objects.create(number="302", category=Room.Category.SUITE, price_per_night=85000, capacity=4)
+        hotel_client = Client.objects.create(
+            first_name="Worker", last_name="Test", email="workers@example.com", phone="22222223", id_document="CNI-WORKERS"
+        )
+        today = timezone.localdate()
+        rng = random.Random(7)
+        stays = [(rng.randint(0, 30), rng.randint(1, 5)) for _ in range(120)]
+
+        def attempt(stay):
+            offset, nights = stay
+            try:
+                book_room(hotel_client, room, today + timedelta(days=offset),
+                          today + timedelta(days=offset + nights), Reservation.Status.CONFIRMEE)
+                return True
+            except ValidationError:
+                return False
+            finally:
+                connection.close()
+
+        # Chaque thread se comporte comme un worker distinct : seul le verrou de la base les sépare.
+        # SQLite en BEGIN DEFERRED : c'est _lock_room_row, et non BEGIN IMMEDIATE, qui prend le verrou.
+        options = {'transaction_mode': 'DEFERRED'} if connection.vendor == 'sqlite' else {}
+        with mock.patch('core.booking._local_lock', lambda room_id: nullcontext()), \
+                mock.patch.dict(connection.settings_dict['OPTIONS'], options):
+            with ThreadPoolExecutor(max_workers=16) as pool:
+                accepted = sum(pool.map(attempt, stays))
+
+        booked = list(Reservation.objects.filter(room=room).order_by('check_in').values_list('check_in', 'check_out'))
+        self.assertEqual(len(booked), accepted)
+        for (_, previous_out), (next_in, _) in zip(booked, booked[1:]):
+            self.assertLessEqual(previous_out, next_in)
+
+
+class DashboardStatsTest(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.room = Room.objects.create(number="401", category=Room.Category.SIMPLE, price_per_night=25000, capacity=1)
+        self.hotel_client = Client.objects.create(
+            first_name="Stats", last_name="Test", email="stats@example.com", phone="33333333", id_document="CNI-STATS"
+        )
+        self.today = timezone.localdate()
+
+    def test_stats_are_cached_and_invalidated(self):
+        """Test: Les statistiques sont calculées en peu de requêtes, cachées puis invalidées."""
+        from .stats import DashboardStats
+        with self.assertNumQueries(6):
+            stats = DashboardStats.get()
+        self.assertEqual(stats['total_rooms'], 1)
+        self.assertEqual(stats['upcoming_reservations'], 0)
+        with self.assertNumQueries(0):
+            DashboardStats.get()
+
+        Reservation.objects.create(
+            client=self.hotel_client, room=self.room,
+            check_in=self.today + timedelta(days=1), check_out=self.today + timedelta(days=2),
+            status=Reservation.Status.CONFIRMEE
+        )
+        stats = DashboardStats.get()
+        self.assertEqual(stats['upcoming_reservations'], 1)
+        self.assertEqual(stats['cat_data'], [1])
+
+    def test_dashboard_renders_for_logged_in_user(self):
+        """Test: Le dashboard s'affiche pour un utilisateur connecté."""
+        from .models import User
+        user = User.objects.create_user('stats', 'stats@hotel.com', 'pass')
+        self.client.force_login(user)
+        response = self.client.get('/dashboard/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total_rooms'], 1)
+
+    def test_admin_stats_tag_shares_dashboard_cache(self):
+        """Test: Le tag de l'accueil admin réutilise le cache du dashboard, sans requête."""
+        from django.template import Context, Template
+        from .stats import DashboardStats
+        DashboardStats.get()
+        template = Template("{% load dashboard_extras %}{% get_dashboard_stats as stats %}{{ stats.rooms_total }}/{{ stats.occupancy_rate }}")
+        with self.assertNumQueries(0):
+            self.assertEqual(template.render(Context({})), "1/0")
+
+
+class RollupTest(TestCase):
+    def setUp(self):
+        self.room = Room.objects.create(number="501", category=Room.Category.SUITE, price_per_night=85000, capacity=4)
+        self.hotel_client = Client.objects.create(
+            first_name="Rollup", last_name="Test", email="rollup@example.com", phone="44444444", id_document="CNI-ROLL"
+        )
+        self.today = timezone.localdate()
+
+    def _snapshot(self):
+        from .models import DailyOccupancy, DailyReservationCount, DailyRevenue
+        return (
+            sorted(DailyRevenue.objects.filter(count__gt=0).values_list('day', 'payment_method', 'total', 'count')),
+            sorted(DailyOccupancy.objects.filter(occupied__gt=0).values_list('day', 'category', 'occupied')),
+            sorted(DailyReservationCount.objects.filter(count__gt=0).values_list('day', 'category', 'status', 'count')),
+        )
+
+    def test_incremental_rollups_match_rebuild(self):
+        """Test: Les agrégats maintenus par signaux sont identiques à une reconstruction complète."""
+        from .models import DailyOccupancy, Payment
+        res = Reservation.objects.create(
+            client=self.hotel_client, room=self.room,
+            check_in=self.today, check_out=self.today + timedelta(days=3),
+            status=Reservation.Status.CONFIRMEE
+        )
+        Payment.objects.create(invoice=res.invoice, amount=85000, payment_method=Payment.Method.CARTE)
+        cash = Payment.objects.create(invoice=res.invoice, amount=1000, payment_method=Payment.Method.ESPECES)
+        cash.delete()
+
+        res.check_out = self.today + timedelta(days=2)
+        res.save()
+        self.assertEqual(DailyOccupancy.objects.filter(occupied=1).count(), 2)
+
+        incremental = self._snapshot()
+        call_command('rebuild_rollups', stdout=StringIO())
+        self.assertEqual(incremental, self._snapshot())
+
+    def test_room_category_change_moves_rollups(self):
+        """Test: Changer la catégorie d'une chambre déplace les agrégats de ses réservations."""
+        from .models import DailyOccupancy
+        Reservation.objects.create(
+            client=self.hotel_client, room=self.room,
+            check_in=self.today, check_out=self.today + timedelta(days=2),
+            status=Reservation.Status.CONFIRMEE
+        )
+        Reservation.objects.create(
+            client=self.hotel_client, room=self.room,
+            check_in=self.today + timedelta(days=4), check_out=self.today + timedelta(days=5),
+            status=Reservation.Status.ANNULEE
+        )
+        self.room.category = Room.Category.DOUBLE
+        self.room.save()
+        self.assertFalse(DailyOccupancy.objects.filter(category=Room.Category.SUITE, occupied__gt=0).exists())
+        self.assertEqual(DailyOccupancy.objects.filter(category=Room.Category.DOUBLE, occupied=1).count(), 2)
+
+        incremental = self._snapshot()
+        call_command('rebuild_rollups', stdout=StringIO())
+        self.assertEqual(incremental, self._snapshot())
+
+
+class ReceptionPaginationTest(TestCase):
+    def setUp(self):
+        from .models import User
+        self.today = timezone.localdate()
+        hotel_client = Client.objects.create(
+            first_name="Page", last_name="Test", email="page@example.com", phone="55555555", id_document="CNI-PAGE"
+        )
+        for i in range(7):
+            room = Room.objects.create(number=f"6{i:02d}", category=Room.Category.SIMPLE, price_per_night=25000, capacity=1)
+            # Deux réservations par jour d'arrivée : la clé (check_in, id) départage les ex aequo
+            Reservation.objects.create(
+                client=hotel_client, room=room,
+                check_in=self.today + timedelta(days=i // 2), check_out=self.today + timedelta(days=i // 2 + 1),
+                status=Reservation.Status.CONFIRMEE
+            )
+        self.client.force_login(User.objects.create_user('page', 'page@hotel.com', 'pass'))
+
+    def test_keyset_pages_cover_listing_once(self):
+        """Test: Les pages successives couvrent toutes les réservations, sans doublon, dans les deux sens."""
+        seen, cursor, pages = [], None, []
+        while True:
+            url = '/reception/api/reservations/?size=3' + (f'&after={cursor}' if cursor else '')
+            payload = self.client.get(url).json()
+            pages.append(payload)
+            seen += [row['id'] for row in payload['results']]
+            cursor = payload['next']
+            if not cursor:
+                break
+        expected = list(Reservation.objects.order_by('check_in', 'id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+        self.assertEqual(len(pages), 3)
+
+        back = self.client.get(f"/reception/api/reservations/?size=3&before={pages[2]['previous']}").json()
+        self.assertEqual(back['results'], pages[1]['results'])
+
+    def test_html_listing_is_paginated(self):
+        """Test: La liste HTML des chambres est limitée à la taille de page."""
+        response = self.client.get('/reception/rooms/?size=5')
+        self.assertEqual(len(response.context['rooms']), 5)
+        self.assertTrue(response.context['page'].has_next)
+
+
+class AutocompleteTest(TestCase):
+    def setUp(self):
+        from .models import User
+        self.today = timezone.localdate()
+        self.room = Room.objects.create(number="701", category=Room.Category.DOUBLE, price_per_night=45000, capacity=2)
+        self.free_room = Room.objects.create(number="702", category=Room.Category.DOUBLE, price_per_night=45000, capacity=2)
+        self.guest = Client.objects.create(
+            first_name="Amina", last_name="Saleh", email="amina@example.com", phone="66666666", id_document="CNI-AMINA"
+        )
+        for i in range(20):
+            Client.objects.create(
+                first_name=f"Autre{i}", last_name="Client", email=f"autre{i}@example.com", phone=f"7{i:07d}", id_document=f"CNI-{i}"
+            )
+        Reservation.objects.create(
+            client=self.guest, room=self.room,
+            check_in=self.today + timedelta(days=1), check_out=self.today + timedelta(days=3),
+            status=Reservation.Status.CONFIRMEE
+        )
+        self.client.force_login(User.objects.create_user('auto', 'auto@hotel.com', 'pass'))
+
+    def test_form_renders_without_full_client_list(self):
+        """Test: Le formulaire ne sérialise plus tous les clients."""
+        response = self.client.get(f'/reception/reservations/new/?room={self.room.id}')
+        self.assertNotContains(response, 'Autre1')
+        self.assertContains(response, 'data-autocomplete-url')
+        self.assertContains(response, f'<option value="{self.room.id}" selected>')
+
+    def test_client_and_free_room_search(self):
+        """Test: Recherche de clients par préfixe et de chambres libres sur une période."""
+        results = self.client.get('/reception/api/clients/search/?q=sal').json()['results']
+        self.assertEqual([r['id'] for r in results], [self.guest.id])
+
+        check_in, check_out = self.today + timedelta(days=2), self.today + timedelta(days=4)
+        results = self.client.get(
+            f'/reception/api/rooms/free/?check_in={check_in.isoformat()}&check_out={check_out.isoformat()}'
+        ).json()['results']
+        self.assertEqual([r['id'] for r in results], [self.free_room.id])
+
+    def test_garbled_choice_shows_form_error(self):
+        """Test: Une clé invalide dans le POST donne une erreur de formulaire, pas une erreur 500."""
+        response = self.client.post('/reception/reservations/new/', {
+            'client': 'abc', 'room': self.free_room.id,
+            'check_in': self.today.isoformat(), 'check_out': (self.today + timedelta(days=1)).isoformat(),
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['form'].errors['client'])
+        self.assertContains(response, f'<option value="{self.free_room.id}" selected>')
+
+
+class ClientSearchTest(TestCase):
+    def setUp(self):
+        self.fatime = Client.objects.create(
+            first_name="Fatimé", last_name="Abakar", email="fatime@example.com", phone="77777777", id_document="CNI-FAT"
+        )
+        self.other = Client.objects.create(
+            first_name="Brahim", last_name="Djarma", email="brahim@example.com", phone="88888888", id_document="CNI-BRA"
+        )
+
+    def test_accent_folded_prefix_search(self):
+        """Test: La recherche ignore accents et casse, et suit les modifications."""
+        from .search import search_clients
+        self.assertEqual(list(search_clients("FATIME abak")), [self.fatime])
+        self.assertEqual(list(search_clients("djar")), [self.other])
+
+        self.other.last_name = "Hassan"
+        self.other.save()
+        self.assertEqual(list(search_clients("djar")), [])
+        self.assertEqual(list(search_clients("hass")), [self.other])
+
+        self.fatime.delete()
+        self.assertEqual(list(search_clients("fatime")), [])
+
+    def test_autocomplete_probes_index_outside_event_loop(self):
+        """Test: Premier appel d'un worker (index FTS pas encore sondé) depuis la vue asynchrone."""
+        from unittest import mock
+        from . import search
+        from .models import User
+        self.client.force_login(User.objects.create_user('probe', 'probe@hotel.com', 'pass'))
+        with mock.patch.dict(search._fts_tables, clear=True):
+            response = self.client.get('/reception/api/clients/search/?q=fatime')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r['id'] for r in response.json()['results']], [self.fatime.id])
+
+    def test_admin_search_uses_index(self):
+        """Test: La recherche de l'administration passe par l'index normalisé."""
+        from .models import User
+        self.client.force_login(User.objects.create_superuser('search', 'search@hotel.com', 'pass'))
+        response = self.client.get('/admin/core/client/?q=fatimé')
+        self.assertEqual(list(response.context['cl'].result_list), [self.fatime])
+
+        room = Room.objects.create(number="801", category=Room.Category.SIMPLE, price_per_night=25000, capacity=1)
+        today = timezone.localdate()
+        reservation = Reservation.objects.create(
+            client=self.fatime, room=room, check_in=today, check_out=today + timedelta(days=1)
+        )
+        for term in ('abakar', '801'):
+            response = self.client.get(f'/admin/core/reservation/?q={term}')
+            self.assertEqual(list(response.context['cl'].result_list), [reservation])
+
+
+class AdminChangelistQueryTest(TestCase):
+    def setUp(self):
+        from .models import User, Payment
+        self.client.force_login(User.objects.create_superuser('cl', 'cl@hotel.com', 'pass'))
+        self.today = timezone.localdate()
+        self.payment_model = Payment
+
+    def _add_bookings(self, start, count):
+        for i in range(start, start + count):
+            room = Room.objects.create(number=f"9{i:02d}", category=Room.Category.SIMPLE, price_per_night=25000, capacity=1)
+            guest = Client.objects.create(
+                first_name=f"Invité{i}", last_name="Liste", email=f"liste{i}@example.com", phone=f"9{i:07d}", id_document=f"CNI-L{i}"
+            )
+            res = Reservation.objects.create(
+                client=guest, room=room, check_in=self.today, check_out=self.today + timedelta(days=1)
+            )
+            self.payment_model.objects.create(invoice=res.invoice, amount=25000, payment_method='ESPECES')
+
+    def _count_queries(self, url):
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_reservation_admin_saves_under_room_lock(self):
+        """Test: L'admin valide et enregistre sous verrou de chambre ; un conflit reste une erreur de formulaire."""
+        from unittest import mock
+        from . import booking
+        room = Room.objects.create(number="990", category=Room.Category.SIMPLE, price_per_night=25000, capacity=1)
+        guest = Client.objects.create(
+            first_name="Admin", last_name="Verrou", email="verrou@example.com", phone="99000000", id_document="CNI-V"
+        )
+        data = {
+            'client': guest.pk, 'room': room.pk, 'status': Reservation.Status.CONFIRMEE,
+            'check_in': self.today.isoformat(), 'check_out': (self.today + timedelta(days=2)).isoformat(),
+        }
+        with mock.patch.object(booking, 'lock_room_rows', wraps=booking.lock_room_rows) as lock, \
+                mock.patch.object(booking, 'save_reservation', wraps=booking.save_reservation) as save:
+            response = self.client.post('/admin/core/reservation/add/', data)
+            self.assertEqual(response.status_code, 302)
+            self.assertTrue(save.called)
+            lock.assert_called_with([room.pk], mock.ANY)
+
+            response = self.client.post('/admin/core/reservation/add/', data)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Cette chambre est déjà réservée")
+        self.assertEqual(Reservation.objects.filter(room=room).count(), 1)
+
+    def test_changelists_have_fixed_query_count(self):
+        """Test: Le nombre de requêtes d'une page de liste ne dépend pas du nombre de lignes."""
+        urls = ['/admin/core/reservation/', '/admin/core/invoice/', '/admin/core/payment/']
+        self._add_bookings(0, 3)
+        self._count_queries(urls[0])  # utilisateur connecté mis en cache (core/authentication.py)
+        small = {url: self._count_queries(url) for url in urls}
+        self._add_bookings(3, 12)
+        large = {url: self._count_queries(url) for url in urls}
+        self.assertEqual(small, large)
+
+
+class PopulateBulkTest(TestCase):
+    def test_bulk_dataset_is_consistent(self):
+        """Test: Le mode volumineux ne crée aucun chevauchement et facture chaque réservation."""
+        from .models import Invoice, DailyReservationCount
+        call_command('populate_db', rooms=4, clients=30, years=0.3, seed=7, stdout=StringIO())
+
+        self.assertEqual(Room.objects.count(), 4)
+        self.assertEqual(Client.objects.count(), 30)
+        self.assertEqual(Invoice.objects.count(), Reservation.objects.count())
+        for room in Room.objects.all():
+            stays = list(room.reservations.order_by('check_in').values_list('check_in', 'check_out'))
+            for (_, previous_out), (next_in, _) in zip(stays, stays[1:]):
+                self.assertLessEqual(previous_out, next_in)
+        self.assertEqual(
+            DailyReservationCount.objects.aggregate(n=models.Sum('count'))['n'], Reservation.objects.count()
+        )
+
+    def test_bulk_clients_after_deletions(self):
+        """Test: Un second remplissage après suppression de clients ne réutilise aucun email."""
+        call_command('populate_db', rooms=2, clients=5, years=0.05, seed=3, stdout=StringIO())
+        Client.objects.filter(pk__in=Client.objects.order_by('pk').values('pk')[:2]).delete()
+        call_command('populate_db', rooms=2, clients=5, years=0.05, seed=3, stdout=StringIO())
+        self.assertEqual(Client.objects.count(), 8)
+
+
+class RoomStatusReconcilerTest(TestCase):
+    def test_daily_reconciliation_follows_calendar(self):
+        """Test: La réconciliation bascule les chambres à l'arrivée et au départ, sans écriture de réservation."""
+        from .room_status import reconcile_room_statuses
+        today = timezone.localdate()
+        room = Room.objects.create(number="1101", category=Room.Category.SIMPLE, price_per_night=25000, capacity=1)
+        maintenance = Room.objects.create(
+            number="1102", category=Room.Category.SIMPLE, price_per_night=25000, capacity=1, status=Room.Status.MAINTENANCE
+        )
+        guest = Client.objects.create(
+            first_name="Nuit", last_name="Test", email="nuit@example.com", phone="10101010", id_document="CNI-NUIT"
+        )
+        for r in (room, maintenance):
+            Reservation.objects.create(
+                client=guest, room=r, check_in=today + timedelta(days=1), check_out=today + timedelta(days=3),
+                status=Reservation.Status.CONFIRMEE
+            )
+        room.refresh_from_db()
+        self.assertEqual(room.status, Room.Status.LIBRE)
+
+        with self.assertNumQueries(2):
+            changed = reconcile_room_statuses(today + timedelta(days=1))
+        self.assertEqual([r.pk for r in changed], [room.pk])
+        room.refresh_from_db()
+        self.assertEqual(room.status, Room.Status.OCCUPEE)
+
+        reconcile_room_statuses(today + timedelta(days=3))
+        room.refresh_from_db()
+        maintenance.refresh_from_db()
+        self.assertEqual(room.status, Room.Status.LIBRE)
+        self.assertEqual(maintenance.status, Room.Status.MAINTENANCE)
+
+
+class ReservationImportTest(TestCase):
+    def setUp(self):
+        self.today = timezone.localdate()
+        self.room = Room.objects.create(number="1201", category=Room.Category.DOUBLE, price_per_night=45000, capacity=2)
+        Client.objects.create(
+            first_name="Existant", last_name="Client", email="existant@example.com", phone="12121212", id_document="CNI-EX"
+        )
+
+    def test_import_creates_bookings_and_reports_rejects(self):
+        """Test: L'import en lot crée réservations et factures, et rejette conflits et lignes invalides."""
+        from .imports import import_reservations
+        from .models import DailyOccupancy, Invoice
+        d = lambda n: (self.today + timedelta(days=n)).isoformat()
+        csv_data = "\n".join([
+            "room,email,first_name,last_name,check_in,check_out,status",
+            f"1201,existant@example.com,,,{d(0)},{d(2)},CONFIRMEE",
+            f"1201,nouveau@example.com,Nouveau,Venu,{d(2)},{d(4)},",
+            f"1201,autre@example.com,Autre,Venu,{d(3)},{d(5)},CONFIRMEE",
+            f"9999,existant@example.com,,,{d(5)},{d(6)},",
+            f"1201,existant@example.com,,,{d(7)},{d(6)},",
+        ])
+        report = import_reservations(StringIO(csv_data), 'csv', chunk_size=2)
+
+        self.assertEqual(report.imported, 2)
+        self.assertEqual([line for line, _ in report.errors], [4, 5, 6])
+        self.assertEqual(report.clients_created, 1)
+        self.assertEqual(Invoice.objects.get(reservation__check_in=self.today).total_amount, 90000)
+        self.room.refresh_from_db()
+        self.assertEqual(self.room.status, Room.Status.OCCUPEE)
+        self.assertEqual(DailyOccupancy.objects.filter(occupied=1).count(), 4)
+
+    def test_import_locks_rooms_and_matches_emails_case_insensitively(self):
+        """Test: Les chambres du lot sont verrouillées et l'email est rapproché sans tenir compte de la casse."""
+        from unittest import mock
+        from . import imports
+        Client.objects.filter(email="existant@example.com").update(email="Existant@Example.COM")
+        d = lambda n: (self.today + timedelta(days=n)).isoformat()
+        csv_data = f"room,email,check_in,check_out\n1201,EXISTANT@example.com,{d(0)},{d(2)}\n"
+        with mock.patch.object(imports, 'lock_room_rows', wraps=imports.lock_room_rows) as lock:
+            report = imports.import_reservations(StringIO(csv_data), 'csv')
+        lock.assert_called_once_with({self.room.pk})
+        self.assertEqual((report.imported, report.clients_created, report.errors), (1, 0, []))
+        self.assertEqual(Reservation.objects.get().client.email, "Existant@Example.COM")
+
+    def test_import_survives_client_created_concurrently(self):
+        """Test: Un client créé entre la lecture et bulk_create est rapproché, sans faire échouer le lot."""
+        from unittest import mock
+        from . import imports
+        d = lambda n: (self.today + timedelta(days=n)).isoformat()
+        csv_data = "\n".join([
+            "room,email,first_name,last_name,check_in,check_out",
+            f"1201,concurrent@example.com,Con,Current,{d(0)},{d(2)}",
+            f"1201,inedit@example.com,In,Edit,{d(2)},{d(3)}",
+        ])
+        racer = Client.objects.create(
+            first_name="Con", last_name="Current", email="concurrent@example.com", phone="12121213", id_document="CNI-CC"
+        )
+        stale = [{}]
+        known_clients = imports._known_clients
+        with mock.patch.object(imports, '_known_clients', side_effect=lambda emails: stale.pop() if stale else known_clients(emails)):
+            report = imports.import_reservations(StringIO(csv_data), 'csv')
+        self.assertEqual((report.imported, report.clients_created, report.errors), (2, 1, []))
+        self.assertEqual(Reservation.objects.get(check_in=self.today).client, racer)
+
+
+class InvoiceRecalculationTest(TestCase):
+    def test_changed_stays_are_recalculated_in_batch(self):
+        """Test: Un séjour modifié marque sa facture, recalculée en lot ; les factures payées restent figées."""
+        from .invoicing import recalculate_invoices
+        today = timezone.localdate()
+        room = Room.objects.create(number="1301", category=Room.Category.SIMPLE, price_per_night=20000, capacity=1)
+        guest = Client.objects.create(
+            first_name="Facture", last_name="Test", email="facture@example.com", phone="13131313", id_document="CNI-FAC"
+        )
+        stays = [
+            Reservation.objects.create(
+                client=guest, room=room, check_in=today + timedelta(days=i * 10),
+                check_out=today + timedelta(days=i * 10 + 1), status=Reservation.Status.CONFIRMEE
+            )
+            for i in range(3)
+        ]
+        Invoice.objects.filter(reservation=stays[2]).update(status=Invoice.Status.PAYEE)
+        for res in stays:
+            res.check_out += timedelta(days=2)
+            res.save()
+        res.status = Reservation.Status.ANNULEE
+        res.save()
+        self.assertEqual(Invoice.objects.filter(needs_recalculation=True).count(), 3)
+
+        self.assertEqual(recalculate_invoices(dirty_only=True, dry_run=True), 2)
+        with self.assertNumQueries(4):
+            self.assertEqual(recalculate_invoices(dirty_only=True), 2)
+        totals = dict(Invoice.objects.values_list('reservation_id', 'total_amount'))
+        self.assertEqual([totals[res.pk] for res in stays], [60000, 60000, 20000])
+        self.assertEqual(Invoice.objects.filter(needs_recalculation=True).count(), 1)
+
+
+class InvoiceBalanceTest(TestCase):
+    def test_payments_maintain_balance_and_status(self):
+        """Test: Les paiements ajustent montant payé, solde et statut ; la vérification ne trouve aucun écart."""
+        from .invoicing import sync_balances
+        from .models import Payment
+        room = Room.objects.create(number="1401", category=Room.Category.SIMPLE, price_per_night=30000, capacity=1)
+        guest = Client.objects.create(
+            first_name="Solde", last_name="Test", email="solde@example.com", phone="14141414", id_document="CNI-SOL"
+        )
+        today = timezone.localdate()
+        res = Reservation.objects.create(
+            client=guest, room=room, check_in=today, check_out=today + timedelta(days=2), status=Reservation.Status.CONFIRMEE
+        )
+        invoice = res.invoice
+        self.assertEqual((invoice.balance, invoice.status), (60000, Invoice.Status.IMPAYEE))
+
+        first = Payment.objects.create(invoice=invoice, amount=20000, payment_method=Payment.Method.ESPECES)
+        invoice.refresh_from_db()
+        self.assertEqual((invoice.amount_paid, invoice.balance, invoice.status), (20000, 40000, Invoice.Status.PARTIELLE))
+
+        Payment.objects.create(invoice=invoice, amount=40000, payment_method=Payment.Method.CARTE)
+        invoice.refresh_from_db()
+        self.assertEqual((invoice.balance, invoice.status), (0, Invoice.Status.PAYEE))
+
+        first.amount = 10000
+        first.save()
+        invoice.refresh_from_db()
+        self.assertEqual((invoice.balance, invoice.status), (10000, Invoice.Status.PARTIELLE))
+        self.assertEqual(sync_balances(dry_run=True), [])
+
+        Invoice.objects.filter(pk=invoice.pk).update(amount_paid=0, balance=60000, status=Invoice.Status.IMPAYEE)
+        self.assertEqual(sync_balances(), [invoice.pk])
+        invoice.refresh_from_db()
+        self.assertEqual((invoice.amount_paid, invoice.status), (50000, Invoice.Status.PARTIELLE))
+
+    def test_stale_instance_does_not_overwrite_payments(self):
+        """Test: Enregistrer une facture périmée après un paiement conserve le montant payé."""
+        from .models import Payment
+        room = Room.objects.create(number="1402", category=Room.Category.SIMPLE, price_per_night=30000, capacity=1)
+        guest = Client.objects.create(
+            first_name="Périmé", last_name="Test", email="stale@example.com", phone="14141415", id_document="CNI-STALE"
+        )
+        today = timezone.localdate()
+        res = Reservation.objects.create(
+            client=guest, room=room, check_in=today, check_out=today + timedelta(days=2), status=Reservation.Status.CONFIRMEE
+        )
+        stale = Invoice.objects.get(reservation=res)
+        Payment.objects.create(invoice=res.invoice, amount=20000, payment_method=Payment.Method.ESPECES)
+
+        stale.total_amount = 50000
+        stale.save()
+        self.assertEqual((stale.amount_paid, stale.balance, stale.status), (20000, 30000, Invoice.Status.PARTIELLE))
+        stale.refresh_from_db()
+        self.assertEqual((stale.total_amount, stale.amount_paid, stale.balance), (50000, 20000, 30000))
+
+
+class AccountingReportTest(TestCase):
+    def test_aging_buckets_and_streaming_export(self):
+        """Test: La balance âgée répartit les soldes par ancienneté ; l'export CSV est servi en flux et réservé à la comptabilité."""
+        from .models import User, Payment
+        from .reports import aging_report
+        today = timezone.localdate()
+        room = Room.objects.create(number="1501", category=Room.Category.SIMPLE, price_per_night=10000, capacity=1)
+        guest = Client.objects.create(
+            first_name="Créance", last_name="Test", email="creance@example.com", phone="15151515", id_document="CNI-CRE"
+        )
+        for age in (5, 45, 120):
+            res = Reservation.objects.create(
+                client=guest, room=room, check_in=today + timedelta(days=age), check_out=today + timedelta(days=age + 1),
+                status=Reservation.Status.CONFIRMEE
+            )
+            Invoice.objects.filter(reservation=res).update(issued_at=timezone.now() - timedelta(days=age))
+        Payment.objects.create(invoice=res.invoice, amount=4000, payment_method=Payment.Method.ESPECES)
+
+        rows, totals = aging_report()
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(
+            [rows[0][key] for key in ('current', 'days_60', 'days_90', 'older', 'total')],
+            [10000, 10000, 0, 6000, 26000],
+        )
+
+        self.client.force_login(User.objects.create_user('recep', 'recep@hotel.com', 'pass'))
+        self.assertEqual(self.client.get('/accounting/export/payments.csv').status_code, 403)
+
+        self.client.force_login(User.objects.create_user('compta', 'compta@hotel.com', 'pass', role=User.Role.ACCOUNTANT))
+        response = self.client.get('/accounting/export/invoices.csv')
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode('utf-8-sig').splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assertTrue(lines[0].startswith('Facture,Émise le'))
+        self.assertEqual(self.client.get('/accounting/').status_code, 200)
+
+
+@modify_settings(MIDDLEWARE={'prepend': 'core.instrumentation.RequestMetricsMiddleware'})
+@override_settings(REQUEST_METRICS_STRICT=True)
+@cached_auth
+class RequestMetricsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # En production, CoreConfig.ready pose les sondes quand REQUEST_METRICS est actif
+        from . import instrumentation
+        super().setUpClass()
+        cls.probes_installed = instrumentation._installed
+        instrumentation.install()
+
+    @classmethod
+    def tearDownClass(cls):
+        # Les autres classes de tests ne doivent pas dépendre de l'ordre d'exécution
+        from . import instrumentation
+        if not cls.probes_installed:
+            instrumentation.uninstall()
+        super().tearDownClass()
+
+    def setUp(self):
+        from django.core.cache import cache
+        from .models import User
+        cache.clear()
+        Room.objects.create(number="1601", category=Room.Category.SIMPLE, price_per_night=10000, capacity=1)
+        self.user = User.objects.create_superuser('metrics', 'metrics@hotel.com', 'pass')
+        self.client.force_login(self.user)
+
+    def test_views_stay_within_query_budgets(self):
+        """Test: Chaque vue budgétée respecte son nombre de requêtes SQL et expose Server-Timing."""
+        from django.conf import settings
+        from django.urls import reverse
+        from .instrumentation import registry
+        registry.clear()
+        for view_name in settings.REQUEST_METRICS_BUDGETS:
+            response = self.client.get(reverse(view_name))
+            self.assertEqual(response.status_code, 200, view_name)
+            self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertEqual(set(registry.summary()), set(settings.REQUEST_METRICS_BUDGETS))
+        self.assertIn('dashboard', self.client.get('/ops/metrics/').json()['views'])
+
+    def test_async_view_is_measured_without_thread_hop(self):
+        """Test: En ASGI, la middleware reste asynchrone et compte les requêtes SQL des vues async."""
+        from asgiref.sync import async_to_sync, iscoroutinefunction
+        from django.test import AsyncClient
+        from .instrumentation import RequestMetricsMiddleware, registry
+
+        async def view(request):
+            return None
+        self.assertTrue(iscoroutinefunction(RequestMetricsMiddleware(view)))
+
+        registry.clear()
+        client = AsyncClient()
+        client.force_login(self.user)
+        response = async_to_sync(client.get)('/reception/rooms/')
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(registry.summary()['reception_rooms']['queries_max'], 0)
+
+    def test_budget_overrun_fails(self):
+        """Test: Un dépassement de budget lève QueryBudgetExceeded en mode strict."""
+        from .instrumentation import QueryBudgetExceeded
+        with override_settings(REQUEST_METRICS_BUDGETS={'dashboard': 1}):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get('/dashboard/')
+
+
+class BenchmarkTest(TestCase):
+    def test_scenarios_report_percentiles_and_regressions(self):
+        """Test: Le banc mesure chaque scénario et signale un p95 au-delà de la tolérance."""
+        from . import benchmarks
+        Room.objects.create(number="1701", category=Room.Category.SIMPLE, price_per_night=10000, capacity=1)
+        Client.objects.create(
+            first_name="Banc", last_name="Test", email="banc@example.com", phone="17171717", id_document="CNI-BANC"
+        )
+        results = benchmarks.run(iterations=3, only={'booking', 'dashboard_cold', 'reception_reservations'})
+        self.assertEqual(set(results['scenarios']), {'booking', 'dashboard_cold', 'reception_reservations'})
+        booking = results['scenarios']['booking']
+        self.assertEqual(booking['created'] + booking['conflicts'], 4)
+        self.assertLessEqual(booking['p50_ms'], booking['p99_ms'])
+
+        baseline = {'scenarios': {'booking': {'p95_ms': booking['p95_ms'] / 2}}}
+        [(name, _, _, change, regressed)] = benchmarks.compare(results, baseline, tolerance=0.5)
+        self.assertEqual(name, 'booking')
+        self.assertTrue(regressed)
+
+    def test_current_db_run_leaves_nothing_behind(self):
+        """Test: Sur la base réelle, le banc n'enregistre rien et ignore un scénario impossible."""
+        from . import benchmarks
+        from .models import User
+        results = benchmarks.run(iterations=2, only={'booking', 'reception_rooms'}, rollback=True)
+        self.assertEqual(set(results['scenarios']), {'reception_rooms'})
+        self.assertIn('booking', results['skipped'])
+
+        Room.objects.create(number="1702", category=Room.Category.SIMPLE, price_per_night=10000, capacity=1)
+        Client.objects.create(
+            first_name="Banc", last_name="Réel", email="reel@example.com", phone="17171718", id_document="CNI-REEL"
+        )
+        results = benchmarks.run(iterations=3, only={'booking'}, rollback=True)
+        self.assertGreater(results['scenarios']['booking']['created'], 0)
+        self.assertFalse(Reservation.objects.exists())
+        self.assertFalse(User.objects.filter(username=benchmarks.BENCHMARK_USER).exists())
+
+
+class DatabaseProfileTest(TestCase):
+    def test_profile_settings_and_indexes_are_verified(self):
+        """Test: Le profil SQLite est appliqué à la connexion et un index manquant est détecté."""
+        from .database import missing_indexes, settings_problems
+        self.assertEqual(settings_problems(connection), [])
+        self.assertEqual(missing_indexes(connection), [])
+        with connection.cursor() as cursor:
+            cursor.execute("DROP INDEX reservation_availability_idx")
+        self.assertEqual(missing_indexes(connection), ['core_reservation.reservation_availability_idx'])
+
+    def test_asgi_profile_rejects_persistent_connections(self):
+        """Test: En ASGI, check_database signale CONN_MAX_AGE non nul."""
+        from unittest import mock
+        from .database import settings_problems
+        with override_settings(SERVER_INTERFACE='asgi'), \
+                mock.patch.dict(connection.settings_dict, {'CONN_MAX_AGE': 60}):
+            self.assertTrue(any('ASGI' in problem for problem in settings_problems(connection)))
+        with override_settings(SERVER_INTERFACE='asgi'), \
+                mock.patch.dict(connection.settings_dict, {'CONN_MAX_AGE': 0}):
+            self.assertEqual(settings_problems(connection), [])
+
+
+class ReferenceCacheTest(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.room = Room.objects.create(number="1801", category=Room.Category.DOUBLE, price_per_night=45000, capacity=2)
+
+    def test_reference_lookups_are_cached_and_fresh_after_edits(self):
+        """Test: Catalogue et grille des prix sont servis du cache, puis rechargés après modification d'une chambre."""
+        from .reference import category_prices, room_catalog, room_category
+        self.assertEqual(room_catalog()[self.room.pk]['number'], "1801")
+        category_prices()
+        with self.assertNumQueries(0):
+            self.assertEqual(room_category(self.room.pk), Room.Category.DOUBLE)
+            self.assertEqual(category_prices()[0]['min_price'], 45000)
+
+        self.room.category = Room.Category.SUITE
+        self.room.price_per_night = 85000
+        self.room.save()
+        self.assertEqual(room_category(self.room.pk), Room.Category.SUITE)
+        self.assertEqual([(c['category'], c['max_price']) for c in category_prices()], [(Room.Category.SUITE, 85000)])
+
+    def test_status_change_reads_room_category_from_cache(self):
+        """Test: Changer le statut d'une réservation ne recharge pas sa chambre pour les agrégats."""
+        from .models import DailyReservationCount
+        from .reference import room_catalog
+        guest = Client.objects.create(
+            first_name="Cache", last_name="Test", email="cache@example.com", phone="18181818", id_document="CNI-CACHE"
+        )
+        today = timezone.localdate()
+        res = Reservation.objects.create(
+            client=guest, room=self.room, check_in=today + timedelta(days=3), check_out=today + timedelta(days=4),
+            status=Reservation.Status.EN_ATTENTE
+        )
+        room_catalog()
+        res = Reservation.objects.get(pk=res.pk)
+        res.status = Reservation.Status.CONFIRMEE
+        res.save()
+        self.assertFalse(Reservation.room.is_cached(res))
+        self.assertEqual(
+            DailyReservationCount.objects.get(day=res.check_in, status=Reservation.Status.CONFIRMEE).category,
+            Room.Category.DOUBLE,
+        )
+
+
+class TapeChartTest(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        from .models import User
+        cache.clear()
+        self.room = Room.objects.create(number="1901", category=Room.Category.SIMPLE, price_per_night=25000, capacity=1)
+        Room.objects.create(number="1902", category=Room.Category.SUITE, price_per_night=90000, capacity=2)
+        self.guest = Client.objects.create(
+            first_name="Plan", last_name="Ning", email="plan@example.com", phone="19191919", id_document="CNI-PLAN"
+        )
+        self.today = timezone.localdate()
+        self.res = Reservation.objects.create(
+            client=self.guest, room=self.room, check_in=self.today - timedelta(days=2),
+            check_out=self.today + timedelta(days=3), status=Reservation.Status.CONFIRMEE
+        )
+        # Surréservation (données importées, hors clean()) : second couloir
+        Reservation.objects.bulk_create([Reservation(
+            client=self.guest, room=self.room, check_in=self.today + timedelta(days=1),
+            check_out=self.today + timedelta(days=4), status=Reservation.Status.EN_ATTENTE
+        )])
+        self.client.force_login(User.objects.create_user('planning', 'planning@hotel.com', 'pass'))
+
+    def test_build_places_stays_in_lanes_with_one_query(self):
+        """Test: Le planning est calculé en une requête, séjours coupés à la fenêtre et rangés en couloirs."""
+        from . import tape_chart
+        tape_chart.build(self.today, 7)  # catalogue des chambres en cache
+        with self.assertNumQueries(1):
+            lines = tape_chart.build(self.today, 7)
+        self.assertEqual([line.room['number'] for line in lines], ["1901", "1902"])
+        first, second = lines[0].cells(7)
+        self.assertEqual([(span, booking and booking.id) for span, booking in first], [(3, self.res.pk), (4, None)])
+        self.assertEqual([span for span, _ in second], [1, 3, 3])
+        self.assertEqual(lines[1].cells(7), [[(7, None)]])
+        self.assertEqual([line.room['number'] for line in tape_chart.build(self.today, 7, Room.Category.SUITE)], ["1902"])
+
+    def test_conditional_get_returns_304_until_a_reservation_changes(self):
+        """Test: Le planning JSON se revalide en 304, et l'ETag change après modification d'une réservation."""
+        url = f"/reception/api/planning/?start={self.today.isoformat()}&days=7"
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['rooms'][0]['bookings']), 2)
+        etag = response['ETag']
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.res.check_out = self.today + timedelta(days=1)
+        self.res.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(self.client.get("/reception/planning/?days=500").status_code, 200)
+
+
+class StaticAssetsTest(TestCase):
+    def test_collectstatic_compresses_and_middleware_serves_immutable_variants(self):
+        """Test: collectstatic écrit les noms à empreinte et leurs .gz, servis compressés et immuables."""
+        import gzip
+        import tempfile
+        from django.http import HttpResponse
+        from django.test import RequestFactory
+        from .static_assets import StaticAssetsMiddleware
+
+        with tempfile.TemporaryDirectory() as root, override_settings(
+            STATIC_ROOT=root,
+            STORAGES={'staticfiles': {'BACKEND': 'core.static_assets.CompressedManifestStaticFilesStorage'}},
+        ):
+            call_command('collectstatic', interactive=False, verbosity=0)
+            from django.contrib.staticfiles.storage import staticfiles_storage
+            staticfiles_storage._setup()
+            hashed = staticfiles_storage.stored_name('css/style.css')
+            self.assertNotEqual(hashed, 'css/style.css')
+
+            middleware = StaticAssetsMiddleware(lambda request: HttpResponse('app'))
+            factory = RequestFactory()
+            response = middleware(factory.get(f'/static/{hashed}', HTTP_ACCEPT_ENCODING='gzip, deflate'))
+            self.assertEqual(response['Content-Encoding'], 'gzip')
+            self.assertEqual(response['Content-Type'], 'text/css')
+            self.assertIn('immutable', response['Cache-Control'])
+            self.assertIn('Accept-Encoding', response['Vary'])
+            with open(f'{root}/css/style.css', 'rb') as original:
+                self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), original.read())
+
+            response = middleware(factory.get('/static/css/style.css'))
+            self.assertFalse(response.has_header('Content-Encoding'))
+            self.assertNotIn('immutable', response['Cache-Control'])
+            response.close()
+            self.assertEqual(middleware(factory.get('/static/absent.css')).content, b'app')
+
+    def test_middleware_is_async_capable(self):
+        """Test: En ASGI, la middleware reste asynchrone : fichiers servis, autres URL transmises."""
+        import tempfile
+        from asgiref.sync import async_to_sync, iscoroutinefunction
+        from django.http import HttpResponse
+        from django.test import RequestFactory
+        from .static_assets import StaticAssetsMiddleware
+
+        async def app(request):
+            return HttpResponse('app')
+
+        with tempfile.TemporaryDirectory() as root, override_settings(STATIC_ROOT=root):
+            with open(f'{root}/site.css', 'w') as handle:
+                handle.write('body {}')
+            middleware = StaticAssetsMiddleware(app)
+            self.assertTrue(iscoroutinefunction(middleware))
+            factory = RequestFactory()
+            response = async_to_sync(middleware)(factory.get('/static/site.css'))
+            self.assertEqual(b''.join(response.streaming_content), b'body {}')
+            response.close()
+            self.assertEqual(async_to_sync(middleware)(factory.get('/static/absent.css')).content, b'app')
+
+
+class ImageVariantTest(TestCase):
+    def setUp(self):
+        import shutil
+        import tempfile
+        from .models import User
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = User.objects.create_user('photos', 'photos@hotel.com', 'pass', first_name="Awa", last_name="Mbemba")
+        self.client.force_login(self.user)
+
+    @staticmethod
+    def upload(name, color):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from PIL import Image
+        buffer = BytesIO()
+        Image.new('RGB', (2400, 1600), color).save(buffer, 'JPEG', quality=95)
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+    def test_variant_is_generated_on_first_request_and_dropped_when_replaced(self):
+        """Test: La vignette WebP est créée au premier affichage, servie par la vue ensuite, supprimée au remplacement."""
+        from django.core.files.storage import default_storage
+        from . import images
+        room = Room.objects.create(
+            number="2101", category=Room.Category.DOUBLE, price_per_night=45000, capacity=2,
+            image=self.upload('chambre.jpg', 'navy'),
+        )
+        url = images.variant_url(room.image, 'card')
+        self.assertTrue(url.startswith('/images/card/rooms/'))
+        response = self.client.get(url)
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        # Le client de test ferme la réponse une fois le contenu lu
+        self.assertLess(len(b''.join(response.streaming_content)), 10_000)
+
+        variant = images.variant_name(room.image.name, 'card')
+        self.assertTrue(default_storage.exists(variant))
+        # Sans DEBUG, MEDIA_URL n'est pas servi : l'URL reste celle de la vue, qui sert le fichier existant
+        with override_settings(DEBUG=False):
+            self.assertEqual(images.variant_url(room.image, 'card'), url)
+            self.assertContains(self.client.get('/reception/rooms/'), url)
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['Content-Type'], 'image/webp')
+            b''.join(response.streaming_content)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            room.image = self.upload('chambre.jpg', 'teal')
+            room.save()
+        self.assertFalse(default_storage.exists(variant))
+        self.assertEqual(self.client.get('/images/card/../core/models.py').status_code, 404)
+
+    def test_concurrent_first_renders_and_unreadable_source(self):
+        """Test: Premiers affichages simultanés dans un même processus ; source illisible -> 404."""
+        import os
+        from django.core.files.base import ContentFile
+        from django.core.files.storage import default_storage
+        from PIL import Image
+        from . import images
+        room = Room.objects.create(
+            number="2102", category=Room.Category.DOUBLE, price_per_night=45000, capacity=2,
+            image=self.upload('chambre.jpg', 'olive'),
+        )
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            names = set(pool.map(lambda _: images.generate(room.image.name, 'card'), range(8)))
+        [name] = names
+        with default_storage.open(name, 'rb') as variant:
+            self.assertEqual(Image.open(variant).size, images.VARIANTS['card'])
+        self.assertEqual([f for f in os.listdir(os.path.dirname(default_storage.path(name))) if f.endswith('.tmp')], [])
+
+        broken = default_storage.save('rooms/cassee.jpg', ContentFile(b'pas une image'))
+        self.assertEqual(self.client.get(f'/images/card/{broken}').status_code, 404)
+
+    def test_admin_avatar_is_local(self):
+        """Test: Sans photo, l'avatar du profil est un SVG à initiales, sans service externe."""
+        from urllib.parse import unquote
+        from django.contrib import admin
+        from .admin import CustomUserAdmin
+        header = CustomUserAdmin(type(self.user), admin.site).profile_header(self.user)
+        self.assertNotIn('ui-avatars.com', header)
+        self.assertIn('data:image/svg+xml', header)
+        self.assertIn('>AM<', unquote(header))
+
+
+class RoomGridFragmentCacheTest(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        from .models import User
+        cache.clear()
+        self.room = Room.objects.create(number="2201", category=Room.Category.DOUBLE, price_per_night=45000, capacity=2)
+        self.client.force_login(User.objects.create_user('grid', 'grid@hotel.com', 'pass'))
+
+    def test_grid_is_served_from_cache_until_a_room_status_changes(self):
+        """Test: La grille des chambres est rendue depuis le cache, puis à nouveau quand un statut change."""
+        response = self.client.get('/reception/rooms/')
+        self.assertContains(response, 'status-strip status-free')
+        self.assertContains(response, 'badge rounded-pill bg-success')
+
+        # Écriture sans signal : le fragment en cache est resservi
+        Room.objects.filter(pk=self.room.pk).update(number="2299")
+        self.assertContains(self.client.get('/reception/rooms/'), "Chambre 2201")
+
+        guest = Client.objects.create(
+            first_name="Grille", last_name="Cache", email="grid@example.com", phone="22222222", id_document="CNI-GRID"
+        )
+        today = timezone.localdate()
+        with self.captureOnCommitCallbacks(execute=True):
+            Reservation.objects.create(
+                client=guest, room=self.room, check_in=today, check_out=today + timedelta(days=2),
+                status=Reservation.Status.CONFIRMEE
+            )
+        response = self.client.get('/reception/rooms/')
+        self.assertContains(response, "Chambre 2299")
+        self.assertContains(response, 'status-strip status-busy')
+        self.assertContains(response, 'badge rounded-pill bg-danger')
+
+
+@cached_auth
+class CachedAuthenticationTest(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        from .models import User
+        cache.clear()
+        self.user = User.objects.create_user('tablette', 'tablette@hotel.com', 'pass')
+        self.client.force_login(self.user)
+
+    def test_authenticated_revalidation_needs_no_query_on_warm_caches(self):
+        """Test: Session et utilisateur viennent du cache : une revalidation 304 ne lit pas la base."""
+        url = '/reception/api/planning/'
+        etag = self.client.get(url)['ETag']
+        self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_user_changes_are_seen_on_next_request(self):
+        """Test: Un utilisateur désactivé n'est plus authentifié par la copie en cache."""
+        url = '/reception/api/planning/'
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+    def test_benchmark_reports_auth_overhead_queries(self):
+        """Test: Le scénario auth_overhead relève le nombre de requêtes SQL par appel."""
+        from . import benchmarks
+        results = benchmarks.run(iterations=3, only={'auth_overhead'})
+        self.assertEqual(results['scenarios']['auth_overhead']['queries'], 0)
+
+
+class ParallelQueriesTest(TransactionTestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+
+    def test_gather_runs_functions_concurrently_outside_transactions(self):
+        """Test: Hors transaction, les fonctions s'exécutent en même temps, chacune avec sa connexion."""
+        import threading
+        from asgiref.sync import async_to_sync
+        from . import parallel
+        Room.objects.create(number="2401", category=Room.Category.SIMPLE, price_per_night=25000, capacity=1)
+        barrier = threading.Barrier(2, timeout=5)
+
+        def count_rooms():
+            barrier.wait()  # échoue (BrokenBarrierError) si l'autre fonction ne tourne pas en même temps
+            return Room.objects.count()
+
+        self.assertEqual(async_to_sync(parallel.gather)(count_rooms, count_rooms), [1, 1])
+
+    def test_pool_threads_persist_and_their_queries_are_measured(self):
+        """Test: Les threads du pool (et leurs connexions) survivent aux appels ; leurs requêtes sont comptées."""
+        import threading
+        from asgiref.sync import async_to_sync
+        from . import instrumentation, parallel
+        instrumentation.install()
+
+        def thread_and_count():
+            return threading.current_thread().name, Room.objects.count()
+
+        metrics = instrumentation.RequestMetrics()
+        token = instrumentation._current.set(metrics)
+        try:
+            first = async_to_sync(parallel.gather)(thread_and_count, thread_and_count)
+        finally:
+            instrumentation._current.reset(token)
+        self.assertEqual(metrics.queries, 2)
+        self.assertTrue(all(name.startswith('core-parallel') for name, _ in first))
+
+        second = async_to_sync(parallel.gather)(thread_and_count)
+        self.assertIn(second[0][0], {thread.name for thread in parallel._executor._threads})
+        self.assertEqual(metrics.queries, 2)  # hors requête mesurée : rien n'est compté
+
+    def test_async_dashboard_matches_synchronous_stats(self):
+        """Test: Le tableau de bord asynchrone affiche les mêmes indicateurs que le calcul séquentiel."""
+        from .models import User
+        from .stats import DashboardStats
+        room = Room.objects.create(number="2402", category=Room.Category.SUITE, price_per_night=85000, capacity=2)
+        guest = Client.objects.create(
+            first_name="Async", last_name="Vue", email="async@example.com", phone="24242424", id_document="CNI-ASYNC"
+        )
+        today = timezone.localdate()
+        Reservation.objects.create(
+            client=guest, room=room, check_in=today + timedelta(days=1), check_out=today + timedelta(days=3),
+            status=Reservation.Status.EN_ATTENTE
+        )
+        self.client.force_login(User.objects.create_user('async', 'async@hotel.com', 'pass'))
+
+        response = self.client.get('/dashboard/')
+        self.assertEqual(response.status_code, 200)
+        DashboardStats.invalidate()
+        expected = DashboardStats().dashboard()
+        for name in ('total_clients', 'total_rooms', 'reservations_pending', 'cat_data', 'revenue'):
+            self.assertEqual(response.context[name], expected[name])
+        self.assertEqual([res.pk for res in response.context['recent_reservations']],
+                         [res.pk for res in expected['recent_reservations']])
+        self.assertEqual(self.client.get('/reception/rooms/').status_code, 200)
+
+
+class LiveBoardTest(TestCase):
+    def setUp(self):
+        import asyncio
+        from django.core.cache import cache
+        cache.clear()
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+        self.room = Room.objects.create(number="2501", category=Room.Category.DOUBLE, price_per_night=45000, capacity=2)
+        self.guest = Client.objects.create(
+            first_name="Direct", last_name="Live", email="live@example.com", phone="25252525", id_document="CNI-LIVE"
+        )
+
+    def subscribe(self, broadcaster, last_id=None):
+        async def subscribe():
+            return broadcaster.subscribe(last_id)
+        return self.loop.run_until_complete(subscribe())
+
+    def received(self, queue):
+        import asyncio
+        self.loop.run_until_complete(asyncio.sleep(0))  # livraison des call_soon_threadsafe
+        items = []
+        while not queue.empty():
+            items.append(queue.get_nowait())
+        return items
+
+    def test_reservation_publishes_room_and_reservation_deltas_on_commit(self):
+        """Test: Une réservation du jour diffuse, au commit, le delta de la réservation et celui de la chambre."""
+        from .live import broadcaster
+        queue, _ = self.subscribe(broadcaster)
+        self.addCleanup(broadcaster.unsubscribe, queue)
+        today = timezone.localdate()
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            res = Reservation.objects.create(
+                client=self.guest, room=self.room, check_in=today, check_out=today + timedelta(days=2),
+                status=Reservation.Status.CONFIRMEE
+            )
+        self.assertEqual(self.received(queue), [])  # rien avant le commit
+        for callback in callbacks:
+            callback()
+
+        deltas = {kind: data for _, kind, data in self.received(queue)}
+        self.assertEqual(deltas['room']['status'], Room.Status.OCCUPEE)
+        self.assertEqual(deltas['room']['strip'], 'status-busy')
+        self.assertEqual(deltas['reservation']['id'], res.pk)
+        self.assertTrue(deltas['reservation']['created'])
+
+    def test_reconnection_replays_missed_deltas_or_asks_for_reload(self):
+        """Test: Une reconnexion reçoit les deltas manqués, ou `reload` si l'historique est dépassé."""
+        from .live import HISTORY_SIZE, Broadcaster
+        broadcaster = Broadcaster()
+        for number in range(HISTORY_SIZE + 5):
+            broadcaster.dispatch(broadcaster.next_seq(), 'room', {'n': number})
+        _, backlog = self.subscribe(broadcaster, last_id=HISTORY_SIZE + 3)
+        self.assertEqual([seq for seq, _, _ in backlog], [HISTORY_SIZE + 4, HISTORY_SIZE + 5])
+        _, backlog = self.subscribe(broadcaster, last_id=2)
+        self.assertEqual([kind for _, kind, _ in backlog], ['reload'])
+
+    @override_settings(LIVE_BROKER='cache')
+    def test_shared_broker_reads_other_workers_deltas(self):
+        """Test: Via le cache partagé, un worker relit les deltas publiés par les autres processus."""
+        from django.core.cache import cache
+        from . import live
+        live.publish('room', {'id': 1})
+        cache.set(live._event_key(live._shared_seq()), (-1, 'room', {'id': 2}), 60)
+        last, events = live.fetch_remote(0)
+        self.assertEqual(last, 2)
+        self.assertEqual(events, [(2, 'room', {'id': 2})])
+
+    @override_settings(LIVE_BROKER='cache')
+    def test_shared_broker_resumes_from_cache_across_workers(self):
+        """Test: Reprise depuis le cache partagé (tout processus) ; numéro en cours d'écriture relu plus tard."""
+        from django.core.cache import cache
+        from . import live
+        live.publish('room', {'id': 1})
+        cache.set(live._event_key(live._shared_seq()), (-1, 'room', {'id': 2}), 60)
+        self.assertEqual(live.shared_backlog(0), [(1, 'room', {'id': 1}), (2, 'room', {'id': 2})])
+        self.assertEqual(live.shared_backlog(5), [live.RELOAD])  # numéro inconnu : autre historique
+
+        live._shared_seq()  # attribué, delta pas encore écrit
+        self.assertEqual(live.fetch_remote(2), (2, []))
+        self.assertEqual(live.shared_backlog(0), [live.RELOAD])
+        cache.set(live._event_key(3), (-1, 'room', {'id': 3}), 60)
+        self.assertEqual(live.fetch_remote(2), (3, [(3, 'room', {'id': 3})]))
+
+    @override_settings(LIVE_BROKER='cache')
+    def test_shared_broker_waits_for_out_of_order_writes(self):
+        """Test: Un numéro écrit après le suivant n'est pas sauté ; un trou n'est abandonné qu'après EVENT_TIMEOUT."""
+        from unittest import mock
+        from django.core.cache import cache
+        from . import live
+        first, second, third = live._shared_seq(), live._shared_seq(), live._shared_seq()
+        cache.set(live._event_key(first), (-1, 'room', {'id': 1}), 60)
+        cache.set(live._event_key(third), (-1, 'room', {'id': 3}), 60)
+        gaps = {}
+        self.assertEqual(live.fetch_remote(0, gaps), (first, [(first, 'room', {'id': 1})]))
+        cache.set(live._event_key(second), (-1, 'room', {'id': 2}), 60)
+        self.assertEqual(
+            live.fetch_remote(first, gaps), (third, [(second, 'room', {'id': 2}), (third, 'room', {'id': 3})])
+        )
+
+        lost, fifth = live._shared_seq(), live._shared_seq()
+        cache.set(live._event_key(fifth), (-1, 'room', {'id': 5}), 60)
+        self.assertEqual(live.fetch_remote(third, gaps), (third, []))
+        later = live.time.monotonic() + live.EVENT_TIMEOUT
+        with mock.patch('core.live.time') as clock:
+            clock.monotonic.return_value = later
+            self.assertEqual(live.fetch_remote(third, gaps), (fifth, [(fifth, 'room', {'id': 5})]))
+        self.assertNotIn(lost, gaps)
+
+    def test_wsgi_requests_get_no_stream(self):
+        """Test: En WSGI, le flux répond 204 (le navigateur ne s'y reconnecte pas)."""
+        from .models import User
+        self.client.force_login(User.objects.create_user('live', 'live@hotel.com', 'pass'))
+        self.assertEqual(self.client.get('/reception/live/').status_code, 204)
+        self.assertContains(self.client.get('/reception/rooms/'), 'data-live-url="/reception/live/"')
+
+
+class LiveStreamTest(TestCase):
+    async def test_asgi_stream_delivers_published_deltas(self):
+        """Test: En ASGI, le flux SSE transmet les deltas publiés après l'ouverture."""
+        from asgiref.sync import sync_to_async
+        from . import live
+        from .models import User
+        user = await sync_to_async(User.objects.create_user)('flux', 'flux@hotel.com', 'pass')
+        await self.async_client.aforce_login(user)
+
+        response = await self.async_client.get('/reception/live/')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks = aiter(response.streaming_content)
+        self.assertTrue((await anext(chunks)).startswith(b'retry:'))
+        await sync_to_async(live.publish)('room', {'id': 7})
+        self.assertIn(b'event: room\ndata: {"id":7}', await anext(chunks))
+        await chunks.aclose()
+
+    @override_settings(LIVE_BROKER='cache')
+    async def test_shared_stream_replays_from_cache_once(self):
+        """Test: Avec le broker partagé, Last-Event-ID rejoue les deltas du cache, sans doublon."""
+        from asgiref.sync import sync_to_async
+        from django.core.cache import cache
+        from . import live
+        from .models import User
+        await cache.aclear()
+        user = await sync_to_async(User.objects.create_user)('partage', 'partage@hotel.com', 'pass')
+        await self.async_client.aforce_login(user)
+        await sync_to_async(live.publish)('room', {'id': 1})
+
+        response = await self.async_client.get('/reception/live/', headers={'Last-Event-ID': '0'})
+        chunks = aiter(response.streaming_content)
+        self.assertTrue((await anext(chunks)).startswith(b'retry:'))
+        self.assertIn(b'id: 1\nevent: room', await anext(chunks))
+        await sync_to_async(live.publish)('room', {'id': 2})
+        self.assertIn(b'id: 2\nevent: room', await anext(chunks))
+        await chunks.aclose()
@@ -32,6 +32,21 @@ urlpatterns = [
     # Reception URLs
     path('reception/rooms/', views.reception_rooms_view, name='reception_rooms'),
     path('reception/reservations/', views.reception_reservations_view, name='reception_reservations'),
+    path('reception/planning/', views.reception_tape_chart_view, name='reception_tape_chart'),
+    path('reception/api/rooms/', views.reception_rooms_api, name='reception_rooms_api'),
+    path('reception/api/reservations/', views.reception_reservations_api, name='reception_reservations_api'),
+    path('reception/api/planning/', views.reception_tape_chart_api, name='reception_tape_chart_api'),
+    path('reception/live/', views.reception_live_events, name='reception_live_events'),
+    path('reception/api/clients/search/', views.client_autocomplete, name='client_autocomplete'),
+    path('reception/api/rooms/free/', views.room_autocomplete, name='room_autocomplete'),
+    path('images/<str:spec>/<path:name>', views.image_variant_view, name='image_variant'),
     path('reception/reservations/new/', views.reception_reservation_create_view, name='reception_reservation_create'),
     path('reception/reservations/<int:pk>/status/<str:new_status>/', views.reception_reservation_update_status, name='reception_reservation_status'),
+
+    # Accounting URLs
+    path('accounting/', views.accounting_report_view, name='accounting_report'),
+    path('accounting/export/<str:kind>.csv', views.accounting_export, name='accounting_export'),
+
+    # Operations
+    path('ops/metrics/', views.metrics_view, name='metrics'),
 ]
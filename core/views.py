@@ -1,13 +1,29 @@
+from functools import wraps
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect, get_object_or_404
-from django.db.models import Count, Sum, Q
+from django.core.files.storage import default_storage
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import condition
 from django.utils import timezone
-from .models import Room, Reservation, Payment, Client
-from datetime import timedelta
-from django.db.models.functions import TruncMonth
+from datetime import date, timedelta
+from .models import Room, Reservation, Client, User
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth import login
+from django.core.exceptions import PermissionDenied, ValidationError
 from .forms import ReservationForm, UserRegistrationForm
+from .booking import save_reservation
+from .stats import DashboardStats
+from .pagination import KeysetPaginator, page_size_from
+from .availability import available_rooms
+from .search import search_clients
+from .reference import category_prices
+from . import caching, images, live, parallel, tape_chart
+from .reports import AGING_BUCKETS, EXPORTS, aging_report, stream_csv
+from .instrumentation import registry as metrics_registry
 from django.contrib import messages
+from PIL import UnidentifiedImageError
 
 def index(request):
     if request.user.is_authenticated:
@@ -43,124 +59,273 @@ def register_view(request):
     })
 
 @login_required
-def dashboard_view(request):
-    today = timezone.localdate()
-    start_of_month = today.replace(day=1)
-
-    # 1. Taux d'occupation
-    total_rooms = Room.objects.count()
-    occupied_rooms = Room.objects.filter(status=Room.Status.OCCUPEE).count()
-    occupation_rate = 0
-    if total_rooms > 0:
-        occupation_rate = round((occupied_rooms / total_rooms) * 100, 1)
-
-    # 2. Revenu du mois
-    monthly_revenue = Payment.objects.filter(
-        date__gte=start_of_month
-    ).aggregate(total=Sum('amount'))['total'] or 0
-
-    # 3. Réservations à venir (Check-in futur ou aujourd'hui)
-    upcoming_reservations = Reservation.objects.filter(
-        check_in__gte=today,
-        status__in=[Reservation.Status.CONFIRMEE, Reservation.Status.EN_ATTENTE]
-    ).count()
-
-    # 4. Total Clients
-    total_clients = Client.objects.count()
-
-    # 5. Répartition par catégorie (pour Chart.js)
-    cat_stats = Reservation.objects.values('room__category').annotate(
-        count=Count('id')
-    ).order_by('-count')
-    
-    # Labels en français via le modèle
-    cat_labels = [dict(Room.Category.choices).get(item['room__category']) for item in cat_stats]
-    cat_data = [item['count'] for item in cat_stats]
-
-    # 6. Tendance des Revenus (Derniers 6 mois)
-    last_6_months = today - timedelta(days=180)
-    revenue_trend = Payment.objects.filter(date__gte=last_6_months).annotate(
-        month=TruncMonth('date')
-    ).values('month').annotate(
-        total=Sum('amount')
-    ).order_by('month')
+async def dashboard_view(request):
+    # Indicateurs, graphiques (Chart.js) et dernières réservations :
+    # voir DashboardStats pour le détail des requêtes et du cache.
+    # Vue asynchrone : sur cache froid, les agrégats partent en parallèle.
+    context = await DashboardStats.aget(request)
+    # Rendu synchrone (le template lit request.user, chargé paresseusement)
+    return await sync_to_async(render)(request, 'core/dashboard.html', context)
 
-    rev_labels = [item['month'].strftime('%B') for item in revenue_trend]
-    rev_data = [float(item['total']) for item in revenue_trend] # Decimal as float for JSON
+# --- VUES RECEPTION ---
 
-    # 7. Dernières Réservations
-    recent_reservations = Reservation.objects.select_related('client', 'room').order_by('-created_at')[:5]
+ROOMS_PAGE_SIZE = 24
+RESERVATIONS_PAGE_SIZE = 25
 
-    # 8. Statut des Chambres (Distribution)
-    room_status_counts = Room.objects.values('status').annotate(count=Count('id'))
-    room_status_dict = {item['status']: item['count'] for item in room_status_counts}
 
-    context = {
-        'occupation_rate': occupation_rate,
-        'occupied_rooms': occupied_rooms,
-        'total_rooms': total_rooms,
-        'monthly_revenue': monthly_revenue,
-        'upcoming_reservations': upcoming_reservations,
-        'total_clients': total_clients,
-        
-        # Charts Data - Passed as simple lists, template will interpret
-        'cat_labels': cat_labels,
-        'cat_data': cat_data,
-        'rev_labels': rev_labels,
-        'rev_data': rev_data,
-        
-        # Tables & Grids
-        'recent_reservations': recent_reservations,
-        'room_status': room_status_dict,
-    }
-    return render(request, 'core/dashboard.html', context)
+def _page_query(request):
+    """Paramètres GET courants (filtres, taille) sans les curseurs de page."""
+    params = request.GET.copy()
+    params.pop('after', None)
+    params.pop('before', None)
+    return params.urlencode()
 
-# --- VUES RECEPTION ---
 
-@login_required
-def reception_rooms_view(request):
-    """Vue liste des chambres pour la réception."""
+def _reception_rooms_page(request):
     status_filter = request.GET.get('status')
     category_filter = request.GET.get('category')
-    
-    rooms = Room.objects.all().order_by('number')
-    
+
+    rooms = Room.objects.all()
+
     if status_filter:
         rooms = rooms.filter(status=status_filter)
     if category_filter:
         rooms = rooms.filter(category=category_filter)
-        
+
+    # Pagination par clé sur le numéro de chambre (unique)
+    paginator = KeysetPaginator(rooms, ('number',), page_size_from(request, ROOMS_PAGE_SIZE))
+    return paginator.page_from_request(request), status_filter, category_filter
+
+
+def _reception_reservations_page(request):
+    status_filter = request.GET.get('status')
+    today = timezone.now().date()
+
+    # Réservations à partir d'aujourd'hui, ou en cours (overlap today)
+    # On prend toutes celles qui finissent après ou égale à aujourd'hui.
+    # Seules les colonnes affichées du client et de la chambre sont chargées.
+    reservations = Reservation.objects.select_related('client', 'room').only(
+        'id', 'check_in', 'check_out', 'status',
+        'client__first_name', 'client__last_name', 'client__email',
+        'room__number',
+    ).filter(
+        check_out__gte=today
+    )
+
+    if status_filter:
+        reservations = reservations.filter(status=status_filter)
+
+    # Pagination par clé sur (check_in, id) : coût constant quelle que soit la page
+    paginator = KeysetPaginator(reservations, ('check_in', 'id'), page_size_from(request, RESERVATIONS_PAGE_SIZE))
+    return paginator.page_from_request(request), status_filter
+
+
+def _page_payload(page, rows):
+    return {
+        'results': rows,
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    }
+
+
+def _reception_rooms_grid(request):
+    page, status_filter, category_filter = _reception_rooms_page(request)
+    for room in page:
+        room.strip_class, room.badge_class = live.room_status_classes(room.status)
+    return page, status_filter, category_filter
+
+@login_required
+async def reception_rooms_view(request):
+    """Vue liste des chambres pour la réception (page et grille des prix chargées en parallèle)."""
+    (page, status_filter, category_filter), prices, grid_version = await parallel.gather(
+        lambda: _reception_rooms_grid(request),
+        category_prices,
+        # Grille en cache (fragment) tant qu'aucune chambre ni aucun statut n'a changé
+        lambda: caching.versions('rooms', 'room_status'),
+    )
+
     context = {
-        'rooms': rooms,
+        'rooms': page,
+        'grid_version': grid_version,
+        'page': page,
+        'page_query': _page_query(request),
         'room_statuses': Room.Status,
         'room_categories': Room.Category,
+        'category_prices': prices,
         'current_status': status_filter,
         'current_category': category_filter,
     }
-    return render(request, 'core/reception_rooms.html', context)
+    return await sync_to_async(render)(request, 'core/reception_rooms.html', context)
+
+@login_required
+def reception_rooms_api(request):
+    """Mêmes pages que reception_rooms_view, au format JSON."""
+    page, _, _ = _reception_rooms_page(request)
+    rows = [
+        {
+            'id': room.id,
+            'number': room.number,
+            'category': room.category,
+            'price_per_night': str(room.price_per_night),
+            'capacity': room.capacity,
+            'status': room.status,
+        }
+        for room in page
+    ]
+    return JsonResponse(_page_payload(page, rows))
 
 @login_required
 def reception_reservations_view(request):
     """Vue liste des réservations pour la réception."""
-    status_filter = request.GET.get('status')
-    today = timezone.now().date()
-    
-    # Réservations à partir d'aujourd'hui, ou en cours (overlap today)
-    # On prend toutes celles qui finissent après ou égale à aujourd'hui
-    reservations = Reservation.objects.select_related('client', 'room').filter(
-        check_out__gte=today
-    ).order_by('check_in')
-
-    if status_filter:
-        reservations = reservations.filter(status=status_filter)
+    page, status_filter = _reception_reservations_page(request)
 
     context = {
-        'reservations': reservations,
+        'reservations': page,
+        'page': page,
+        'page_query': _page_query(request),
         'reservation_statuses': Reservation.Status,
         'current_status': status_filter,
     }
     return render(request, 'core/reception_reservations.html', context)
 
+@login_required
+def reception_reservations_api(request):
+    """Mêmes pages que reception_reservations_view, au format JSON."""
+    page, _ = _reception_reservations_page(request)
+    rows = [
+        {
+            'id': r.id,
+            'client': f"{r.client.first_name} {r.client.last_name}",
+            'client_email': r.client.email,
+            'room': r.room.number,
+            'check_in': r.check_in.isoformat(),
+            'check_out': r.check_out.isoformat(),
+            'status': r.status,
+        }
+        for r in page
+    ]
+    return JsonResponse(_page_payload(page, rows))
+
+def _tape_chart_window(request):
+    """(début, nombre de jours, catégorie) du planning, bornés."""
+    start = _parse_date(request.GET.get('start')) or timezone.localdate()
+    try:
+        days = int(request.GET.get('days', tape_chart.DEFAULT_DAYS))
+    except ValueError:
+        days = tape_chart.DEFAULT_DAYS
+    days = max(1, min(days, tape_chart.MAX_DAYS))
+    category = request.GET.get('category') or None
+    if category not in Room.Category.values:
+        category = None
+    return start, days, category
+
+
+def _tape_chart_etag(request, *args, **kwargs):
+    return tape_chart.etag(*_tape_chart_window(request))
+
+
+@login_required
+@condition(etag_func=_tape_chart_etag)
+def reception_tape_chart_view(request):
+    """Planning des chambres sur N jours (séjours par chambre, plages libres)."""
+    start, days, category = _tape_chart_window(request)
+    lines = tape_chart.build(start, days, category)
+    return render(request, 'core/reception_tape_chart.html', {
+        'lines': [(line.room, line.cells(days)) for line in lines],
+        'dates': [start + timedelta(days=i) for i in range(days)],
+        'start': start,
+        'days': days,
+        'previous_start': start - timedelta(days=days),
+        'next_start': start + timedelta(days=days),
+        'room_categories': Room.Category,
+        'current_category': category,
+    })
+
+@login_required
+@condition(etag_func=_tape_chart_etag)
+def reception_tape_chart_api(request):
+    """Même planning, au format JSON (décalages en jours depuis `start`)."""
+    start, days, category = _tape_chart_window(request)
+    return JsonResponse(tape_chart.as_json(tape_chart.build(start, days, category), start, days))
+
+@login_required
+def image_variant_view(request, spec, name):
+    """Génère la variante au premier affichage puis la sert (voir core/images.py)."""
+    if spec not in images.VARIANTS or not images.is_source(name) or not default_storage.exists(name):
+        raise Http404("Image introuvable")
+    try:
+        variant = images.generate(name, spec)
+    except UnidentifiedImageError:
+        raise Http404("Image illisible")
+    response = FileResponse(default_storage.open(variant, 'rb'), content_type='image/webp')
+    response['Cache-Control'] = 'private, max-age=86400'
+    return response
+
+@login_required
+async def reception_live_events(request):
+    """Flux SSE des changements de chambres et de réservations (voir core/live.py)."""
+    if not isinstance(request, ASGIRequest):
+        # WSGI : un flux infini bloquerait un worker ; 204 = le navigateur ne se reconnecte pas
+        return HttpResponse(status=204)
+    try:
+        last_id = int(request.headers.get('Last-Event-ID', ''))
+    except ValueError:
+        last_id = None
+    response = StreamingHttpResponse(live.stream(last_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # nginx : pas de mise en tampon du flux
+    return response
+
+AUTOCOMPLETE_LIMIT = 10
+
+
+def _parse_date(value):
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+
+@login_required
+async def client_autocomplete(request):
+    """Recherche de clients par préfixes de mots (nom, prénom, email, téléphone), sans accents."""
+    term = request.GET.get('q', '').strip()
+    if not term:
+        return JsonResponse({'results': []})
+
+    # search_clients peut sonder la base (présence de l'index FTS, premier appel du worker) :
+    # la construction du queryset se fait hors de la boucle d'événements
+    clients = (await sync_to_async(search_clients)(term)).only(
+        'id', 'first_name', 'last_name', 'email'
+    ).order_by('last_name', 'first_name')[:AUTOCOMPLETE_LIMIT]
+
+    results = [
+        {'id': c.id, 'text': f"{c} ({c.email})"}
+        async for c in clients
+    ]
+    return JsonResponse({'results': results})
+
+
+@login_required
+async def room_autocomplete(request):
+    """Chambres libres sur [check_in, check_out[, filtrées par préfixe de numéro."""
+    term = request.GET.get('q', '').strip()
+    check_in = _parse_date(request.GET.get('check_in'))
+    check_out = _parse_date(request.GET.get('check_out'))
+
+    rooms = Room.objects.exclude(status=Room.Status.MAINTENANCE)
+    if check_in and check_out and check_in < check_out:
+        rooms = available_rooms(check_in, check_out, rooms)
+    if term:
+        rooms = rooms.filter(number__startswith=term)
+    rooms = rooms.order_by('number')[:AUTOCOMPLETE_LIMIT]
+
+    results = [
+        {'id': room.id, 'text': f"{room} - {room.price_per_night}€ / nuit"}
+        async for room in rooms
+    ]
+    return JsonResponse({'results': results})
+
 @login_required
 def reception_reservation_create_view(request):
     """Création d'une nouvelle réservation."""
@@ -177,9 +342,13 @@ def reception_reservation_create_view(request):
         form = ReservationForm(request.POST)
         if form.is_valid():
             try:
-                reservation = form.save()
+                # La vérification est refaite sous verrou de chambre : un autre poste
+                # a pu réserver la même chambre entre la validation et l'enregistrement.
+                reservation = save_reservation(form.save(commit=False))
                 messages.success(request, f"Réservation créée avec succès pour {reservation.client} !")
                 return redirect('reception_reservations')
+            except ValidationError as e:
+                form.add_error(None, e)
             except Exception as e:
                 # Normalement clean() du model lève ValidationError qui est attrapé par form.is_valid()
                 # Mais au cas où d'autres erreurs surviennent
@@ -199,7 +368,65 @@ def reception_reservation_update_status(request, pk, new_status):
     
     if new_status in Reservation.Status.values:
         reservation.status = new_status
-        reservation.save()
-        messages.success(request, f"Statut mis à jour : {reservation.get_status_display()}")
+        try:
+            save_reservation(reservation)
+            messages.success(request, f"Statut mis à jour : {reservation.get_status_display()}")
+        except ValidationError as e:
+            messages.error(request, " ".join(e.messages))
     
     return redirect('reception_reservations')
+
+# --- VUES COMPTABILITÉ ---
+
+ACCOUNTING_ROLES = (User.Role.ADMIN, User.Role.ACCOUNTANT, User.Role.MANAGER)
+
+
+def accounting_required(view):
+    """Réservé aux comptables, à la direction et aux administrateurs."""
+    @login_required
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not (request.user.is_superuser or request.user.role in ACCOUNTING_ROLES):
+            raise PermissionDenied
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+@accounting_required
+def accounting_report_view(request):
+    """Balance âgée des créances, par client."""
+    rows, totals = aging_report()
+    keys = [key for key, *_ in AGING_BUCKETS]
+    for row in rows:
+        row['amounts'] = [row[key] for key in keys]
+    return render(request, 'core/accounting_report.html', {
+        'rows': rows,
+        'total_amounts': [totals[key] for key in keys],
+        'total': totals['total'],
+        'bucket_labels': [label for _, label, *_ in AGING_BUCKETS],
+    })
+
+
+@accounting_required
+def accounting_export(request, kind):
+    """Export CSV en flux des factures ou paiements (?start=AAAA-MM-JJ&end=AAAA-MM-JJ)."""
+    if kind not in EXPORTS:
+        raise Http404
+    header, rows = EXPORTS[kind]
+    start = _parse_date(request.GET.get('start'))
+    end = _parse_date(request.GET.get('end'))
+
+    response = StreamingHttpResponse(
+        stream_csv(header, rows(start, end)), content_type='text/csv; charset=utf-8'
+    )
+    filename = f"{kind}-{timezone.localdate().isoformat()}.csv"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+# --- EXPLOITATION ---
+
+@staff_member_required
+def metrics_view(request):
+    """Histogramme glissant des mesures par vue (requêtes SQL, temps), en JSON."""
+    return JsonResponse({'views': metrics_registry.summary()})
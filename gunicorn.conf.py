@@ -0,0 +1,53 @@
+# Profil du serveur gunicorn (lu automatiquement depuis la racine du projet).
+#
+# HOTEL_SERVER choisit l'interface :
+# - wsgi (défaut) : workers synchrones, une requête à la fois par worker ;
+# - asgi : workers uvicorn ; les vues asynchrones (tableau de bord, chambres de
+#   la réception) lancent leurs requêtes indépendantes en parallèle
+#   (core/parallel.py). Nécessite `pip install "uvicorn[standard]"`.
+#   settings.py lit la même variable : CONN_MAX_AGE forcé à 0 (connexions
+#   persistantes non sûres en ASGI) ; sous PostgreSQL, utiliser HOTEL_DB_POOL_SIZE.
+#
+# Plusieurs workers exigent un cache partagé (HOTEL_CACHE_URL=file://... ou
+# redis://...) : avec locmem://, les invalidations versionnées (core/caching.py :
+# catalogue des chambres, ETag du planning, fragments) restent dans le worker qui
+# écrit. Sans cache partagé, le profil démarre un seul worker par défaut et refuse
+# HOTEL_WORKERS > 1.
+import multiprocessing
+import os
+
+bind = os.environ.get('HOTEL_BIND', '0.0.0.0:8000')
+
+_cache_scheme = os.environ.get('HOTEL_CACHE_URL', 'locmem://').split(':', 1)[0]
+_shared_cache = _cache_scheme in ('file', 'redis', 'rediss')
+
+
+def _workers(default):
+    count = int(os.environ.get('HOTEL_WORKERS', default if _shared_cache else 1))
+    if count > 1 and not _shared_cache:
+        raise RuntimeError(
+            f"HOTEL_WORKERS={count} avec le cache {_cache_scheme}:// : chaque worker garderait "
+            "ses propres versions de cache. Utiliser HOTEL_CACHE_URL=file://... ou redis://..., "
+            "ou HOTEL_WORKERS=1."
+        )
+    return count
+
+
+if os.environ.get('HOTEL_SERVER', 'wsgi') == 'asgi':
+    wsgi_app = 'hotel_resilience.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+    # Une boucle d'événements par cœur ; les requêtes SQL partent dans le pool de threads
+    workers = _workers(multiprocessing.cpu_count())
+    # Tableau en direct (core/live.py) : sans broker partagé, un changement enregistré par
+    # un worker (ou une commande) n'atteindrait pas les écrans des autres workers
+    _broker = os.environ.get('HOTEL_LIVE_BROKER', 'cache' if _cache_scheme in ('redis', 'rediss') else 'local')
+    if workers > 1 and _broker != 'cache':
+        raise RuntimeError(
+            f"HOTEL_SERVER=asgi avec {workers} workers : le tableau en direct nécessite "
+            "HOTEL_CACHE_URL=redis://... (HOTEL_LIVE_BROKER=cache), ou HOTEL_WORKERS=1."
+        )
+else:
+    wsgi_app = 'hotel_resilience.wsgi:application'
+    workers = _workers(multiprocessing.cpu_count() * 2 + 1)
+
+timeout = 30
@@ -10,7 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from pathlib import Path
+from urllib.parse import unquote, urlsplit
+
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -23,9 +27,9 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = 'django-insecure-wq)c6-)%l&fv%tq#2km@nm*7!63avr5+t9@8*8g$2-2y2(s4s%'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.environ.get('DEBUG', 'True').lower() not in ('false', '0')
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = [host for host in os.environ.get('ALLOWED_HOSTS', '').split(',') if host]
 
 
 # Application definition
@@ -51,6 +55,24 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Mesure des requêtes (nombre de requêtes SQL, temps SQL/templates/total) :
+# en-tête Server-Timing, logs `core.metrics` et /ops/metrics/ (voir core/instrumentation.py)
+REQUEST_METRICS = os.environ.get('HOTEL_REQUEST_METRICS') == '1'
+if REQUEST_METRICS:
+    MIDDLEWARE.insert(0, 'core.instrumentation.RequestMetricsMiddleware')
+
+# Nombre maximal de requêtes SQL par vue (session et utilisateur compris)
+REQUEST_METRICS_BUDGETS = {
+    'dashboard': 8,
+    'reception_rooms': 4,  # + grille des prix au premier affichage (cache froid)
+    'reception_reservations': 3,
+    'reception_rooms_api': 3,
+    'reception_reservations_api': 3,
+    'accounting_report': 3,
+}
+# Dépassement de budget : exception (tests) plutôt qu'un simple avertissement dans les logs
+REQUEST_METRICS_STRICT = False
+
 ROOT_URLCONF = 'hotel_resilience.urls'
 
 TEMPLATES = [
@@ -68,18 +90,152 @@ TEMPLATES = [
     },
 ]
 
+# Hors DEBUG : templates compilés une fois par processus (chargeur en cache,
+# explicite ; un template modifié n'est relu qu'au redémarrage)
+if not DEBUG:
+    TEMPLATES[0]['APP_DIRS'] = False
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
+
 WSGI_APPLICATION = 'hotel_resilience.wsgi.application'
 
+# Interface du serveur (HOTEL_SERVER, voir gunicorn.conf.py) : wsgi ou asgi
+SERVER_INTERFACE = os.environ.get('HOTEL_SERVER', 'wsgi')
+
 
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# Profil choisi par l'environnement :
+# - DATABASE_URL=postgres://utilisateur:motdepasse@hôte:5432/base : PostgreSQL,
+#   connexions persistantes (HOTEL_DB_CONN_MAX_AGE, 60 s par défaut) ou pool
+#   psycopg par processus (HOTEL_DB_POOL_SIZE) ; nécessite psycopg[pool] ;
+# - sinon SQLite (db.sqlite3), réglé pour plusieurs workers gunicorn : WAL
+#   (lecteurs et écrivain ne se bloquent plus), attente du verrou plutôt que
+#   "database is locked", transactions d'écriture prises dès BEGIN.
+# `python manage.py check_database` vérifie réglages et index du profil actif.
+DATABASE_URL = os.environ.get('DATABASE_URL', '')
+DB_CONN_MAX_AGE = int(os.environ.get('HOTEL_DB_CONN_MAX_AGE', '60'))
+if SERVER_INTERFACE == 'asgi':
+    # Connexions persistantes déconseillées en ASGI (Django) : chaque requête peut
+    # changer de thread et les connexions ne seraient jamais rendues ; utiliser le pool
+    DB_CONN_MAX_AGE = 0
+
+if DATABASE_URL.startswith(('postgres://', 'postgresql://')):
+    _db_url = urlsplit(DATABASE_URL)
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': unquote(_db_url.path.lstrip('/')),
+            'USER': unquote(_db_url.username or ''),
+            'PASSWORD': unquote(_db_url.password or ''),
+            'HOST': _db_url.hostname or '',
+            'PORT': _db_url.port or '',
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {},
+        }
     }
-}
+    DB_POOL_SIZE = int(os.environ.get('HOTEL_DB_POOL_SIZE', '0'))
+    if DB_POOL_SIZE:
+        # Le pool remplace les connexions persistantes (Django refuse les deux à la fois)
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {'min_size': 1, 'max_size': DB_POOL_SIZE, 'timeout': 10}
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                # busy_timeout (secondes) : attendre qu'un autre worker libère le verrou d'écriture
+                'timeout': 20,
+                # BEGIN IMMEDIATE : pas d'échec en cours de transaction lecture -> écriture
+                'transaction_mode': 'IMMEDIATE',
+                'init_command': (
+                    'PRAGMA journal_mode=WAL;'
+                    'PRAGMA synchronous=NORMAL;'
+                    'PRAGMA mmap_size=268435456;'
+                    'PRAGMA cache_size=-20000;'
+                    'PRAGMA temp_store=MEMORY;'
+                ),
+            },
+            # Base de test sur disque : la base en mémoire partagée renvoie « table is locked »
+            # au lieu d'attendre, ce qui empêche de tester le verrou d'écriture entre connexions
+            'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
+        }
+    }
+
+
+# Cache
+# HOTEL_CACHE_URL choisit le backend :
+# - locmem:// (défaut) : mémoire du processus, pour le développement ;
+# - file:///chemin/vers/dossier : fichiers partagés par les workers d'une même machine ;
+# - redis://hôte:6379/0 : Redis ou serveur compatible (Valkey, KeyDB...), nécessite redis-py.
+# Les invalidations versionnées (core/caching.py) ne sont vues de tous les
+# workers qu'avec un cache partagé (fichiers ou Redis).
+CACHE_URL = os.environ.get('HOTEL_CACHE_URL', 'locmem://')
+_cache_url = urlsplit(CACHE_URL)
+
+if _cache_url.scheme == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': unquote(_cache_url.path) or str(BASE_DIR / '.cache'),
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+elif _cache_url.scheme in ('redis', 'rediss'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+            'KEY_PREFIX': 'hotel',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'hotel-resilience',
+        }
+    }
+
+
+# Sessions et authentification
+# HOTEL_SESSION_ENGINE choisit le stockage des sessions :
+# - cached_db (défaut avec un cache partagé) : lecture depuis le cache, écriture en base ;
+# - signed_cookies : session dans un cookie signé, aucune lecture serveur (données limitées à ~4 ko) ;
+# - db (défaut avec locmem://) : base de données seule (une requête par vue authentifiée).
+# Avec un cache partagé, l'utilisateur connecté est lu depuis le cache
+# (core/authentication.py). Le cache mémoire d'un processus ne voit pas les
+# invalidations des autres (workers, commandes) : sessions et utilisateurs
+# viennent alors de la base.
+SHARED_CACHE = _cache_url.scheme in ('file', 'redis', 'rediss')
+
+SESSION_ENGINE = 'django.contrib.sessions.backends.' + os.environ.get(
+    'HOTEL_SESSION_ENGINE', 'cached_db' if SHARED_CACHE else 'db'
+)
+
+AUTHENTICATION_BACKENDS = [
+    'core.authentication.CachedModelBackend' if SHARED_CACHE else 'django.contrib.auth.backends.ModelBackend'
+]
+
+
+# Tableau de la réception en direct (SSE, core/live.py) : diffusion des changements
+# - cache (défaut avec Redis) : entre workers et commandes, via le cache partagé ;
+#   le numéro de séquence commun exige un incr atomique (Redis, pas le cache fichiers) ;
+# - local (défaut sinon) : dans le processus seulement, un seul worker ASGI.
+LIVE_BROKER = os.environ.get('HOTEL_LIVE_BROKER', 'cache' if _cache_url.scheme in ('redis', 'rediss') else 'local')
+if LIVE_BROKER == 'cache' and CACHES['default']['BACKEND'].endswith('FileBasedCache'):
+    raise ImproperlyConfigured(
+        "HOTEL_LIVE_BROKER=cache nécessite un cache à incr atomique (HOTEL_CACHE_URL=redis://...)."
+    )
 
 
 # Password validation
@@ -124,6 +280,16 @@ STATICFILES_DIRS = [
 
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# Hors DEBUG : noms à empreinte + variantes .gz/.br écrites par collectstatic,
+# servies par l'application avec Cache-Control immutable (core/static_assets.py)
+if not DEBUG:
+    STORAGES = {
+        'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+        'staticfiles': {'BACKEND': 'core.static_assets.CompressedManifestStaticFilesStorage'},
+    }
+    MIDDLEWARE.insert(MIDDLEWARE.index('django.middleware.security.SecurityMiddleware') + 1,
+                      'core.static_assets.StaticAssetsMiddleware')
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
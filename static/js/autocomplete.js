@@ -0,0 +1,81 @@
+// Autocomplétion des listes déroulantes du formulaire de réservation.
+// Chaque <select data-autocomplete-url="..."> reçoit un champ de recherche ;
+// les options sont chargées à la demande depuis le serveur.
+(function () {
+    var DELAY = 250;
+
+    function dateParams(form) {
+        var params = new URLSearchParams();
+        ['check_in', 'check_out'].forEach(function (name) {
+            var input = form.querySelector('[name="' + name + '"]');
+            if (input && input.value) {
+                params.set(name, input.value);
+            }
+        });
+        return params;
+    }
+
+    function fillOptions(select, results) {
+        var selected = select.value;
+        var keep = select.selectedOptions[0];
+        select.innerHTML = '';
+        select.appendChild(new Option('---------', ''));
+        results.forEach(function (item) {
+            var option = new Option(item.text, item.id);
+            option.selected = String(item.id) === selected;
+            select.appendChild(option);
+        });
+        // On conserve la sélection courante même si elle n'est plus dans les résultats
+        if (selected && !select.value && keep) {
+            keep.selected = true;
+            select.appendChild(keep);
+        }
+    }
+
+    function setup(select) {
+        var form = select.form;
+        var search = document.createElement('input');
+        search.type = 'search';
+        search.className = 'form-control mb-2';
+        search.placeholder = 'Rechercher...';
+        search.autocomplete = 'off';
+        select.parentNode.insertBefore(search, select);
+
+        var timer = null;
+        var withDates = select.name === 'room';
+
+        function load() {
+            var params = withDates ? dateParams(form) : new URLSearchParams();
+            if (search.value) {
+                params.set('q', search.value);
+            }
+            if (!withDates && !search.value) {
+                return;
+            }
+            fetch(select.dataset.autocompleteUrl + '?' + params.toString(), {
+                credentials: 'same-origin',
+                headers: { 'Accept': 'application/json' }
+            })
+                .then(function (response) { return response.json(); })
+                .then(function (data) { fillOptions(select, data.results); });
+        }
+
+        function schedule() {
+            clearTimeout(timer);
+            timer = setTimeout(load, DELAY);
+        }
+
+        search.addEventListener('input', schedule);
+        if (withDates) {
+            ['check_in', 'check_out'].forEach(function (name) {
+                var input = form.querySelector('[name="' + name + '"]');
+                if (input) {
+                    input.addEventListener('change', schedule);
+                }
+            });
+            load();
+        }
+    }
+
+    document.querySelectorAll('select[data-autocomplete-url]').forEach(setup);
+})();
@@ -0,0 +1,82 @@
+// Tableau de la réception en direct : applique les changements reçus par SSE
+// (voir core/live.py) aux cartes de chambres [data-room-id] et aux lignes de
+// réservations [data-reservation-id] affichées, sans recharger la page.
+(function () {
+    var script = document.currentScript;
+    var url = script && script.dataset.liveUrl;
+    if (!url || !window.EventSource) {
+        return;
+    }
+
+    function swapClasses(element, previous, next) {
+        (previous || '').split(' ').forEach(function (name) {
+            if (name) {
+                element.classList.remove(name);
+            }
+        });
+        next.split(' ').forEach(function (name) {
+            if (name) {
+                element.classList.add(name);
+            }
+        });
+    }
+
+    function badge(text, classes) {
+        var span = document.createElement('span');
+        span.className = 'badge ' + classes;
+        span.textContent = text;
+        return span;
+    }
+
+    function patchRoom(room) {
+        var card = document.querySelector('[data-room-id="' + room.id + '"]');
+        if (!card) {
+            return;
+        }
+        var strip = card.querySelector('[data-live="strip"]');
+        swapClasses(strip, strip.className.replace('status-strip', ''), room.strip);
+
+        var status = card.querySelector('[data-live="badge"]');
+        swapClasses(status, status.className.replace('badge rounded-pill', ''), room.badge);
+        status.textContent = room.label;
+
+        var free = room.status === 'LIBRE';
+        card.querySelector('[data-live="available"]').classList.toggle('d-none', !free);
+        card.querySelector('[data-live="unavailable"]').classList.toggle('d-none', free);
+    }
+
+    function patchReservation(reservation) {
+        var row = document.querySelector('[data-reservation-id="' + reservation.id + '"]');
+        if (!row) {
+            // Nouvelle réservation : la liste (tri, pagination) est recalculée à la demande
+            var notice = document.querySelector('[data-live="refresh"]');
+            if (notice && reservation.created) {
+                notice.classList.remove('d-none');
+            }
+            return;
+        }
+        if (reservation.deleted) {
+            row.classList.add('opacity-50', 'text-decoration-line-through');
+            return;
+        }
+        var cell = row.querySelector('[data-live="status"]');
+        cell.replaceChildren(badge(reservation.label, reservation.badge));
+        row.classList.add('table-warning');
+        setTimeout(function () {
+            row.classList.remove('table-warning');
+        }, 3000);
+    }
+
+    var source = new EventSource(url);
+    source.addEventListener('room', function (event) {
+        patchRoom(JSON.parse(event.data));
+    });
+    source.addEventListener('reservation', function (event) {
+        patchReservation(JSON.parse(event.data));
+    });
+    // Trop de changements manqués (écran en veille, serveur redémarré) : on repart de la page
+    source.addEventListener('reload', function () {
+        source.close();
+        window.location.reload();
+    });
+})();